@@ -3,6 +3,13 @@ from flask import Flask, jsonify, request # Make sure 'request' is imported here
 from flask_cors import CORS
 from config import Config, socketio 
 import os
+from utils.db_connection import init_request_scope
+from utils.schema import ensure_schema
+from utils.jwt_utils import decode_token
+from utils.socket_rooms import rooms_for_user
+from utils.socketio_queue import socketio_queue_options
+from cli import register_commands
+from utils.attendance_alerts import start_shortage_alert_scheduler
 
 from routes.auth_routes import auth_bp  
 from routes.student_routes import student_bp
@@ -15,12 +22,17 @@ from routes.marks_routes import marks_bp
 from routes.circulars_routes import circulars_bp 
 from routes.notification_routes import notifications_bp # <--- NEW: Import notifications blueprint
 from routes.profile_routes import profile_bp
+from routes.system_routes import system_bp
+from routes.upload_students import upload_bp
+from routes.search_routes import search_bp
+from routes.file_routes import files_bp
 # --- Initialize Flask app ---
-app = Flask(__name__, static_url_path='/uploads', static_folder='uploads')
+app = Flask(__name__, static_folder=None) # /uploads is served by routes/file_routes.py
 app.config.from_object(Config)
 CORS(app)
 CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}}, supports_credentials=True)
-socketio.init_app(app)
+socketio.init_app(app, **socketio_queue_options()) # Relay emits through the message queue when configured
+init_request_scope(app) # One pooled connection/transaction per request
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'uploads')
 
 # --- Configure UPLOAD_FOLDER ---
@@ -28,9 +40,9 @@ UPLOAD_FOLDER_BASE = os.path.join(os.getcwd(), 'uploads')
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER_BASE
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
-app.static_folder = UPLOAD_FOLDER_BASE
-app.static_url_path = '/uploads'
+app.static_url_path = '/uploads' # Prefix of stored upload URLs (see utils/fileupload_utils.py)
 os.makedirs(UPLOAD_FOLDER_BASE, exist_ok=True)
+ensure_schema() # Create tables/indexes added after the base schema, if missing
 
 # --- Register Blueprints (Routes Modules) ---
 app.register_blueprint(auth_bp)
@@ -44,6 +56,13 @@ app.register_blueprint(marks_bp)
 app.register_blueprint(circulars_bp, url_prefix='/api/circulars')
 app.register_blueprint(notifications_bp) # <--- NEW: Register notifications blueprint
 app.register_blueprint(profile_bp)
+app.register_blueprint(system_bp)
+app.register_blueprint(upload_bp)
+app.register_blueprint(search_bp)
+app.register_blueprint(files_bp)
+
+# --- CLI maintenance commands (flask --app app <command>) ---
+register_commands(app)
 
 # --- Root Route (for testing) ---
 @app.route("/", methods=["GET"])
@@ -63,13 +82,25 @@ def handle_disconnect():
 
 @socketio.on('registerUser')
 def register_user(data):
-    user_id = data.get('userId')
-    if user_id:
-        join_room(str(user_id)) # Join a room specific to the user
-        print(f"User {user_id} registered socket with SID: {request.sid}")
-    else:
-        print(f"Received registerUser without userId from SID: {request.sid}")
+    # The identity comes only from a valid JWT: the rooms joined carry the user's role,
+    # department and class broadcasts, so a client-supplied userId is never trusted
+    token = data.get('token') if isinstance(data, dict) else None
+    decoded = decode_token(token) if token else None
+    if not decoded or not decoded.get('user_id'):
+        print(f"Rejected registerUser without a valid token from SID: {request.sid}")
+        emit('registrationError', {"error": "A valid token is required."})
+        return
+    user_id = decoded['user_id']
+    # The user's own room plus role/department/semester/section rooms for group emits
+    for room in rooms_for_user(user_id):
+        join_room(room)
+    print(f"User {user_id} registered socket with SID: {request.sid}")
 
 # --- Run Server ---
 if __name__ == "__main__":
-    socketio.run(app, debug=True, port=5000)
\ No newline at end of file
+    # Background jobs only run in the server process: not for `flask` CLI commands, and under
+    # the debug reloader only in the child that serves requests
+    debug = True
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_shortage_alert_scheduler() # Attendance shortage notifications every ATTENDANCE_ALERT_INTERVAL seconds
+    socketio.run(app, debug=debug, port=5000)
\ No newline at end of file
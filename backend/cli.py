@@ -0,0 +1,83 @@
+# backend/cli.py
+import click
+from flask.cli import AppGroup
+from models.attendance_model import AttendanceModel
+from utils.attendance_alerts import run_shortage_alert_job
+from utils.notification_dispatcher import notification_dispatcher
+from utils.document_indexer import document_indexer
+from utils.fileupload_utils import recount_file_references, collect_unreferenced_files
+
+# Maintenance commands, run with e.g. `flask --app app attendance-summary verify`
+
+attendance_summary_cli = AppGroup('attendance-summary', help="Maintain the attendance_summary table.")
+
+@attendance_summary_cli.command('rebuild')
+@click.option('--student-id', type=int, default=None, help="Only rebuild this student's rows.")
+def rebuild_attendance_summary(student_id):
+    """Recompute attendance_summary from the attendance table."""
+    written = AttendanceModel.rebuild_attendance_summary(student_id)
+    click.echo(f"Rebuilt attendance_summary: {written} rows written.")
+
+@attendance_summary_cli.command('verify')
+@click.option('--fix', is_flag=True, help="Rebuild the drifted students' rows.")
+def verify_attendance_summary(fix):
+    """Report rows where attendance_summary disagrees with the attendance table."""
+    drift = AttendanceModel.verify_attendance_summary()
+    if not drift:
+        click.echo("attendance_summary is consistent.")
+        return
+    for row in drift:
+        click.echo(
+            f"student {row['student_id']} offering {row['offering_id']}: "
+            f"expected {row['expected_present']}/{row['expected_total']}, "
+            f"found {row['actual_present']}/{row['actual_total']}"
+        )
+    click.echo(f"{len(drift)} drifted rows.")
+    if fix:
+        for student_id in sorted({row['student_id'] for row in drift}):
+            AttendanceModel.rebuild_attendance_summary(student_id)
+        click.echo("Drifted students rebuilt.")
+    else:
+        raise SystemExit(1)
+
+attendance_alerts_cli = AppGroup('attendance-alerts', help="Attendance shortage notifications.")
+
+@attendance_alerts_cli.command('run')
+@click.option('--threshold', type=float, default=None, help="Percent below which students are alerted.")
+def run_attendance_alerts(threshold):
+    """Run the incremental shortage alert job once (e.g. from cron)."""
+    result = run_shortage_alert_job(threshold=threshold)
+    notification_dispatcher.flush()
+    if result['skipped']:
+        click.echo("Another run is in progress; skipped.")
+    else:
+        click.echo(f"Scanned {result['scanned']} changed rows, alerted {result['alerted']}, re-armed {result['rearmed']}.")
+
+documents_cli = AppGroup('documents', help="Extracted text of uploaded notes and circular attachments.")
+
+@documents_cli.command('backfill')
+@click.option('--retry-failed', is_flag=True, help="Also retry files whose extraction failed.")
+@click.option('--limit', type=int, default=None, help="Process at most this many files.")
+def backfill_documents(retry_failed, limit):
+    """Extract the text of files uploaded before extraction existed, left pending by a restart,
+    or marked unsupported before their extractor (e.g. pypdf) was installed."""
+    counts = document_indexer.backfill(retry_failed=retry_failed, limit=limit)
+    if not counts:
+        click.echo("Every file already has its text extracted.")
+        return
+    click.echo("Extracted: " + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+
+uploads_cli = AppGroup('uploads', help="Maintain the content-addressed upload store.")
+
+@uploads_cli.command('gc')
+def collect_uploads():
+    """Recount file references from notes/circulars and delete files nothing references."""
+    recount_file_references()
+    deleted = collect_unreferenced_files()
+    click.echo(f"Deleted {deleted} unreferenced files.")
+
+def register_commands(app):
+    app.cli.add_command(attendance_summary_cli)
+    app.cli.add_command(attendance_alerts_cli)
+    app.cli.add_command(documents_cli)
+    app.cli.add_command(uploads_cli)
@@ -5,4 +5,49 @@ class Config:
     MYSQL_USER = "root"
     MYSQL_PASSWORD = "Aksh@2758"
     MYSQL_DB = "college_portal"
+    # Connection pool (see utils/db_pool.py)
+    MYSQL_POOL_SIZE = 10          # Connections kept open
+    MYSQL_POOL_MAX_OVERFLOW = 10  # Extra connections allowed under load
+    MYSQL_POOL_TIMEOUT = 30       # Seconds to wait for a free connection
+    MYSQL_POOL_RECYCLE = 3600     # Seconds before a connection is reopened
+    MYSQL_POOL_PRE_PING = True    # Ping idle connections on checkout
+    # In-process cache for dept/subject/faculty/student ID lookups (see utils/entity_cache.py)
+    ENTITY_CACHE_TTL = 300        # Seconds
+    ENTITY_CACHE_MAXSIZE = 4096
+    # Background notification fan-out (see utils/notification_dispatcher.py)
+    NOTIFICATION_QUEUE_SIZE = 10000      # Max queued fan-out jobs
+    NOTIFICATION_WORKERS = 2
+    NOTIFICATION_BATCH_SIZE = 500        # Notifications persisted per batch
+    NOTIFICATION_ENQUEUE_TIMEOUT = 1.0   # Seconds to wait on a full queue before delivering inline
+    # Socket.IO message queue for multi-worker deployments (see utils/socketio_queue.py)
+    SOCKETIO_MESSAGE_QUEUE = None        # e.g. "redis://localhost:6379/0" or "sqlite:///socketio_queue.db"
+    SOCKETIO_CHANNEL = "classlink-socketio"
+    ATTENDANCE_SHORTAGE_THRESHOLD = 75.0  # Percent; students below this are flagged for shortage
+    # Shortage alert job (see utils/attendance_alerts.py)
+    ATTENDANCE_ALERT_INTERVAL = 900       # Seconds between runs inside the web server; 0 disables the loop
+    ATTENDANCE_ALERT_MIN_SESSIONS = 5     # Don't alert before a subject has this many recorded sessions
+    ATTENDANCE_ALERT_OVERLAP = 300        # Seconds re-scanned behind the watermark (late-committing writes)
+    # Bulk student import (see utils/student_import.py)
+    STUDENT_IMPORT_BATCH_SIZE = 1000     # Rows validated and committed per checkpoint
+    STUDENT_IMPORT_HASH_WORKERS = 4      # Threads hashing initial passwords
+    STUDENT_IMPORT_STALE_AFTER = 600     # Seconds after which a 'running' job with no progress may be resumed
+    # Precomputed class timetables (see utils/timetable_cache.py)
+    TIMETABLE_CACHE_TTL = 600            # Seconds; bounds staleness in other worker processes
+    TIMETABLE_CACHE_MAXSIZE = 2048       # (dept, semester, section) entries
+    CIRCULAR_NOTIFICATION_MODE = "broadcast"  # "broadcast" (one row, merged at read time) or "per_user"
+    # Circulars feed (see CircularsModel.get_circular_feed and utils/circular_feed_cache.py)
+    CIRCULAR_FEED_PAGE_SIZE = 20
+    CIRCULAR_SNIPPET_LENGTH = 200        # Characters of content shown in list views
+    CIRCULAR_FEED_CACHE_TTL = 120        # Seconds
+    CIRCULAR_FEED_CACHE_MAXSIZE = 1024   # Cached pages
+    # Text extraction from uploaded notes/circular attachments (see utils/document_indexer.py)
+    DOCUMENT_EXTRACTION_WORKERS = 2
+    DOCUMENT_TEXT_MAX_CHARS = 1000000    # Longer documents are cut (fits in MEDIUMTEXT)
+    DOCUMENT_PREVIEW_LENGTH = 2000       # Characters of extracted text returned by the preview endpoints
+    # Content-addressed uploads (see utils/fileupload_utils.py)
+    UPLOAD_BLOB_GRACE_SECONDS = 600      # A freshly uploaded file is never unlinked before its row can commit
+    # File delivery for /uploads and note downloads (see utils/file_delivery.py)
+    UPLOAD_DELIVERY_MODE = None          # None (Flask streams), "x-sendfile" (Apache/lighttpd) or "x-accel-redirect" (nginx)
+    UPLOAD_ACCEL_REDIRECT_PREFIX = "/protected-uploads"  # nginx `internal` location aliased to UPLOAD_FOLDER
+    UPLOAD_IMMUTABLE_MAX_AGE = 31536000  # Seconds; content-addressed files never change
 socketio = SocketIO(cors_allowed_origins="*")
\ No newline at end of file
@@ -1,6 +1,19 @@
 # models/attendance_model.py
-from utils.db_connection import get_db_connection
+from utils.db_connection import get_db_connection, get_streaming_connection
+from utils.entity_cache import entity_cache, cache_entity
 from datetime import datetime
+import numpy as np
+import pandas as pd
+
+ATTENDANCE_STATUSES = ('present', 'absent')
+ATTENDANCE_UPSERT_CHUNK_SIZE = 500 # Rows per multi-row INSERT statement
+ATTENDANCE_STREAM_BATCH_SIZE = 500 # Rows fetched per round trip when streaming from a server-side cursor
+SUMMARY_BUILT_MARKER = 'attendance_summary_rebuild' # job_watermarks row: time of the last full rebuild
+
+# Cell codes of the section attendance matrix
+MATRIX_PRESENT = 1
+MATRIX_ABSENT = 0
+MATRIX_NOT_RECORDED = -1
 
 class AttendanceModel:
     @staticmethod
@@ -8,39 +21,73 @@ class AttendanceModel:
         """
         Helper to fetch various IDs needed for attendance operations,
         given higher-level identifiers.
+        Lookups are served from the entity cache when possible; only misses hit the database.
         """
+        ids = {}
+        missing = []
+
+        if faculty_user_id:
+            faculty_id = entity_cache.get(('faculty', faculty_user_id))
+            if faculty_id is not None: ids['faculty_id'] = faculty_id
+            else: missing.append('faculty')
+
+        if student_user_id:
+            student = entity_cache.get(('student', student_user_id))
+            if student is not None: ids.update(student)
+            else: missing.append('student')
+
+        if dept_code:
+            dept_id = entity_cache.get(('dept', dept_code))
+            if dept_id is not None: ids['dept_id'] = dept_id
+            else: missing.append('dept')
+
+        if subject_code:
+            subject_id = entity_cache.get(('subject', subject_code))
+            if subject_id is not None: ids['subject_id'] = subject_id
+            else: missing.append('subject')
+
+        if not missing:
+            return ids
+
         conn = None
         cursor = None
         try:
             conn = get_db_connection()
             cursor = conn.cursor(dictionary=True)
 
-            ids = {}
-
-            if faculty_user_id:
+            if 'faculty' in missing:
                 cursor.execute("SELECT faculty_id FROM faculty_details WHERE user_id = %s", (faculty_user_id,))
                 result = cursor.fetchone()
-                if result: ids['faculty_id'] = result['faculty_id']
+                if result:
+                    ids['faculty_id'] = result['faculty_id']
+                    cache_entity(('faculty', faculty_user_id), result['faculty_id'])
 
-            if student_user_id:
+            if 'student' in missing:
                 cursor.execute("SELECT student_id, dept_id, semester, section FROM student_details WHERE user_id = %s", (student_user_id,))
                 result = cursor.fetchone()
                 if result:
-                    ids['student_id'] = result['student_id']
-                    ids['student_dept_id'] = result['dept_id']
-                    ids['student_semester'] = result['semester']
-                    ids['student_section'] = result['section']
-
-
-            if dept_code:
+                    student = {
+                        'student_id': result['student_id'],
+                        'student_dept_id': result['dept_id'],
+                        'student_semester': result['semester'],
+                        'student_section': result['section'],
+                    }
+                    ids.update(student)
+                    cache_entity(('student', student_user_id), student)
+
+            if 'dept' in missing:
                 cursor.execute("SELECT dept_id FROM departments WHERE dept_code = %s", (dept_code,))
                 result = cursor.fetchone()
-                if result: ids['dept_id'] = result['dept_id']
+                if result:
+                    ids['dept_id'] = result['dept_id']
+                    cache_entity(('dept', dept_code), result['dept_id'])
 
-            if subject_code:
+            if 'subject' in missing:
                 cursor.execute("SELECT subject_id FROM subjects WHERE subject_code = %s", (subject_code,))
                 result = cursor.fetchone()
-                if result: ids['subject_id'] = result['subject_id']
+                if result:
+                    ids['subject_id'] = result['subject_id']
+                    cache_entity(('subject', subject_code), result['subject_id'])
 
             return ids
         except Exception as e:
@@ -51,11 +98,12 @@ class AttendanceModel:
             if conn: conn.close()
 
     @staticmethod
-    # --- MODIFIED: Removed period_number from signature ---
-    def get_class_session_by_details(date_str, dept_code, semester, subject_code, faculty_user_id, section):
+    def resolve_class_assignment(dept_code, semester, subject_code, faculty_user_id, section, date_str=None):
         """
-        Fetches an existing class_session_id based on a specific set of class details.
-        This is crucial before marking attendance.
+        Resolves department -> subject -> faculty -> offering -> assignment (and the class session
+        on date_str, if one exists) with a single joined query.
+        Returns a dict of dept_id, subject_id, faculty_id, offering_id, assignment_id and session_id;
+        any link that doesn't exist is None, so callers can tell exactly what is missing.
         """
         conn = None
         cursor = None
@@ -63,60 +111,44 @@ class AttendanceModel:
             conn = get_db_connection()
             cursor = conn.cursor(dictionary=True)
 
-            ids = AttendanceModel._get_entity_ids(
-                dept_code=dept_code,
-                semester=semester, # Not directly used here, but for offering
-                subject_code=subject_code,
-                faculty_user_id=faculty_user_id
-            )
-
-            if not all(k in ids for k in ['dept_id', 'subject_id', 'faculty_id']):
-                return None # Missing fundamental IDs
-
-            dept_id = ids['dept_id']
-            subject_id = ids['subject_id']
-            faculty_id = ids['faculty_id']
-
-            # First, find the offering_id
-            cursor.execute(
-                "SELECT offering_id FROM subject_offerings WHERE subject_id = %s AND dept_id = %s AND semester = %s",
-                (subject_id, dept_id, semester)
-            )
-            offering = cursor.fetchone()
-            if not offering: return None
-            offering_id = offering['offering_id']
-
-            # Then, find the assignment_id
-            cursor.execute(
-                "SELECT assignment_id FROM faculty_assignment WHERE offering_id = %s AND faculty_id = %s AND section = %s",
-                (offering_id, faculty_id, section)
-            )
-            assignment = cursor.fetchone()
-            if not assignment: return None
-            assignment_id = assignment['assignment_id']
-            
-            # Now, find the class_session
-            session_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-
-            cursor.execute(
-                """
-                SELECT session_id
-                FROM class_sessions
-                WHERE assignment_id = %s AND session_date = %s
-                """,
-                # --- MODIFIED: Removed period_number from WHERE clause ---
-                (assignment_id, session_date)
-            )
-            session = cursor.fetchone()
-            return session['session_id'] if session else None
+            session_date = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else None
 
+            # Anchored LEFT JOINs always return one row, with NULLs from the first missing link onwards
+            query = """
+            SELECT d.dept_id, s.subject_id, fd.faculty_id, so.offering_id, fa.assignment_id, cs.session_id
+            FROM (SELECT 1) AS anchor
+            LEFT JOIN departments d ON d.dept_code = %s
+            LEFT JOIN subjects s ON s.subject_code = %s
+            LEFT JOIN faculty_details fd ON fd.user_id = %s
+            LEFT JOIN subject_offerings so
+                ON so.subject_id = s.subject_id AND so.dept_id = d.dept_id AND so.semester = %s
+            LEFT JOIN faculty_assignment fa
+                ON fa.offering_id = so.offering_id AND fa.faculty_id = fd.faculty_id AND fa.section = %s
+            LEFT JOIN class_sessions cs
+                ON cs.assignment_id = fa.assignment_id AND cs.session_date = %s
+            LIMIT 1
+            """
+            cursor.execute(query, (dept_code, subject_code, faculty_user_id, semester, section, session_date))
+            return cursor.fetchone()
         except Exception as e:
-            print(f"Error in get_class_session_by_details: {e}")
+            print(f"Error in resolve_class_assignment: {e}")
             raise
         finally:
             if cursor: cursor.close()
             if conn: conn.close()
 
+    @staticmethod
+    # --- MODIFIED: Removed period_number from signature ---
+    def get_class_session_by_details(date_str, dept_code, semester, subject_code, faculty_user_id, section):
+        """
+        Fetches an existing class_session_id based on a specific set of class details.
+        This is crucial before marking attendance.
+        """
+        resolved = AttendanceModel.resolve_class_assignment(
+            dept_code, semester, subject_code, faculty_user_id, section, date_str
+        )
+        return resolved['session_id'] if resolved else None
+
     @staticmethod
     # --- MODIFIED: Removed period_number from signature ---
     def create_class_session_from_template(assignment_id, session_date_str):
@@ -163,43 +195,151 @@ class AttendanceModel:
             if conn: conn.close()
 
     @staticmethod
-    def submit_attendance_for_session(session_id, attendance_data):
+    def _validate_attendance_entries(attendance_data):
+        """
+        Validates a whole attendance list up front.
+        Returns (rows, results): rows maps student_id -> {'status', 'result'} for entries that passed,
+        results holds one accept/reject record per input entry, in input order.
+        """
+        results = []
+        rows = {}
+        for index, entry in enumerate(attendance_data):
+            student_id = entry.get('student_id') if isinstance(entry, dict) else None
+            status = entry.get('status') if isinstance(entry, dict) else None
+            result = {"index": index, "student_id": student_id, "accepted": False}
+            results.append(result)
+
+            if isinstance(student_id, str) and student_id.strip().isdigit():
+                student_id = int(student_id)
+            if isinstance(student_id, bool) or not isinstance(student_id, int) or student_id <= 0:
+                result["error"] = "Missing or invalid 'student_id'."
+                continue
+            if status not in ATTENDANCE_STATUSES:
+                result["error"] = f"Invalid 'status'. Must be one of: {', '.join(ATTENDANCE_STATUSES)}."
+                continue
+
+            if student_id in rows:
+                # Last entry for a student wins; the earlier one is reported as superseded
+                earlier = rows[student_id]['result']
+                earlier["accepted"] = False
+                earlier["error"] = f"Superseded by a later entry (index {index}) for the same student."
+            result["student_id"] = student_id
+            result["accepted"] = True
+            rows[student_id] = {'status': status, 'result': result}
+        return rows, results
+
+    @staticmethod
+    def submit_attendance_for_session(session_id, attendance_data, chunk_size=ATTENDANCE_UPSERT_CHUNK_SIZE):
         """
         Submits/updates attendance for multiple students for a given class session.
         attendance_data is a list of {'student_id': <id>, 'status': 'present'/'absent'}
+        The list is validated as a whole (including one lookup for unknown students),
+        then written with multi-row UPSERTs of up to chunk_size rows in one transaction.
+        Returns {"accepted": n, "rejected": n, "results": [per-entry accept/reject]}.
         """
+        rows, results = AttendanceModel._validate_attendance_entries(attendance_data)
+
         conn = None
         cursor = None
         try:
             conn = get_db_connection()
             cursor = conn.cursor()
 
-            processed_count = 0
-            for entry in attendance_data:
-                student_id = entry.get('student_id')
-                status = entry.get('status')
-                if not student_id or not status:
-                    print(f"Skipping invalid attendance entry: {entry}")
-                    continue
-
-                # UPSERT logic for attendance: insert or update if exists
-                query = """
-                INSERT INTO attendance (session_id, student_id, status)
-                VALUES (%s, %s, %s)
-                ON DUPLICATE KEY UPDATE status = VALUES(status)
-                """
-                cursor.execute(query, (session_id, student_id, status))
-                processed_count += 1
+            if rows:
+                # Reject students that don't exist instead of failing the whole statement on the FK
+                student_ids = list(rows.keys())
+                placeholders = ", ".join(["%s"] * len(student_ids))
+                cursor.execute(
+                    f"SELECT student_id FROM student_details WHERE student_id IN ({placeholders})",
+                    tuple(student_ids)
+                )
+                known_ids = {row[0] for row in cursor.fetchall()}
+                for student_id in student_ids:
+                    if student_id not in known_ids:
+                        result = rows.pop(student_id)['result']
+                        result["accepted"] = False
+                        result["error"] = "Student not found."
+
+            # Previous statuses drive the attendance_summary deltas; FOR UPDATE keeps them stable until commit
+            previous = {}
+            if rows:
+                student_ids = list(rows.keys())
+                placeholders = ", ".join(["%s"] * len(student_ids))
+                cursor.execute(
+                    f"SELECT student_id, status FROM attendance WHERE session_id = %s AND student_id IN ({placeholders}) FOR UPDATE",
+                    (session_id, *student_ids)
+                )
+                previous = dict(cursor.fetchall())
+
+            # UPSERT logic for attendance: insert or update if exists, many rows per statement
+            items = list(rows.items())
+            for start in range(0, len(items), chunk_size):
+                chunk = items[start:start + chunk_size]
+                query = (
+                    "INSERT INTO attendance (session_id, student_id, status) VALUES "
+                    + ", ".join(["(%s, %s, %s)"] * len(chunk))
+                    + " ON DUPLICATE KEY UPDATE status = VALUES(status)"
+                )
+                params = []
+                for student_id, row in chunk:
+                    params.extend((session_id, student_id, row['status']))
+                cursor.execute(query, tuple(params))
+
+            # Keep attendance_summary in step: a new record adds a session, a status flip moves a present
+            deltas = []
+            for student_id, row in items:
+                old_status = previous.get(student_id)
+                total_delta = 0 if old_status else 1
+                present_delta = (row['status'] == 'present') - (old_status == 'present')
+                if total_delta or present_delta:
+                    deltas.append((student_id, total_delta, present_delta))
+            if deltas:
+                AttendanceModel._apply_summary_deltas(cursor, session_id, deltas, chunk_size)
             conn.commit()
-            return processed_count
+
+            accepted = sum(1 for r in results if r["accepted"])
+            return {"accepted": accepted, "rejected": len(results) - accepted, "results": results}
         except Exception as e:
             print(f"Error in submit_attendance_for_session: {e}")
-            conn.rollback() # Rollback if any part of the batch fails
+            if conn: conn.rollback() # Rollback if any part of the batch fails
             raise
         finally:
             if cursor: cursor.close()
             if conn: conn.close()
 
+    @staticmethod
+    def _apply_summary_deltas(cursor, session_id, deltas, chunk_size=ATTENDANCE_UPSERT_CHUNK_SIZE):
+        """
+        Adds (student_id, total_delta, present_delta) to attendance_summary for the session's offering.
+        Runs on the caller's cursor so it commits or rolls back together with the attendance rows.
+        """
+        cursor.execute(
+            """
+            SELECT fa.offering_id
+            FROM class_sessions cs
+            JOIN faculty_assignment fa ON cs.assignment_id = fa.assignment_id
+            WHERE cs.session_id = %s
+            """,
+            (session_id,)
+        )
+        result = cursor.fetchone()
+        if not result:
+            return
+        offering_id = result[0]
+        for start in range(0, len(deltas), chunk_size):
+            chunk = deltas[start:start + chunk_size]
+            query = (
+                "INSERT INTO attendance_summary (student_id, offering_id, total_sessions, present_sessions) VALUES "
+                + ", ".join(["(%s, %s, %s, %s)"] * len(chunk))
+                + " ON DUPLICATE KEY UPDATE"
+                " total_sessions = total_sessions + VALUES(total_sessions),"
+                " present_sessions = present_sessions + VALUES(present_sessions)"
+            )
+            params = []
+            for student_id, total_delta, present_delta in chunk:
+                params.extend((student_id, offering_id, total_delta, present_delta))
+            cursor.execute(query, tuple(params))
+
     @staticmethod
     def get_student_ids_for_section(dept_id, semester, section):
         """
@@ -230,50 +370,74 @@ class AttendanceModel:
 
 
     @staticmethod
-    def get_attendance_history_for_class(dept_code, semester, section, subject_code=None, start_date=None, end_date=None):
+    def _attendance_history_query(dept_code, semester, section, subject_code=None, start_date=None, end_date=None,
+                                  before_date=None, before_session_id=None, limit=None):
+        """
+        Builds the class history query, newest first, ordered by (session_date, session_id).
+        Keyset pagination: pass the last row's session_date/session_id as before_date/before_session_id.
+        Returns (query, params), or (None, None) if the department doesn't exist.
         """
-        Fetches attendance records (class_sessions) for a class.
+        ids = AttendanceModel._get_entity_ids(
+            dept_code=dept_code,
+            subject_code=subject_code # subject_code is optional here
+        )
+        if 'dept_id' not in ids:
+            return None, None
+
+        dept_id = ids['dept_id']
+        subject_id = ids.get('subject_id')
+
+        query = """
+        SELECT cs.session_id, cs.session_date, cs.day_of_week, s.subject_code, s.subject_name,fd.name AS faculty_name,fa.section
+        FROM class_sessions cs
+        JOIN faculty_assignment fa ON cs.assignment_id = fa.assignment_id
+        JOIN subject_offerings so ON fa.offering_id = so.offering_id
+        JOIN subjects s ON so.subject_id = s.subject_id
+        JOIN faculty_details fd ON fa.faculty_id = fd.faculty_id
+        WHERE so.dept_id = %s AND so.semester = %s AND fa.section = %s
+        """
+        params = [dept_id, semester, section]
+
+        if subject_id:
+            query += " AND s.subject_id = %s"
+            params.append(subject_id)
+        if start_date:
+            query += " AND cs.session_date >= %s"
+            params.append(start_date)
+        if end_date:
+            query += " AND cs.session_date <= %s"
+            params.append(end_date)
+        if before_date and before_session_id:
+            query += " AND (cs.session_date < %s OR (cs.session_date = %s AND cs.session_id < %s))"
+            params.extend([before_date, before_date, before_session_id])
+
+        # --- MODIFIED: Removed period_number from ORDER BY ---
+        # session_id breaks ties so the order (and the keyset cursor) is total
+        query += " ORDER BY cs.session_date DESC, cs.session_id DESC"
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        return query, tuple(params)
+
+    @staticmethod
+    def get_attendance_history_for_class(dept_code, semester, section, subject_code=None, start_date=None, end_date=None,
+                                         before_date=None, before_session_id=None, limit=None):
+        """
+        Fetches attendance records (class_sessions) for a class, newest first.
+        With limit, returns one keyset page starting after (before_date, before_session_id).
         """
         conn = None
         cursor = None
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(dictionary=True)
-
-            ids = AttendanceModel._get_entity_ids(
-                dept_code=dept_code,
-                subject_code=subject_code # subject_code is optional here
+            query, params = AttendanceModel._attendance_history_query(
+                dept_code, semester, section, subject_code, start_date, end_date,
+                before_date, before_session_id, limit
             )
-            if 'dept_id' not in ids:
+            if query is None:
                 return []
-
-            dept_id = ids['dept_id']
-            subject_id = ids.get('subject_id')
-
-            query = """
-            SELECT cs.session_id, cs.session_date, cs.day_of_week, s.subject_code, s.subject_name,fd.name AS faculty_name,fa.section
-            FROM class_sessions cs
-            JOIN faculty_assignment fa ON cs.assignment_id = fa.assignment_id
-            JOIN subject_offerings so ON fa.offering_id = so.offering_id
-            JOIN subjects s ON so.subject_id = s.subject_id
-            JOIN faculty_details fd ON fa.faculty_id = fd.faculty_id
-            WHERE so.dept_id = %s AND so.semester = %s AND fa.section = %s
-            """
-            params = [dept_id, semester, section]
-
-            if subject_id:
-                query += " AND s.subject_id = %s"
-                params.append(subject_id)
-            if start_date:
-                query += " AND cs.session_date >= %s"
-                params.append(start_date)
-            if end_date:
-                query += " AND cs.session_date <= %s"
-                params.append(end_date)
-
-            # --- MODIFIED: Removed period_number from ORDER BY ---
-            query += " ORDER BY cs.session_date DESC"
-            cursor.execute(query, tuple(params))
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(query, params)
             return cursor.fetchall()
         except Exception as e:
             print(f"Error in get_attendance_history_for_class: {e}")
@@ -282,6 +446,46 @@ class AttendanceModel:
             if cursor: cursor.close()
             if conn: conn.close()
 
+    @staticmethod
+    def iter_attendance_history_for_class(dept_code, semester, section, subject_code=None, start_date=None, end_date=None,
+                                          before_date=None, before_session_id=None, limit=None,
+                                          batch_size=ATTENDANCE_STREAM_BATCH_SIZE):
+        """
+        Generator over the same rows as get_attendance_history_for_class, read from a
+        server-side (unbuffered) cursor batch_size rows at a time, so memory stays constant
+        however long the history is. Uses its own pooled connection, which is held until
+        the generator is exhausted or closed.
+        """
+        query, params = AttendanceModel._attendance_history_query(
+            dept_code, semester, section, subject_code, start_date, end_date,
+            before_date, before_session_id, limit
+        )
+        if query is None:
+            return
+        conn = get_streaming_connection()
+        cursor = None
+        exhausted = False
+        try:
+            cursor = conn.cursor(dictionary=True, buffered=False)
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    exhausted = True
+                    break
+                for row in rows:
+                    yield row
+        except Exception as e:
+            print(f"Error in iter_attendance_history_for_class: {e}")
+            raise
+        finally:
+            if exhausted:
+                cursor.close()
+                conn.close()
+            else:
+                # Abandoned mid-result (client went away): drop the connection rather than drain it
+                conn.invalidate()
+
     @staticmethod
     def get_attendance_details_for_session(session_id):
         """
@@ -313,20 +517,33 @@ class AttendanceModel:
     def update_single_attendance_status(attendance_id, new_status):
         """
         Updates the status of a single attendance record.
+        A status flip is applied to attendance_summary in the same transaction.
         """
         conn = None
         cursor = None
         try:
             conn = get_db_connection()
             cursor = conn.cursor()
+            cursor.execute(
+                "SELECT session_id, student_id, status FROM attendance WHERE attendance_id = %s FOR UPDATE",
+                (attendance_id,)
+            )
+            existing = cursor.fetchone()
+            if not existing:
+                return False
+            session_id, student_id, old_status = existing
+
             query = """
             UPDATE attendance
             SET status = %s
             WHERE attendance_id = %s
             """
             cursor.execute(query, (new_status, attendance_id))
+            present_delta = (new_status == 'present') - (old_status == 'present')
+            if present_delta:
+                AttendanceModel._apply_summary_deltas(cursor, session_id, [(student_id, 0, present_delta)])
             conn.commit()
-            return cursor.rowcount > 0 # Return True if updated, False otherwise
+            return True
         except Exception as e:
             print(f"Error in update_single_attendance_status: {e}")
             conn.rollback()
@@ -339,6 +556,8 @@ class AttendanceModel:
     def get_student_overall_attendance(student_user_id):
         """
         Calculates overall attendance percentage for a student across all their subjects.
+        Reads the maintained attendance_summary (primary-key range on student_id)
+        instead of aggregating the student's whole attendance history.
         """
         conn = None
         cursor = None
@@ -353,13 +572,11 @@ class AttendanceModel:
             student_id = ids['student_id']
 
             query = """
-            SELECT COUNT(a.attendance_id) AS total_sessions, SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) AS present_sessions, s.subject_code, s.subject_name, so.semester
-            FROM attendance a
-            JOIN class_sessions cs ON a.session_id = cs.session_id
-            JOIN faculty_assignment fa ON cs.assignment_id = fa.assignment_id
-            JOIN subject_offerings so ON fa.offering_id = so.offering_id
+            SELECT CAST(SUM(att.total_sessions) AS SIGNED) AS total_sessions, CAST(SUM(att.present_sessions) AS SIGNED) AS present_sessions, s.subject_code, s.subject_name, so.semester
+            FROM attendance_summary att
+            JOIN subject_offerings so ON att.offering_id = so.offering_id
             JOIN subjects s ON so.subject_id = s.subject_id
-            WHERE a.student_id = %s
+            WHERE att.student_id = %s AND att.total_sessions > 0
             GROUP BY s.subject_id, so.semester
             ORDER BY so.semester, s.subject_name
             """
@@ -377,4 +594,223 @@ class AttendanceModel:
             raise
         finally:
             if cursor: cursor.close()
-            if conn: conn.close()
\ No newline at end of file
+            if conn: conn.close()
+
+    @staticmethod
+    def get_section_attendance_matrix(dept_code, semester, section, subject_code, start_date=None, end_date=None,
+                                      shortage_threshold=75.0):
+        """
+        Builds the students x sessions attendance matrix of one subject for a section.
+        All attendance is fetched with one query and pivoted with NumPy: cells hold
+        MATRIX_PRESENT (1), MATRIX_ABSENT (0) or MATRIX_NOT_RECORDED (-1).
+        Percentages are present / recorded sessions; students below shortage_threshold are flagged.
+        Returns None if the department or subject doesn't exist.
+        """
+        ids = AttendanceModel._get_entity_ids(dept_code=dept_code, subject_code=subject_code)
+        if 'dept_id' not in ids or 'subject_id' not in ids:
+            return None
+        students = AttendanceModel.get_student_ids_for_section(ids['dept_id'], semester, section)
+
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            # One row per (session, student) record; sessions with no records yet still appear once
+            query = """
+            SELECT cs.session_id, cs.session_date, a.student_id, a.status
+            FROM class_sessions cs
+            JOIN faculty_assignment fa ON cs.assignment_id = fa.assignment_id
+            JOIN subject_offerings so ON fa.offering_id = so.offering_id
+            LEFT JOIN attendance a ON a.session_id = cs.session_id
+            WHERE so.dept_id = %s AND so.semester = %s AND so.subject_id = %s AND fa.section = %s
+            """
+            params = [ids['dept_id'], semester, ids['subject_id'], section]
+            if start_date:
+                query += " AND cs.session_date >= %s"
+                params.append(start_date)
+            if end_date:
+                query += " AND cs.session_date <= %s"
+                params.append(end_date)
+            query += " ORDER BY cs.session_date, cs.session_id"
+            cursor.execute(query, tuple(params))
+            records = pd.DataFrame(cursor.fetchall(), columns=['session_id', 'session_date', 'student_id', 'status'])
+        except Exception as e:
+            print(f"Error in get_section_attendance_matrix: {e}")
+            raise
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
+        sessions = records.drop_duplicates('session_id')[['session_id', 'session_date']]
+        session_ids = sessions['session_id'].to_numpy()
+        student_ids = np.array([s['student_id'] for s in students], dtype=np.int64)
+
+        matrix = np.full((len(student_ids), len(session_ids)), MATRIX_NOT_RECORDED, dtype=np.int8)
+        marked = records.dropna(subset=['student_id'])
+        if len(marked) and len(student_ids):
+            # Map ids to matrix positions; records of students no longer in the section are dropped
+            student_order = np.argsort(student_ids)
+            student_pos = np.searchsorted(student_ids, marked['student_id'].to_numpy(dtype=np.int64), sorter=student_order)
+            student_pos = np.clip(student_pos, 0, len(student_ids) - 1)
+            rows = student_order[student_pos]
+            in_section = student_ids[rows] == marked['student_id'].to_numpy(dtype=np.int64)
+            cols = pd.Index(session_ids).get_indexer(marked['session_id'])
+            codes = np.where(marked['status'].to_numpy() == 'present', MATRIX_PRESENT, MATRIX_ABSENT).astype(np.int8)
+            matrix[rows[in_section], cols[in_section]] = codes[in_section]
+
+        present = (matrix == MATRIX_PRESENT).sum(axis=1)
+        recorded = (matrix != MATRIX_NOT_RECORDED).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentage = np.where(recorded > 0, np.round(present * 100.0 / recorded, 2), np.nan)
+        shortage = (recorded > 0) & (percentage < shortage_threshold)
+
+        return {
+            "sessions": [
+                {"session_id": int(sid), "session_date": date.isoformat() if hasattr(date, 'isoformat') else date}
+                for sid, date in zip(session_ids, sessions['session_date'])
+            ],
+            "students": [
+                {
+                    "student_id": student['student_id'],
+                    "name": student['name'],
+                    "usn": student['usn'],
+                    "present_sessions": int(present[i]),
+                    "recorded_sessions": int(recorded[i]),
+                    "attendance_percentage": None if np.isnan(percentage[i]) else float(percentage[i]),
+                    "shortage": bool(shortage[i]),
+                }
+                for i, student in enumerate(students)
+            ],
+            "matrix": matrix.tolist(),
+            "shortage_threshold": shortage_threshold,
+            "shortage_count": int(shortage.sum()),
+        }
+
+    # --- attendance_summary maintenance ---
+
+    # (student_id, offering_id, total_sessions, present_sessions) recomputed from the attendance rows
+    _SUMMARY_SOURCE_QUERY = """
+        SELECT a.student_id, fa.offering_id,
+               COUNT(*) AS total_sessions,
+               SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) AS present_sessions
+        FROM attendance a
+        JOIN class_sessions cs ON a.session_id = cs.session_id
+        JOIN faculty_assignment fa ON cs.assignment_id = fa.assignment_id
+        {where}
+        GROUP BY a.student_id, fa.offering_id
+    """
+
+    @staticmethod
+    def rebuild_attendance_summary(student_id=None):
+        """
+        Recomputes attendance_summary from the attendance table (for one student, or everyone)
+        in a single transaction. Returns the number of summary rows written.
+        """
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            where, params = ("WHERE a.student_id = %s", (student_id,)) if student_id else ("", ())
+            if student_id:
+                cursor.execute("DELETE FROM attendance_summary WHERE student_id = %s", (student_id,))
+            else:
+                cursor.execute("DELETE FROM attendance_summary")
+            cursor.execute(
+                "INSERT INTO attendance_summary (student_id, offering_id, total_sessions, present_sessions) "
+                + AttendanceModel._SUMMARY_SOURCE_QUERY.format(where=where),
+                params
+            )
+            written = cursor.rowcount
+            if not student_id:
+                # Marks the table as populated (see ensure_attendance_summary_built)
+                cursor.execute(
+                    """
+                    INSERT INTO job_watermarks (job_name, watermark) VALUES (%s, NOW())
+                    ON DUPLICATE KEY UPDATE watermark = VALUES(watermark)
+                    """,
+                    (SUMMARY_BUILT_MARKER,)
+                )
+            conn.commit()
+            return written
+        except Exception as e:
+            print(f"Error in rebuild_attendance_summary: {e}")
+            if conn: conn.rollback()
+            raise
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
+    @staticmethod
+    def is_attendance_summary_built():
+        """True once attendance_summary has been fully built from the attendance table."""
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM job_watermarks WHERE job_name = %s", (SUMMARY_BUILT_MARKER,))
+            return cursor.fetchone() is not None
+        except Exception as e:
+            print(f"Error in is_attendance_summary_built: {e}")
+            raise
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
+    @staticmethod
+    def ensure_attendance_summary_built():
+        """
+        Backfills attendance_summary the first time it exists (it only receives deltas from new
+        submissions, so readers and the shortage alert job would otherwise see partial counts).
+        Returns True if a rebuild ran.
+        """
+        if AttendanceModel.is_attendance_summary_built():
+            return False
+        written = AttendanceModel.rebuild_attendance_summary()
+        print(f"Backfilled attendance_summary: {written} rows written.")
+        return True
+
+    @staticmethod
+    def verify_attendance_summary():
+        """
+        Compares attendance_summary with a fresh aggregate of the attendance table.
+        Returns a list of drifted rows: {student_id, offering_id, expected_total, expected_present,
+        actual_total, actual_present} (missing rows on either side count as 0).
+        """
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(AttendanceModel._SUMMARY_SOURCE_QUERY.format(where=""))
+            expected = {
+                (row['student_id'], row['offering_id']): (int(row['total_sessions']), int(row['present_sessions']))
+                for row in cursor.fetchall()
+            }
+            cursor.execute("SELECT student_id, offering_id, total_sessions, present_sessions FROM attendance_summary")
+            actual = {
+                (row['student_id'], row['offering_id']): (row['total_sessions'], row['present_sessions'])
+                for row in cursor.fetchall()
+            }
+            drift = []
+            for key in sorted(expected.keys() | actual.keys()):
+                expected_counts = expected.get(key, (0, 0))
+                actual_counts = actual.get(key, (0, 0))
+                if expected_counts != actual_counts:
+                    drift.append({
+                        "student_id": key[0],
+                        "offering_id": key[1],
+                        "expected_total": expected_counts[0],
+                        "expected_present": expected_counts[1],
+                        "actual_total": actual_counts[0],
+                        "actual_present": actual_counts[1],
+                    })
+            return drift
+        except Exception as e:
+            print(f"Error in verify_attendance_summary: {e}")
+            raise
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
@@ -1,6 +1,13 @@
 # backend/models/circulars_model.py
 from utils.db_connection import get_db_connection
 from models.attendance_model import AttendanceModel 
+from config import Config
+from utils.entity_cache import entity_cache, cache_entity
+from utils.circular_feed_cache import circular_feed_cache, invalidate_circular_feeds
+from utils.fulltext import trim_snippet
+from utils.fileupload_utils import acquire_file_reference, release_file_reference
+
+CURSOR_TIME_FORMAT = '%Y-%m-%d %H:%M:%S' # posted_at as it appears in next_cursor
 
 class CircularsModel:
     @staticmethod
@@ -37,8 +44,11 @@ class CircularsModel:
             VALUES (%s, %s, %s, %s, %s, %s)
             """
             cursor.execute(query, (faculty_id, title, content, audience, dept_id, attachment_path))
+            circular_id = cursor.lastrowid
+            acquire_file_reference(cursor, attachment_path)
             conn.commit()
-            return cursor.lastrowid
+            invalidate_circular_feeds(audience, dept_id)
+            return circular_id
         except Exception as e:
             print(f"Error in create_circular: {e}")
             conn.rollback()
@@ -111,10 +121,128 @@ class CircularsModel:
             if conn: conn.close()
             
     @staticmethod
-    def get_circulars_for_user(user_id, role):
+    def get_faculty_dept_id(user_id):
+        """Department of a faculty member, served from the entity cache when possible."""
+        dept_id = entity_cache.get(('faculty_dept', user_id))
+        if dept_id is not None:
+            return dept_id
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT dept_id FROM faculty_details WHERE user_id = %s", (user_id,))
+            result = cursor.fetchone()
+            if result and result[0] is not None:
+                cache_entity(('faculty_dept', user_id), result[0])
+                return result[0]
+            return None
+        except Exception as e:
+            print(f"Error in get_faculty_dept_id: {e}")
+            raise
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
+    @staticmethod
+    def get_feed_segment(user_id, role):
+        """
+        Returns the audience segment (role, dept_id) whose circulars feed the user sees.
+        Every user in a segment sees the same feed, so feed pages are cached per segment.
+        """
+        if role == 'student':
+            return ('students', AttendanceModel._get_entity_ids(student_user_id=user_id).get('student_dept_id'))
+        if role == 'faculty':
+            return ('faculty', CircularsModel.get_faculty_dept_id(user_id))
+        return ('admin', None)
+
+    @staticmethod
+    def _segment_filter(segment):
+        """SQL (starting with AND) restricting circulars c to those visible to an audience segment."""
+        role, dept_id = segment
+        if role not in ('students', 'faculty'):
+            return "", [] # Admins see every circular
+        where_clauses = ["c.audience IN ('all', %s)"]
+        params = [role]
+        if dept_id:
+            where_clauses.append("(c.audience = 'specific_dept' AND c.dept_id = %s)")
+            params.append(dept_id)
+        return " AND (" + " OR ".join(where_clauses) + ")", params
+
+    @staticmethod
+    def search_circulars(segment, boolean_query, limit):
         """
-        Fetches circulars relevant to a specific user, including attachment path.
+        Circulars visible to the segment whose title/content or attachment text match a FULLTEXT
+        BOOLEAN MODE query (see utils/fulltext.py), best match first, each with its relevance score.
         """
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            query = """
+            SELECT
+                c.circular_id,
+                c.title,
+                LEFT(c.content, %s) AS snippet,
+                c.posted_at,
+                c.audience,
+                d.dept_name,
+                d.dept_code,
+                fd.name AS posted_by_faculty,
+                {score} AS score
+            FROM
+                circulars c
+            LEFT JOIN
+                departments d ON c.dept_id = d.dept_id
+            LEFT JOIN
+                faculty_details fd ON c.faculty_id = fd.faculty_id
+            {join}
+            WHERE {score}
+            """
+            segment_sql, segment_params = CircularsModel._segment_filter(segment)
+            order = " ORDER BY score DESC, c.posted_at DESC, c.circular_id DESC LIMIT %s"
+
+            # The circular itself and its attachment's extracted text have separate indexes; merge the two
+            results = {}
+            for score, join in (
+                ("MATCH(c.title, c.content) AGAINST (%s IN BOOLEAN MODE)", ""),
+                ("MATCH(dt.content) AGAINST (%s IN BOOLEAN MODE)",
+                 "JOIN document_texts dt ON dt.source_type = 'circular' AND dt.source_id = c.circular_id"),
+            ):
+                cursor.execute(
+                    query.format(score=score, join=join) + segment_sql + order,
+                    tuple([Config.CIRCULAR_SNIPPET_LENGTH + 1, boolean_query, boolean_query] + segment_params + [limit])
+                )
+                for row in cursor.fetchall():
+                    if row['circular_id'] not in results or row['score'] > results[row['circular_id']]['score']:
+                        results[row['circular_id']] = row
+
+            rows = sorted(results.values(), key=lambda r: (r['score'], r['posted_at'], r['circular_id']), reverse=True)[:limit]
+            for row in rows:
+                row['snippet'] = trim_snippet(row['snippet'], Config.CIRCULAR_SNIPPET_LENGTH)
+            return rows
+        except Exception as e:
+            print(f"Error in search_circulars: {e}")
+            raise
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
+    @staticmethod
+    def get_circular_feed(segment, before_posted_at=None, before_id=None, limit=None):
+        """
+        One page of a segment's circulars, newest first, keyset-paginated on (posted_at, circular_id).
+        List rows carry a snippet of the content; the full body comes from get_circular_by_id.
+        Returns {"circulars": [...], "next_cursor": {"before_posted_at", "before_id"} or None}.
+        Pages are cached per segment and dropped when a circular they could contain changes.
+        """
+        limit = limit or Config.CIRCULAR_FEED_PAGE_SIZE
+        key = (segment[0], segment[1], before_posted_at, before_id, limit)
+        page = circular_feed_cache.get(key)
+        if page is not None:
+            return page
+
         conn = None
         cursor = None
         try:
@@ -125,7 +253,7 @@ class CircularsModel:
             SELECT
                 c.circular_id,
                 c.title,
-                c.content,
+                LEFT(c.content, %s) AS snippet,
                 c.posted_at,
                 c.audience,
                 d.dept_name,
@@ -140,44 +268,49 @@ class CircularsModel:
                 faculty_details fd ON c.faculty_id = fd.faculty_id
             WHERE 1=1
             """
-            params = []
-            
-            where_clauses = ["c.audience = 'all'"]
-
-            if role == 'student':
-                student_ids = AttendanceModel._get_entity_ids(student_user_id=user_id)
-                student_dept_id = student_ids.get('student_dept_id')
+            params = [Config.CIRCULAR_SNIPPET_LENGTH + 1]
 
-                where_clauses.append("c.audience = 'students'")
-                if student_dept_id:
-                    where_clauses.append("(c.audience = 'specific_dept' AND c.dept_id = %s)")
-                    params.append(student_dept_id)
-            
-            elif role == 'faculty':
-                faculty_ids = AttendanceModel._get_entity_ids(faculty_user_id=user_id)
-                faculty_dept_id = faculty_ids.get('dept_id')
-                
-                where_clauses.append("c.audience = 'faculty'")
-                if faculty_dept_id:
-                    where_clauses.append("(c.audience = 'specific_dept' AND c.dept_id = %s)")
-                    params.append(faculty_dept_id)
-
-            elif role == 'admin':
-                where_clauses.append("c.audience IN ('students', 'faculty', 'specific_dept')")
+            segment_sql, segment_params = CircularsModel._segment_filter(segment)
+            query += segment_sql
+            params.extend(segment_params)
 
+            if before_posted_at is not None and before_id is not None:
+                query += " AND (c.posted_at < %s OR (c.posted_at = %s AND c.circular_id < %s))"
+                params.extend([before_posted_at, before_posted_at, before_id])
 
-            query += " AND (" + " OR ".join(where_clauses) + ")"
-            query += " ORDER BY c.posted_at DESC"
+            query += " ORDER BY c.posted_at DESC, c.circular_id DESC LIMIT %s"
+            params.append(limit + 1) # One extra row tells us whether there is a next page
 
             cursor.execute(query, tuple(params))
-            return cursor.fetchall()
+            rows = cursor.fetchall()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            for row in rows:
+                row['snippet'] = trim_snippet(row['snippet'], Config.CIRCULAR_SNIPPET_LENGTH)
+
+            next_cursor = None
+            if has_more:
+                last = rows[-1]
+                next_cursor = {'before_posted_at': last['posted_at'].strftime(CURSOR_TIME_FORMAT),
+                               'before_id': last['circular_id']}
+            page = {'circulars': rows, 'next_cursor': next_cursor}
+            circular_feed_cache.set(key, page)
+            return page
         except Exception as e:
-            print(f"Error in get_circulars_for_user: {e}")
+            print(f"Error in get_circular_feed: {e}")
             raise
         finally:
             if cursor: cursor.close()
             if conn: conn.close()
 
+    @staticmethod
+    def get_circulars_for_user(user_id, role, before_posted_at=None, before_id=None, limit=None):
+        """
+        Fetches one page of the circulars relevant to a specific user (see get_circular_feed).
+        """
+        segment = CircularsModel.get_feed_segment(user_id, role)
+        return CircularsModel.get_circular_feed(segment, before_posted_at, before_id, limit)
+
     @staticmethod
     def get_circular_by_id(circular_id):
         """Fetches a single circular by its ID, including attachment path."""
@@ -223,14 +356,23 @@ class CircularsModel:
         try:
             conn = get_db_connection()
             cursor = conn.cursor()
+            cursor.execute("SELECT audience, dept_id, attachment_path FROM circulars WHERE circular_id = %s", (circular_id,))
+            previous = cursor.fetchone()
             query = """
             UPDATE circulars
             SET title = %s, content = %s, audience = %s, dept_id = %s, attachment_path = %s
             WHERE circular_id = %s
             """
             cursor.execute(query, (title, content, audience, dept_id, attachment_path, circular_id))
+            updated = cursor.rowcount > 0
+            if previous and previous[2] != attachment_path:
+                release_file_reference(cursor, previous[2])
+                acquire_file_reference(cursor, attachment_path)
             conn.commit()
-            return cursor.rowcount > 0
+            if previous:
+                invalidate_circular_feeds(previous[0], previous[1]) # Feeds it is leaving
+            invalidate_circular_feeds(audience, dept_id)
+            return updated
         except Exception as e:
             print(f"Error in update_circular: {e}")
             conn.rollback()
@@ -247,9 +389,17 @@ class CircularsModel:
         try:
             conn = get_db_connection()
             cursor = conn.cursor()
+            cursor.execute("SELECT audience, dept_id, attachment_path FROM circulars WHERE circular_id = %s", (circular_id,))
+            previous = cursor.fetchone()
             cursor.execute("DELETE FROM circulars WHERE circular_id = %s", (circular_id,))
+            deleted = cursor.rowcount > 0
+            cursor.execute("DELETE FROM document_texts WHERE source_type = 'circular' AND source_id = %s", (circular_id,))
+            if deleted:
+                release_file_reference(cursor, previous[2])
             conn.commit()
-            return cursor.rowcount > 0
+            if previous:
+                invalidate_circular_feeds(previous[0], previous[1])
+            return deleted
         except Exception as e:
             print(f"Error in delete_circular: {e}")
             conn.rollback()
@@ -260,30 +410,5 @@ class CircularsModel:
 
     @staticmethod
     def get_recent_circulars(limit=5):
-        """Fetches a limited number of most recent circulars, for general view, including attachment path."""
-        conn = None
-        cursor = None
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor(dictionary=True)
-            query = """
-            SELECT
-                c.circular_id,
-                c.title,
-                c.posted_at,
-                c.audience,
-                d.dept_name,
-                c.attachment_path # Include attachment path
-            FROM circulars c
-            LEFT JOIN departments d ON c.dept_id = d.dept_id
-            ORDER BY c.posted_at DESC
-            LIMIT %s
-            """
-            cursor.execute(query, (limit,))
-            return cursor.fetchall()
-        except Exception as e:
-            print(f"Error in get_recent_circulars: {e}")
-            raise
-        finally:
-            if cursor: cursor.close()
-            if conn: conn.close()
\ No newline at end of file
+        """Most recent circulars for the general view: the first page of the (cached) all-circulars feed."""
+        return CircularsModel.get_circular_feed(('admin', None), limit=limit)['circulars']
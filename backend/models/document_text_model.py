@@ -0,0 +1,168 @@
+# backend/models/document_text_model.py
+import json
+from utils.db_connection import get_db_connection
+from utils.fulltext import trim_snippet
+
+# Text extracted from notes' files and circulars' attachments (see utils/document_indexer.py).
+# One row per (source_type, source_id); file_url records which file the row describes, so a
+# result extracted from a file that has since been replaced is discarded.
+SOURCE_TYPES = ('note', 'circular')
+
+class DocumentTextModel:
+    @staticmethod
+    def mark_pending(source_type, source_id, file_url):
+        """Records that the source's (new) file is waiting to be extracted, clearing any old result."""
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT INTO document_texts (source_type, source_id, file_url, status)
+                VALUES (%s, %s, %s, 'pending')
+                ON DUPLICATE KEY UPDATE
+                    file_url = VALUES(file_url), status = 'pending', page_count = NULL,
+                    metadata = NULL, content = NULL, error = NULL, extracted_at = NULL
+                """,
+                (source_type, source_id, file_url)
+            )
+            conn.commit()
+        except Exception as e:
+            print(f"Error in mark_pending: {e}")
+            conn.rollback()
+            raise
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
+    @staticmethod
+    def save_result(source_type, source_id, file_url, result):
+        """
+        Stores an extract_document() result. Returns False if the source was deleted or its
+        file replaced meanwhile (the result is then stale and dropped).
+        """
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE document_texts
+                SET status = %s, page_count = %s, metadata = %s, content = %s, error = %s,
+                    extracted_at = NOW()
+                WHERE source_type = %s AND source_id = %s AND file_url = %s
+                """,
+                (result['status'], result['page_count'], json.dumps(result['metadata'] or {}, default=str),
+                 result['content'], result['error'], source_type, source_id, file_url)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+        except Exception as e:
+            print(f"Error in save_result: {e}")
+            conn.rollback()
+            raise
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
+    @staticmethod
+    def delete_document_text(source_type, source_id):
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                "DELETE FROM document_texts WHERE source_type = %s AND source_id = %s",
+                (source_type, source_id)
+            )
+            conn.commit()
+        except Exception as e:
+            print(f"Error in delete_document_text: {e}")
+            conn.rollback()
+            raise
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
+    @staticmethod
+    def get_preview(source_type, source_id, length):
+        """
+        Extraction status, page count, metadata and the first `length` characters of a
+        source's text, or None if nothing has been recorded for it.
+        """
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(
+                """
+                SELECT status, page_count, metadata, LEFT(content, %s) AS text,
+                       CHAR_LENGTH(content) AS text_length, error, extracted_at
+                FROM document_texts
+                WHERE source_type = %s AND source_id = %s
+                """,
+                (length + 1, source_type, source_id)
+            )
+            row = cursor.fetchone()
+            if not row:
+                return None
+            row['metadata'] = json.loads(row['metadata']) if row['metadata'] else {}
+            row['truncated'] = (row['text_length'] or 0) > length
+            row['text'] = trim_snippet(row['text'], length) if row['text'] else None
+            return row
+        except Exception as e:
+            print(f"Error in get_preview: {e}")
+            raise
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
+    @staticmethod
+    def get_files_to_extract(retry_failed=False, limit=None, extractable_extensions=()):
+        """
+        Notes and circular attachments with no extracted text for their current file: never
+        extracted, left 'pending' (e.g. by a restart), 'failed' if retry_failed, or
+        'unsupported' although their extension is in extractable_extensions now (e.g. PDFs
+        recorded before pypdf was installed).
+        Returns [{"source_type", "source_id", "file_url"}], oldest first.
+        """
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            statuses = ('pending', 'failed') if retry_failed else ('pending',)
+            extensions = sorted(extractable_extensions) or ['']
+            retry_sql = (f"dt.status IN ({', '.join(['%s'] * len(statuses))})"
+                         " OR (dt.status = 'unsupported'"
+                         f" AND LOWER(SUBSTRING_INDEX(dt.file_url, '.', -1)) IN ({', '.join(['%s'] * len(extensions))}))")
+            query = f"""
+            SELECT 'note' AS source_type, n.note_id AS source_id, n.file_url
+            FROM notes n
+            LEFT JOIN document_texts dt ON dt.source_type = 'note' AND dt.source_id = n.note_id
+            WHERE n.file_url IS NOT NULL
+              AND (dt.source_id IS NULL OR dt.file_url <> n.file_url OR {retry_sql})
+            UNION ALL
+            SELECT 'circular', c.circular_id, c.attachment_path
+            FROM circulars c
+            LEFT JOIN document_texts dt ON dt.source_type = 'circular' AND dt.source_id = c.circular_id
+            WHERE c.attachment_path IS NOT NULL
+              AND (dt.source_id IS NULL OR dt.file_url <> c.attachment_path OR {retry_sql})
+            ORDER BY source_type DESC, source_id
+            """
+            params = (list(statuses) + extensions) * 2
+            if limit:
+                query += " LIMIT %s"
+                params.append(limit)
+            cursor.execute(query, tuple(params))
+            return cursor.fetchall()
+        except Exception as e:
+            print(f"Error in get_files_to_extract: {e}")
+            raise
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
@@ -1,6 +1,13 @@
 from utils.db_connection import get_db_connection
 from models.attendance_model import AttendanceModel 
 
+MAX_IA_SCORE = 100 # Assuming marks are out of 100 for now
+MARKS_UPSERT_CHUNK_SIZE = 500 # Rows per multi-row INSERT statement
+
+def _normalize_ia_name(ia_name):
+    """Key for comparing IA names the way MySQL's case-insensitive collation does."""
+    return ia_name.strip().casefold()
+
 class MarksModel:
     
     # ... keep get_ia_type_id_or_create ...
@@ -96,6 +103,123 @@ class MarksModel:
             if cursor: cursor.close()
             if conn: conn.close()
 
+    @staticmethod
+    def _validate_marks_entries(marks_entries):
+        """
+        Validates a whole marks payload up front.
+        Returns (rows, results): rows maps (student_id, normalized ia_name) -> {'ia_name', 'score',
+        'result'} for entries that passed, results holds one accept/reject record per input entry,
+        in input order. IA names are matched case-insensitively, like the column's collation.
+        """
+        results = []
+        rows = {}
+        for index, entry in enumerate(marks_entries):
+            entry = entry if isinstance(entry, dict) else {}
+            student_id = entry.get('student_id')
+            ia_name = entry.get('ia_name')
+            score = entry.get('score')
+            result = {"index": index, "student_id": student_id, "ia_name": ia_name, "accepted": False}
+            results.append(result)
+
+            if isinstance(student_id, str) and student_id.strip().isdigit():
+                student_id = int(student_id)
+            if isinstance(student_id, bool) or not isinstance(student_id, int) or student_id <= 0:
+                result["error"] = "Missing or invalid 'student_id'."
+                continue
+            if not isinstance(ia_name, str) or not ia_name.strip():
+                result["error"] = "Missing or invalid 'ia_name'."
+                continue
+            if isinstance(score, bool) or not isinstance(score, (int, float)) or not (0 <= score <= MAX_IA_SCORE):
+                result["error"] = f"Invalid 'score'. Must be a number between 0 and {MAX_IA_SCORE}."
+                continue
+
+            ia_name = ia_name.strip()
+            key = (student_id, _normalize_ia_name(ia_name))
+            if key in rows:
+                # Last entry for a student/IA pair wins; the earlier one is reported as superseded
+                earlier = rows[key]['result']
+                earlier["accepted"] = False
+                earlier["error"] = f"Superseded by a later entry (index {index}) for the same student and IA."
+            result.update({"student_id": student_id, "ia_name": ia_name, "accepted": True})
+            rows[key] = {'ia_name': ia_name, 'score': score, 'result': result}
+        return rows, results
+
+    @staticmethod
+    def bulk_update_student_marks(offering_id, marks_entries, chunk_size=MARKS_UPSERT_CHUNK_SIZE):
+        """
+        Batched marks ingestion for one subject offering.
+        Validates every entry, resolves all distinct IA names at once (creating missing ones),
+        and upserts the marks with multi-row statements in a single transaction.
+        Returns {"accepted": n, "rejected": n, "results": [per-entry accept/reject]}.
+        """
+        rows, results = MarksModel._validate_marks_entries(marks_entries)
+
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            if rows:
+                # Reject unknown students up front instead of failing the whole statement on the FK
+                student_ids = list({student_id for student_id, _ in rows})
+                placeholders = ", ".join(["%s"] * len(student_ids))
+                cursor.execute(
+                    f"SELECT student_id FROM student_details WHERE student_id IN ({placeholders})",
+                    tuple(student_ids)
+                )
+                known_ids = {row[0] for row in cursor.fetchall()}
+                for key in [k for k in rows if k[0] not in known_ids]:
+                    result = rows.pop(key)['result']
+                    result["accepted"] = False
+                    result["error"] = "Student not found."
+
+            if rows:
+                # Resolve every distinct IA name once, creating the missing ones in one statement
+                # Keyed by normalized name: the stored spelling may differ in case from the payload's
+                ia_names = {}
+                for (_, normalized), row in rows.items():
+                    ia_names.setdefault(normalized, row['ia_name'])
+                spellings = sorted(ia_names.values())
+                placeholders = ", ".join(["%s"] * len(spellings))
+                select_ia_query = f"SELECT ia_name, ia_type_id FROM internal_assessment_types WHERE ia_name IN ({placeholders})"
+                cursor.execute(select_ia_query, tuple(spellings))
+                ia_type_ids = {_normalize_ia_name(name): ia_type_id for name, ia_type_id in cursor.fetchall()}
+                new_names = [name for normalized, name in sorted(ia_names.items()) if normalized not in ia_type_ids]
+                if new_names:
+                    # IGNORE: another request may create the same IA type concurrently
+                    cursor.execute(
+                        "INSERT IGNORE INTO internal_assessment_types (ia_name) VALUES "
+                        + ", ".join(["(%s)"] * len(new_names)),
+                        tuple(new_names)
+                    )
+                    cursor.execute(select_ia_query, tuple(spellings))
+                    ia_type_ids = {_normalize_ia_name(name): ia_type_id for name, ia_type_id in cursor.fetchall()}
+
+                items = list(rows.items())
+                for start in range(0, len(items), chunk_size):
+                    chunk = items[start:start + chunk_size]
+                    query = (
+                        "INSERT INTO marks (student_id, offering_id, ia_type_id, score) VALUES "
+                        + ", ".join(["(%s, %s, %s, %s)"] * len(chunk))
+                        + " ON DUPLICATE KEY UPDATE score = VALUES(score)"
+                    )
+                    params = []
+                    for (student_id, normalized), row in chunk:
+                        params.extend((student_id, offering_id, ia_type_ids[normalized], row['score']))
+                    cursor.execute(query, tuple(params))
+            conn.commit()
+
+            accepted = sum(1 for r in results if r["accepted"])
+            return {"accepted": accepted, "rejected": len(results) - accepted, "results": results}
+        except Exception as e:
+            print(f"Error in bulk_update_student_marks: {e}")
+            if conn: conn.rollback()
+            raise
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
     @staticmethod
     def get_students_for_class_with_marks(dept_code, semester, section, subject_code):
         conn = None
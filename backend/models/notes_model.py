@@ -1,6 +1,9 @@
 # backend/models/notes_model.py
 from utils.db_connection import get_db_connection
 from datetime import datetime
+from config import Config
+from utils.fulltext import trim_snippet
+from utils.fileupload_utils import acquire_file_reference, release_file_reference
 
 class NotesModel:
     @staticmethod
@@ -36,8 +39,10 @@ class NotesModel:
             VALUES (%s, %s, %s, %s, %s)
             """
             cursor.execute(query, (offering_id, faculty_id, title, description, file_url))
+            note_id = cursor.lastrowid
+            acquire_file_reference(cursor, file_url) # Files are shared between identical uploads
             conn.commit()
-            return cursor.lastrowid
+            return note_id
         except Exception as e:
             print(f"Error in upload_new_note: {e}")
             conn.rollback()
@@ -125,6 +130,81 @@ class NotesModel:
             if cursor: cursor.close()
             if conn: conn.close()
 
+    @staticmethod
+    def search_notes(boolean_query, dept_id=None, semester=None, limit=20):
+        """
+        Notes whose title/description, file text or subject's name/code match a FULLTEXT BOOLEAN MODE
+        query (see utils/fulltext.py), best match first. dept_id/semester restrict the search to
+        one class's offerings (what a student can see). Each row carries its relevance score.
+        """
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+
+            select = """
+            SELECT
+                n.note_id,
+                n.title,
+                LEFT(n.description, %s) AS snippet,
+                n.file_url,
+                n.uploaded_at,
+                s.subject_code,
+                s.subject_name,
+                d.dept_code,
+                d.dept_name,
+                so.semester,
+                fd.name AS faculty_name,
+                {score} AS score
+            FROM
+                notes n
+            JOIN
+                subject_offerings so ON n.offering_id = so.offering_id
+            JOIN
+                subjects s ON so.subject_id = s.subject_id
+            JOIN
+                departments d ON so.dept_id = d.dept_id
+            LEFT JOIN
+                faculty_details fd ON n.faculty_id = fd.faculty_id
+            {join}
+            WHERE {score}
+            """
+            scope = ""
+            scope_params = []
+            if dept_id is not None:
+                scope = " AND so.dept_id = %s AND so.semester = %s"
+                scope_params = [dept_id, semester]
+            order = " ORDER BY score DESC, n.uploaded_at DESC, n.note_id DESC LIMIT %s"
+
+            # One index-driven query per FULLTEXT index (an index can't span tables), merged here
+            results = {}
+            for score, join in (
+                ("MATCH(n.title, n.description) AGAINST (%s IN BOOLEAN MODE)", ""),
+                ("MATCH(s.subject_name, s.subject_code) AGAINST (%s IN BOOLEAN MODE)", ""),
+                # The note file's extracted text (utils/document_indexer.py)
+                ("MATCH(dt.content) AGAINST (%s IN BOOLEAN MODE)",
+                 "JOIN document_texts dt ON dt.source_type = 'note' AND dt.source_id = n.note_id"),
+            ):
+                cursor.execute(
+                    select.format(score=score, join=join) + scope + order,
+                    tuple([Config.CIRCULAR_SNIPPET_LENGTH + 1, boolean_query, boolean_query] + scope_params + [limit])
+                )
+                for row in cursor.fetchall():
+                    if row['note_id'] not in results or row['score'] > results[row['note_id']]['score']:
+                        results[row['note_id']] = row
+
+            rows = sorted(results.values(), key=lambda r: (r['score'], r['uploaded_at'], r['note_id']), reverse=True)[:limit]
+            for row in rows:
+                row['snippet'] = trim_snippet(row['snippet'], Config.CIRCULAR_SNIPPET_LENGTH)
+            return rows
+        except Exception as e:
+            print(f"Error in search_notes: {e}")
+            raise
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
     @staticmethod
     def get_note_file_url(note_id):
         """
@@ -145,6 +225,23 @@ class NotesModel:
             if cursor: cursor.close()
             if conn: conn.close()
 
+    @staticmethod
+    def get_note_file(note_id):
+        """Returns {file_url, title} of a note, or None if it doesn't exist."""
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT file_url, title FROM notes WHERE note_id = %s", (note_id,))
+            return cursor.fetchone()
+        except Exception as e:
+            print(f"Error in get_note_file: {e}")
+            raise
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
     @staticmethod
     def delete_note_by_id(note_id):
         """
@@ -155,9 +252,15 @@ class NotesModel:
         try:
             conn = get_db_connection()
             cursor = conn.cursor()
+            cursor.execute("SELECT file_url FROM notes WHERE note_id = %s", (note_id,))
+            note = cursor.fetchone()
             cursor.execute("DELETE FROM notes WHERE note_id = %s", (note_id,))
+            deleted = cursor.rowcount > 0
+            cursor.execute("DELETE FROM document_texts WHERE source_type = 'note' AND source_id = %s", (note_id,))
+            if deleted:
+                release_file_reference(cursor, note[0])
             conn.commit()
-            return cursor.rowcount > 0
+            return deleted
         except Exception as e:
             print(f"Error in delete_note_by_id: {e}")
             conn.rollback()
@@ -255,6 +358,23 @@ class NotesModel:
             if cursor: cursor.close()
             if conn: conn.close()
     @staticmethod
+    def get_offering_dept_semester(offering_id):
+        """Returns (dept_id, semester) of an offering, or None if it doesn't exist."""
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT dept_id, semester FROM subject_offerings WHERE offering_id = %s", (offering_id,))
+            result = cursor.fetchone()
+            return (result[0], result[1]) if result else None
+        except Exception as e:
+            print(f"Error in get_offering_dept_semester: {e}")
+            raise
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+    @staticmethod
     def get_student_user_ids_for_offering(offering_id):
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
@@ -3,6 +3,9 @@
 from datetime import datetime
 from utils.db_connection import get_db_connection # <--- THIS IS THE CHANGE
 
+NOTIFICATION_INSERT_CHUNK_SIZE = 1000 # Rows per multi-row INSERT statement
+NOTIFICATION_PAGE_SIZE = 20            # Default page size for keyset-paginated reads
+
 def db_add_notification(user_id, message, notification_type):
     """Adds a new notification to the database."""
     conn = get_db_connection()
@@ -21,23 +24,73 @@ def db_add_notification(user_id, message, notification_type):
         conn.rollback()
         return False
 
-def db_get_user_notifications(user_id, include_read=False):
-    """Retrieves notifications for a specific user from the database."""
+def db_get_user_notifications(user_id, include_read=False, before_id=None, limit=NOTIFICATION_PAGE_SIZE):
+    """
+    Retrieves one page of a user's notifications, newest first.
+    Keyset pagination: pass the smallest notification_id of the previous page as before_id.
+    Served from the (user_id, notification_id) / (user_id, is_read, notification_id) indexes.
+    """
     conn = get_db_connection()
     notifications = []
     try:
         cursor = conn.cursor(dictionary=True)
-        query = "SELECT notification_id, user_id, message, notification_type, is_read, created_at FROM notifications WHERE user_id = %s"
+        query = "SELECT notification_id, user_id, type, message, related_id, is_read, created_at FROM notifications WHERE user_id = %s"
+        params = [user_id]
         if not include_read:
             query += " AND is_read = FALSE"
-        query += " ORDER BY created_at DESC"
-        cursor.execute(query, (user_id,))
+        if before_id:
+            query += " AND notification_id < %s"
+            params.append(before_id)
+        query += " ORDER BY notification_id DESC LIMIT %s"
+        params.append(limit)
+        cursor.execute(query, tuple(params))
         notifications = cursor.fetchall()
         cursor.close()
     except Exception as e:
         print(f"Error getting notifications from DB: {e}")
+    finally:
+        conn.close()
     return notifications
 
+def db_count_unread_notifications(user_id):
+    """Counts a user's unread notifications (index-only scan of idx_notifications_unread)."""
+    conn = get_db_connection()
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM notifications WHERE user_id = %s AND is_read = FALSE",
+            (user_id,)
+        )
+        return cursor.fetchone()[0]
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def db_mark_notifications_read_up_to(user_id, up_to_id):
+    """Marks every unread notification of a user with notification_id <= up_to_id as read. Returns the count."""
+    conn = get_db_connection()
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE notifications
+            SET is_read = TRUE
+            WHERE user_id = %s AND is_read = FALSE AND notification_id <= %s
+            """,
+            (user_id, up_to_id)
+        )
+        conn.commit()
+        return cursor.rowcount
+    except Exception as e:
+        print(f"Error marking notifications as read in DB: {e}")
+        conn.rollback()
+        raise
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
 def db_mark_notification_as_read(notification_id, user_id):
     """Marks a specific notification as read for a specific user in the database."""
     conn = get_db_connection()
@@ -76,3 +129,261 @@ def db_mark_all_user_notifications_as_read(user_id):
         conn.rollback()
         return False
 
+def db_add_notifications(rows, chunk_size=NOTIFICATION_INSERT_CHUNK_SIZE):
+    """
+    Inserts many notifications in one transaction, chunk_size rows per multi-row INSERT.
+    rows is a list of {'user_id', 'type', 'message', 'related_id'}.
+    Returns the new notification_ids, in the same order as rows.
+
+    IDs are read back in the same transaction rather than derived from LAST_INSERT_ID: a
+    multi-row INSERT only gets consecutive IDs with innodb_autoinc_lock_mode 0 or 1, and
+    MySQL 8 defaults to 2 (interleaved). Rows are matched on (user_id, type, related_id,
+    message) among IDs from the statement's first one on, so an ID can only be swapped with
+    that of an identical notification inserted concurrently.
+    """
+    if not rows:
+        return []
+    conn = get_db_connection()
+    cursor = None
+    try:
+        cursor = conn.cursor()
+
+        notification_ids = []
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            query = (
+                "INSERT INTO notifications (user_id, type, message, related_id) VALUES "
+                + ", ".join(["(%s, %s, %s, %s)"] * len(chunk))
+            )
+            params = []
+            for row in chunk:
+                params.extend((row['user_id'], row['type'], row['message'], row.get('related_id')))
+            cursor.execute(query, tuple(params))
+            if cursor.rowcount != len(chunk):
+                raise RuntimeError(f"Expected {len(chunk)} notifications to be inserted, got {cursor.rowcount}.")
+
+            first_id = cursor.lastrowid # For a multi-row INSERT this is the first row's ID
+            user_ids = list({row['user_id'] for row in chunk})
+            cursor.execute(
+                f"""
+                SELECT notification_id, user_id, type, related_id, message FROM notifications
+                WHERE notification_id >= %s AND user_id IN ({', '.join(['%s'] * len(user_ids))})
+                ORDER BY notification_id
+                """,
+                (first_id, *user_ids)
+            )
+            inserted = {}
+            for notification_id, user_id, notification_type, related_id, message in cursor.fetchall():
+                inserted.setdefault((user_id, notification_type, related_id, message), []).append(notification_id)
+            for row in chunk:
+                candidates = inserted.get((row['user_id'], row['type'], row.get('related_id'), row['message']))
+                if not candidates:
+                    raise RuntimeError(f"Could not read back the notification inserted for user {row['user_id']}.")
+                notification_ids.append(candidates.pop(0))
+        conn.commit()
+        return notification_ids
+    except Exception as e:
+        print(f"Error adding notifications to DB: {e}")
+        conn.rollback()
+        raise
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+# --- Broadcast (fan-out-on-read) notifications ---
+
+# Which broadcast audiences each role sees, besides 'specific_dept' for their own department
+BROADCAST_AUDIENCES_BY_ROLE = {
+    'student': ('all', 'students'),
+    'faculty': ('all', 'faculty'),
+}
+
+def db_add_broadcast_notification(notification_type, message, audience, dept_id=None, related_id=None):
+    """
+    Stores one notification for a whole audience ('all', 'students', 'faculty', 'specific_dept').
+    Users see it through db_get_broadcast_notifications_for_user; no per-user rows are written.
+    Returns the broadcast_id.
+    """
+    conn = get_db_connection()
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO broadcast_notifications (type, message, related_id, audience, dept_id)
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            (notification_type, message, related_id, audience, dept_id)
+        )
+        conn.commit()
+        return cursor.lastrowid
+    except Exception as e:
+        print(f"Error adding broadcast notification to DB: {e}")
+        conn.rollback()
+        raise
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def _broadcast_visibility_filter(user_id, role):
+    """
+    WHERE fragment (aliased on b) selecting the broadcasts addressed to a user, with its params.
+    Returns (None, None) for roles that receive no broadcasts.
+    """
+    audiences = BROADCAST_AUDIENCES_BY_ROLE.get(role)
+    if not audiences:
+        return None, None
+    details_table = 'student_details' if role == 'student' else 'faculty_details'
+    placeholders = ", ".join(["%s"] * len(audiences))
+    clause = (
+        f"(b.audience IN ({placeholders}) "
+        f"OR (b.audience = 'specific_dept' "
+        f"AND b.dept_id = (SELECT dept_id FROM {details_table} WHERE user_id = %s)))"
+    )
+    return clause, (*audiences, user_id)
+
+def db_get_broadcast_notifications_for_user(user_id, role, before_id=None, limit=None):
+    """
+    Returns the broadcast notifications addressed to this user's role or department,
+    newest first, with is_read resolved from the sparse read-state table.
+    Pass before_id/limit for keyset pagination on broadcast_id.
+    """
+    visibility, visibility_params = _broadcast_visibility_filter(user_id, role)
+    if not visibility:
+        return []
+    query = f"""
+        SELECT b.broadcast_id, b.type, b.message, b.related_id, b.created_at,
+               (r.user_id IS NOT NULL) AS is_read
+        FROM broadcast_notifications b
+        LEFT JOIN broadcast_notification_reads r
+            ON r.broadcast_id = b.broadcast_id AND r.user_id = %s
+        WHERE {visibility}
+    """
+    params = [user_id, *visibility_params]
+    if before_id:
+        query += " AND b.broadcast_id < %s"
+        params.append(before_id)
+    query += " ORDER BY b.broadcast_id DESC"
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+    conn = get_db_connection()
+    cursor = None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(query, tuple(params))
+        broadcasts = cursor.fetchall()
+        for item in broadcasts:
+            item['is_read'] = bool(item['is_read'])
+        return broadcasts
+    except Exception as e:
+        print(f"Error getting broadcast notifications from DB: {e}")
+        raise
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def db_mark_broadcast_as_read(broadcast_id, user_id):
+    """Records that a user has read a broadcast notification (idempotent)."""
+    conn = get_db_connection()
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT IGNORE INTO broadcast_notification_reads (user_id, broadcast_id) "
+            "SELECT %s, broadcast_id FROM broadcast_notifications WHERE broadcast_id = %s",
+            (user_id, broadcast_id)
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error marking broadcast notification as read in DB: {e}")
+        conn.rollback()
+        return False
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def db_count_unread_broadcasts(user_id, role):
+    """Counts the broadcasts addressed to a user that have no read-state row yet."""
+    visibility, visibility_params = _broadcast_visibility_filter(user_id, role)
+    if not visibility:
+        return 0
+    conn = get_db_connection()
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            SELECT COUNT(*)
+            FROM broadcast_notifications b
+            LEFT JOIN broadcast_notification_reads r
+                ON r.broadcast_id = b.broadcast_id AND r.user_id = %s
+            WHERE {visibility} AND r.user_id IS NULL
+            """,
+            (user_id, *visibility_params)
+        )
+        return cursor.fetchone()[0]
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def db_mark_broadcasts_read_up_to(user_id, role, up_to_id):
+    """Marks every broadcast addressed to a user with broadcast_id <= up_to_id as read. Returns the count."""
+    visibility, visibility_params = _broadcast_visibility_filter(user_id, role)
+    if not visibility:
+        return 0
+    conn = get_db_connection()
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            INSERT IGNORE INTO broadcast_notification_reads (user_id, broadcast_id)
+            SELECT %s, b.broadcast_id
+            FROM broadcast_notifications b
+            WHERE {visibility} AND b.broadcast_id <= %s
+            """,
+            (user_id, *visibility_params, up_to_id)
+        )
+        conn.commit()
+        return cursor.rowcount
+    except Exception as e:
+        print(f"Error marking broadcast notifications as read in DB: {e}")
+        conn.rollback()
+        raise
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def db_get_socket_audience(user_id):
+    """
+    Returns what a user's Socket.IO group rooms are derived from:
+    role plus the department/semester/section of their student or faculty profile.
+    Returns None if the user doesn't exist.
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT u.role,
+                   COALESCE(sd.dept_id, fd.dept_id) AS dept_id,
+                   sd.semester,
+                   sd.section
+            FROM users u
+            LEFT JOIN student_details sd ON sd.user_id = u.id
+            LEFT JOIN faculty_details fd ON fd.user_id = u.id
+            WHERE u.id = %s
+            """,
+            (user_id,)
+        )
+        return cursor.fetchone()
+    except Exception as e:
+        print(f"Error getting socket audience for user {user_id}: {e}")
+        return None
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
@@ -2,6 +2,8 @@
 from utils.db_connection import get_db_connection
 from werkzeug.security import generate_password_hash, check_password_hash
 from models.attendance_model import AttendanceModel # For _get_entity_ids (student/faculty details)
+from utils.entity_cache import invalidate_student, invalidate_faculty
+from utils.timetable_cache import invalidate_all_timetables
 
 class ProfileModel:
 
@@ -122,6 +124,7 @@ class ProfileModel:
             
             cursor.execute(query, tuple(params))
             conn.commit()
+            invalidate_student(user_id) # Cached dept/semester/section may have changed
             return cursor.rowcount > 0
         except Exception as e:
             print(f"Error in update_student_profile: {e}")
@@ -165,6 +168,8 @@ class ProfileModel:
             
             cursor.execute(query, tuple(params))
             conn.commit()
+            invalidate_faculty(user_id)
+            invalidate_all_timetables() # Timetables show faculty names
             return cursor.rowcount > 0
         except Exception as e:
             print(f"Error in update_faculty_profile: {e}")
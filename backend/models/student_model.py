@@ -32,60 +32,28 @@ class StudentModel:
 
     @staticmethod
     def get_notifications_for_student(student_id):
+        """
+        Every circular relevant to a student: 'all', 'students' and their own department's.
+        The student's department is joined in, so it's a single query ([] for an unknown student).
+        Routes use the paginated CircularsModel feed instead.
+        """
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
-        # Your schema uses 'circulars' for notifications.
-        # We need to fetch circulars relevant to the student.
-        # This is a more complex query, considering 'all', 'students', 'specific_dept' audience.
         cursor.execute(
             """
-            SELECT c.*
-            FROM circulars c
-            LEFT JOIN student_details sd ON c.dept_id = sd.dept_id AND c.audience = 'specific_dept'
-            WHERE 
-                (c.audience = 'all') OR
-                (c.audience = 'students') OR
-                (c.audience = 'specific_dept' AND sd.student_id = %s)
+            SELECT c.*, fd.name as faculty_name, d.dept_name
+            FROM student_details sd
+            JOIN circulars c ON
+                c.audience IN ('all', 'students') OR
+                (c.audience = 'specific_dept' AND c.dept_id = sd.dept_id)
+            LEFT JOIN faculty_details fd ON c.faculty_id = fd.faculty_id
+            LEFT JOIN departments d ON c.dept_id = d.dept_id
+            WHERE sd.student_id = %s
             ORDER BY c.posted_at DESC
             """,
-            (student_id,) # This student_id here is for filtering by specific_dept
-                          # Need to rethink this query slightly to truly filter by student's department.
-                          # Let's refine this to correctly fetch *all* relevant circulars.
+            (student_id,)
         )
-        # A student should see:
-        # 1. Circulars for 'all'
-        # 2. Circulars for 'students'
-        # 3. Circulars for their specific department
-        # To do this, we first need the student's dept_id.
-        
-        # Re-doing the get_notifications_for_student for accuracy with 'circulars' table
-        cursor.execute(
-            """
-            SELECT sd.dept_id FROM student_details sd WHERE sd.student_id = %s
-            """, (student_id,)
-        )
-        student_dept = cursor.fetchone()
-        
-        if student_dept:
-            student_dept_id = student_dept['dept_id']
-            cursor.execute(
-                """
-                SELECT c.*, fd.name as faculty_name, d.dept_name
-                FROM circulars c
-                LEFT JOIN faculty_details fd ON c.faculty_id = fd.faculty_id
-                LEFT JOIN departments d ON c.dept_id = d.dept_id
-                WHERE 
-                    c.audience = 'all' OR
-                    c.audience = 'students' OR
-                    (c.audience = 'specific_dept' AND c.dept_id = %s)
-                ORDER BY c.posted_at DESC
-                """,
-                (student_dept_id,)
-            )
-            data = cursor.fetchall()
-        else:
-            data = [] # No student or department found
-
+        data = cursor.fetchall()
         cursor.close()
         conn.close()
         return data
\ No newline at end of file
@@ -1,76 +1,87 @@
 # backend/models/timetable_model.py
-from utils.db_connection import get_db_connection
-
-def get_subject_id_or_create(subject_code, subject_name): # Added subject_name parameter
+from utils.db_connection import get_db_connection, call_after_commit
+from utils.entity_cache import entity_cache, cache_entity, invalidate_dept, invalidate_subject
+from utils.timetable_cache import (
+    timetable_cache,
+    timetable_key,
+    timetable_etag,
+    invalidate_class_timetable,
+    invalidate_all_timetables
+)
+
+def _resolve_named_row(kind, table, id_column, code_column, name_column, code, name, create_if_missing):
     """
-    Looks up subject_id for a given subject_code.
-    If subject_code doesn't exist, it creates a new entry in the subjects table.
-    Returns the subject_id.
+    Read-mostly code -> id resolver behind get_subject_id_or_create / get_dept_id_or_create.
+    The id (and name) come from the entity cache when possible. The row is only written when
+    it is missing and create_if_missing is set, or when name is given and differs from the
+    stored one; name=None never writes to an existing row. Returns the id, or None.
     """
+    row_id = entity_cache.get((kind, code))
+    if row_id is not None and (name is None or entity_cache.get((f'{kind}_name', code)) == name):
+        return row_id
+
     conn = None
     cursor = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute("SELECT subject_id FROM subjects WHERE subject_code = %s", (subject_code,))
+        cursor.execute(f"SELECT {id_column}, {name_column} FROM {table} WHERE {code_column} = %s", (code,))
         result = cursor.fetchone()
 
         if result:
-            # If subject exists, ensure its name is updated if different (optional, but good for consistency)
-            cursor.execute("UPDATE subjects SET subject_name = %s WHERE subject_id = %s", (subject_name, result[0]))
-            conn.commit()
-            return result[0]
-        else:
-            # Create a new subject entry with provided name
-            cursor.execute(
-                "INSERT INTO subjects (subject_code, subject_name) VALUES (%s, %s)",
-                (subject_code, subject_name)
-            )
-            conn.commit()
-            return cursor.lastrowid
+            row_id, stored_name = result
+            # The row may have been created earlier in this request, so cache once it commits
+            cache_entity((kind, code), row_id)
+            if name is not None and name != stored_name:
+                cursor.execute(f"UPDATE {table} SET {name_column} = %s WHERE {id_column} = %s", (name, row_id))
+                conn.commit()
+                call_after_commit(lambda: entity_cache.invalidate((f'{kind}_name', code)))
+                invalidate_all_timetables() # Timetables show subject/department names
+            else:
+                cache_entity((f'{kind}_name', code), stored_name)
+            return row_id
+
+        if not create_if_missing or name is None:
+            return None
+        try:
+            cursor.execute(f"INSERT INTO {table} ({code_column}, {name_column}) VALUES (%s, %s)", (code, name))
+        except Exception as e:
+            if getattr(e, 'errno', None) != 1062: # Lost a race with a concurrent insert
+                raise
+            # A locking read sees the committed row; a plain SELECT would reuse this
+            # transaction's REPEATABLE READ snapshot, taken before the other insert
+            cursor.execute(f"SELECT {id_column} FROM {table} WHERE {code_column} = %s LOCK IN SHARE MODE", (code,))
+            result = cursor.fetchone()
+            return result[0] if result else None
+        conn.commit()
+        return cursor.lastrowid
     except Exception as e:
-        print(f"Error in get_subject_id_or_create: {e}")
+        print(f"Error resolving {kind} '{code}': {e}")
         raise
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
 
-def get_dept_id_or_create(dept_name, dept_code): # Added dept_code parameter
+def get_subject_id_or_create(subject_code, subject_name=None, create_if_missing=True):
     """
-    Looks up dept_id for a given dept_name and dept_code.
-    If department (by dept_code) doesn't exist, it creates a new entry in the departments table.
-    Returns the dept_id.
+    Looks up subject_id for a given subject_code.
+    If subject_name is given and differs from the stored one, the subject is renamed;
+    if the subject doesn't exist it is created (needs subject_name) unless create_if_missing is False.
+    Returns the subject_id, or None if it doesn't exist and wasn't created.
     """
-    conn = None
-    cursor = None
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Try to find by dept_code first (as it's UNIQUE)
-        cursor.execute("SELECT dept_id FROM departments WHERE dept_code = %s", (dept_code,))
-        result = cursor.fetchone()
+    return _resolve_named_row('subject', 'subjects', 'subject_id', 'subject_code', 'subject_name',
+                              subject_code, subject_name, create_if_missing)
 
-        if result:
-            # If department exists, ensure its name is updated if different (optional)
-            cursor.execute("UPDATE departments SET dept_name = %s WHERE dept_id = %s", (dept_name, result[0]))
-            conn.commit()
-            return result[0]
-        else:
-            # If dept_code does not exist, insert a new department
-            cursor.execute(
-                "INSERT INTO departments (dept_code, dept_name) VALUES (%s, %s)",
-                (dept_code, dept_name,)
-            )
-            conn.commit()
-            return cursor.lastrowid
-    except Exception as e:
-        print(f"Error in get_dept_id_or_create: {e}")
-        raise
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
+def get_dept_id_or_create(dept_name, dept_code, create_if_missing=True):
+    """
+    Looks up dept_id for a given dept_code (UNIQUE).
+    If dept_name is given (not None) and differs from the stored one, the department is renamed;
+    if the department doesn't exist it is created (needs dept_name) unless create_if_missing is False.
+    Returns the dept_id, or None if it doesn't exist and wasn't created.
+    """
+    return _resolve_named_row('dept', 'departments', 'dept_id', 'dept_code', 'dept_name',
+                              dept_code, dept_name, create_if_missing)
 
 
 def get_offering_id_or_create(subject_id, dept_id, semester):
@@ -186,6 +197,7 @@ def save_timetable_entry(semester, department_name, department_code, section, da
             period_number
         ))
         conn.commit()
+        invalidate_class_timetable(dept_id, semester)
         return True
     except ValueError as ve:
         print(f"Validation error in save_timetable_entry: {ve}")
@@ -198,24 +210,315 @@ def save_timetable_entry(semester, department_name, department_code, section, da
         if conn: conn.close()
 
 
-def get_timetable_for_class(dept_name, semester, section=None):
+# --- Bulk timetable import ---
+# Entries are dicts with department_code, department_name, semester, section, day, period,
+# subject_code, subject_name and faculty_id (see utils/timetable_import.py).
+# A slot is one (department, semester, section, day, period) cell of a class timetable.
+
+IN_CLAUSE_CHUNK = 500
+
+def _fold(value):
+    # MySQL compares codes/sections case-insensitively, so dictionary keys must too
+    return value.strip().lower() if isinstance(value, str) else value
+
+def _chunked(items, size=IN_CLAUSE_CHUNK):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _tuple_in_clause(count, width):
+    return ", ".join(["(" + ", ".join(["%s"] * width) + ")"] * count)
+
+def _select_named_rows(cursor, table, id_column, code_column, name_column, codes):
+    """Returns {folded code: (id, name)} for the given codes."""
+    found = {}
+    for chunk in _chunked(set(codes)):
+        cursor.execute(
+            f"SELECT {id_column}, {code_column}, {name_column} FROM {table} "
+            f"WHERE {code_column} IN ({', '.join(['%s'] * len(chunk))})",
+            tuple(chunk)
+        )
+        for row_id, code, name in cursor.fetchall():
+            found[_fold(code)] = (row_id, name)
+    return found
+
+def _sync_named_rows(cursor, table, id_column, code_column, name_column, names, existing):
+    """
+    Inserts the codes of names ({code: name}) missing from existing and renames the ones whose
+    name differs. Returns ({folded code: id}, created codes, renamed codes).
+    """
+    created = [code for code in names if _fold(code) not in existing]
+    renamed = [code for code in names if _fold(code) in existing and existing[_fold(code)][1] != names[code]]
+    for chunk in _chunked(created):
+        cursor.execute(
+            f"INSERT INTO {table} ({code_column}, {name_column}) VALUES {_tuple_in_clause(len(chunk), 2)}",
+            tuple(value for code in chunk for value in (code, names[code]))
+        )
+    if renamed:
+        cursor.executemany(
+            f"UPDATE {table} SET {name_column} = %s WHERE {id_column} = %s",
+            [(names[code], existing[_fold(code)][0]) for code in renamed]
+        )
+    ids = {key: row_id for key, (row_id, _) in existing.items()}
+    if created:
+        ids.update({key: row_id for key, (row_id, _) in
+                    _select_named_rows(cursor, table, id_column, code_column, name_column, created).items()})
+    return ids, created, renamed
+
+def _get_or_create_links(cursor, table, id_column, columns, keys):
+    """
+    Resolves (or inserts) rows of a link table identified by the tuple of columns.
+    Returns ({folded key tuple: id}, number created).
+    """
+    def select(wanted):
+        found = {}
+        for chunk in _chunked(wanted):
+            cursor.execute(
+                f"SELECT {id_column}, {', '.join(columns)} FROM {table} "
+                f"WHERE ({', '.join(columns)}) IN ({_tuple_in_clause(len(chunk), len(columns))})",
+                tuple(value for key in chunk for value in key)
+            )
+            for row in cursor.fetchall():
+                found[tuple(_fold(value) for value in row[1:])] = row[0]
+        return found
+
+    keys = {tuple(_fold(value) for value in key): key for key in keys}
+    ids = select(keys.values())
+    missing = [key for folded, key in keys.items() if folded not in ids]
+    for chunk in _chunked(missing):
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES {_tuple_in_clause(len(chunk), len(columns))}",
+            tuple(value for key in chunk for value in key)
+        )
+    if missing:
+        ids.update(select(missing))
+    return ids, len(missing)
+
+def _select_class_slots(cursor, classes):
+    """
+    Returns {(dept_id, semester, folded section, folded day, period): [row, ...]} for the
+    timetable_template rows of the given (dept_id, semester, section) classes.
+    """
+    slots = {}
+    for chunk in _chunked(classes):
+        cursor.execute(
+            f"""
+            SELECT so.dept_id, so.semester, fa.section, tt.day_of_week, tt.period_number,
+                   tt.assignment_id, s.subject_code, fa.faculty_id
+            FROM timetable_template tt
+            JOIN faculty_assignment fa ON tt.assignment_id = fa.assignment_id
+            JOIN subject_offerings so ON fa.offering_id = so.offering_id
+            JOIN subjects s ON so.subject_id = s.subject_id
+            WHERE (so.dept_id, so.semester, fa.section) IN ({_tuple_in_clause(len(chunk), 3)})
+            """,
+            tuple(value for key in chunk for value in key)
+        )
+        for dept_id, semester, section, day, period, assignment_id, subject_code, faculty_id in cursor.fetchall():
+            slot = (dept_id, semester, _fold(section), _fold(day), period)
+            slots.setdefault(slot, []).append({
+                'assignment_id': assignment_id, 'section': section, 'day': day, 'period': period,
+                'subject_code': subject_code, 'faculty_id': faculty_id
+            })
+    return slots
+
+def _slot_summary(entry):
+    return {
+        'department_code': entry['department_code'], 'semester': entry['semester'], 'section': entry['section'],
+        'day': entry['day'], 'period': entry['period'],
+        'subject_code': entry['subject_code'], 'faculty_id': entry['faculty_id']
+    }
+
+def get_missing_faculty_ids(faculty_ids):
+    """Returns the given faculty_ids that have no faculty_details row."""
+    faculty_ids = list(set(faculty_ids))
+    if not faculty_ids:
+        return []
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        found = set()
+        for chunk in _chunked(faculty_ids):
+            cursor.execute(
+                f"SELECT faculty_id FROM faculty_details WHERE faculty_id IN ({', '.join(['%s'] * len(chunk))})",
+                tuple(chunk)
+            )
+            found.update(row[0] for row in cursor.fetchall())
+        return sorted(f for f in faculty_ids if f not in found)
+    except Exception as e:
+        print(f"Error in get_missing_faculty_ids: {e}")
+        raise
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def bulk_save_timetable(entries, replace=False, dry_run=False):
     """
-    Fetches timetable entries for a given department, semester, and optional section
-    from the new schema. Joins across multiple tables.
+    Saves many timetable entries (already validated, at most one per slot) in one transaction.
+    Departments, subjects, offerings and assignments are deduplicated in memory and resolved
+    with a few set-based queries; only slots that actually change are written.
+    With replace=True, slots of the imported classes that are not in entries are removed.
+    With dry_run=True nothing is written and the diff describes what would change.
+
+    Returns a diff: {"added": [...], "changed": [...], "removed": [...], "unchanged": n,
+    "created": {...}, "renamed": {...}, "classes": [{dept_id, department_code, semester, section}]}
+    where classes lists the classes whose timetable changed.
     """
     conn = None
     cursor = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor()
+
+        dept_names = {e['department_code']: e['department_name'] for e in entries}
+        subject_names = {e['subject_code']: e['subject_name'] for e in entries}
+        existing_depts = _select_named_rows(cursor, 'departments', 'dept_id', 'dept_code', 'dept_name', dept_names)
+        existing_subjects = _select_named_rows(cursor, 'subjects', 'subject_id', 'subject_code', 'subject_name', subject_names)
+
+        # Current slots of the imported classes; classes of new departments have none
+        known_classes = {(existing_depts[_fold(e['department_code'])][0], e['semester'], e['section'])
+                         for e in entries if _fold(e['department_code']) in existing_depts}
+        current = _select_class_slots(cursor, known_classes)
+
+        added, changed, to_write, stale_rows = [], [], [], []
+        unchanged = 0
+        seen_slots = set()
+        for e in entries:
+            dept = existing_depts.get(_fold(e['department_code']))
+            slot = (dept[0] if dept else None, e['semester'], _fold(e['section']), _fold(e['day']), e['period'])
+            seen_slots.add(slot)
+            rows = current.get(slot, [])
+            wanted = (_fold(e['subject_code']), e['faculty_id'])
+            stale = [row for row in rows if (_fold(row['subject_code']), row['faculty_id']) != wanted]
+            if not rows:
+                added.append(_slot_summary(e))
+                to_write.append(e)
+            elif stale:
+                before = {'subject_code': stale[0]['subject_code'], 'faculty_id': stale[0]['faculty_id']}
+                changed.append(dict(_slot_summary(e), before=before))
+                stale_rows.extend(stale)
+                if len(stale) == len(rows):
+                    to_write.append(e)
+            else:
+                unchanged += 1
+
+        removed = []
+        if replace:
+            dept_codes = {existing_depts[_fold(code)][0]: code for code in dept_names if _fold(code) in existing_depts}
+            for slot, rows in current.items():
+                if slot not in seen_slots:
+                    stale_rows.extend(rows)
+                    for row in rows:
+                        removed.append({
+                            'department_code': dept_codes.get(slot[0]), 'semester': slot[1], 'section': row['section'],
+                            'day': row['day'], 'period': row['period'],
+                            'subject_code': row['subject_code'], 'faculty_id': row['faculty_id']
+                        })
+
+        renamed_depts = [code for code in dept_names if _fold(code) in existing_depts and existing_depts[_fold(code)][1] != dept_names[code]]
+        renamed_subjects = [code for code in subject_names if _fold(code) in existing_subjects and existing_subjects[_fold(code)][1] != subject_names[code]]
+        diff = {
+            'added': added,
+            'changed': changed,
+            'removed': removed,
+            'unchanged': unchanged,
+            'created': {'departments': 0, 'subjects': 0, 'offerings': 0, 'assignments': 0},
+            'renamed': {'departments': renamed_depts, 'subjects': renamed_subjects},
+            'classes': []
+        }
+        if dry_run:
+            diff['created']['departments'] = len([c for c in dept_names if _fold(c) not in existing_depts])
+            diff['created']['subjects'] = len([c for c in subject_names if _fold(c) not in existing_subjects])
+            return diff
+
+        # Resolve/create only what the written slots need (renames apply to every imported code)
+        needed_depts = set(renamed_depts) | {e['department_code'] for e in to_write}
+        needed_subjects = set(renamed_subjects) | {e['subject_code'] for e in to_write}
+        write_dept_names = {code: name for code, name in dept_names.items() if code in needed_depts}
+        write_subject_names = {code: name for code, name in subject_names.items() if code in needed_subjects}
+        dept_ids, created_depts, _ = _sync_named_rows(
+            cursor, 'departments', 'dept_id', 'dept_code', 'dept_name', write_dept_names, existing_depts)
+        subject_ids, created_subjects, _ = _sync_named_rows(
+            cursor, 'subjects', 'subject_id', 'subject_code', 'subject_name', write_subject_names, existing_subjects)
+
+        offering_keys = {(subject_ids[_fold(e['subject_code'])], dept_ids[_fold(e['department_code'])], e['semester'])
+                         for e in to_write}
+        offering_ids, created_offerings = _get_or_create_links(
+            cursor, 'subject_offerings', 'offering_id', ('subject_id', 'dept_id', 'semester'), offering_keys)
+
+        def offering_of(entry):
+            return offering_ids[(subject_ids[_fold(entry['subject_code'])], dept_ids[_fold(entry['department_code'])], entry['semester'])]
+        assignment_keys = {(offering_of(e), e['faculty_id'], e['section']) for e in to_write}
+        assignment_ids, created_assignments = _get_or_create_links(
+            cursor, 'faculty_assignment', 'assignment_id', ('offering_id', 'faculty_id', 'section'), assignment_keys)
+
+        stale_keys = list({(row['assignment_id'], row['day'], row['period']) for row in stale_rows})
+        for chunk in _chunked(stale_keys):
+            cursor.execute(
+                "DELETE FROM timetable_template WHERE (assignment_id, day_of_week, period_number) "
+                f"IN ({_tuple_in_clause(len(chunk), 3)})",
+                tuple(value for key in chunk for value in key)
+            )
+        for chunk in _chunked(to_write):
+            cursor.execute(
+                "INSERT INTO timetable_template (assignment_id, day_of_week, period_number) "
+                f"VALUES {_tuple_in_clause(len(chunk), 3)} "
+                "ON DUPLICATE KEY UPDATE assignment_id = VALUES(assignment_id)",
+                tuple(value for e in chunk for value in
+                      (assignment_ids[(offering_of(e), e['faculty_id'], _fold(e['section']))], e['day'], e['period']))
+            )
+        conn.commit()
+
+        for code in created_depts + renamed_depts:
+            invalidate_dept(code)
+        for code in created_subjects + renamed_subjects:
+            invalidate_subject(code)
+        if renamed_depts or renamed_subjects:
+            invalidate_all_timetables()
+
+        diff['created'] = {
+            'departments': len(created_depts), 'subjects': len(created_subjects),
+            'offerings': created_offerings, 'assignments': created_assignments
+        }
+        touched = {}
+        for item in added + changed + removed:
+            dept_id = dept_ids.get(_fold(item['department_code']))
+            touched[(dept_id, item['semester'], _fold(item['section']))] = {
+                'dept_id': dept_id, 'department_code': item['department_code'],
+                'semester': item['semester'], 'section': item['section']
+            }
+        diff['classes'] = list(touched.values())
+        for dept_id, semester in {(c['dept_id'], c['semester']) for c in diff['classes']}:
+            invalidate_class_timetable(dept_id, semester)
+        return diff
+    except Exception as e:
+        if conn: conn.rollback()
+        print(f"Error in bulk_save_timetable: {e}")
+        raise
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
 
-        # We need to get dept_id from dept_name. Assuming dept_name is unique enough for lookup.
-        cursor.execute("SELECT dept_id FROM departments WHERE dept_name = %s", (dept_name,))
-        dept_record = cursor.fetchone()
-        if not dept_record:
-            return [] # Department not found
 
-        dept_id = dept_record['dept_id']
+_DAY_ORDER = {day: i for i, day in enumerate(('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'))}
+
+def get_class_timetable(dept_id, semester, section=None):
+    """
+    Returns (timetable rows, etag) for a department/semester and optional section.
+    Served from the precomputed timetable cache; a miss runs the join once and stores the
+    result sorted by day and period. Saves invalidate it (see utils/timetable_cache.py).
+    """
+    key = timetable_key(dept_id, semester, section)
+    cached = timetable_cache.get(key)
+    if cached is not None:
+        return cached['timetable'], cached['etag']
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
 
         query = """
         SELECT
@@ -246,17 +549,46 @@ def get_timetable_for_class(dept_name, semester, section=None):
             query += " AND fa.section = %s"
             params.append(section.strip())
 
-        query += " ORDER BY FIELD(tt.day_of_week, 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'), tt.period_number"
-
         cursor.execute(query, tuple(params))
-        return cursor.fetchall()
+        # Sorted here rather than with ORDER BY FIELD(...): it only happens on a cache miss
+        rows = sorted(cursor.fetchall(), key=lambda r: (_DAY_ORDER.get(r['day_of_week'], len(_DAY_ORDER)), r['period_number']))
+        etag = timetable_etag(rows)
+        timetable_cache.set(key, {'timetable': rows, 'etag': etag})
+        return rows, etag
     except Exception as e:
-        print(f"Error in get_timetable_for_class: {e}")
+        print(f"Error in get_class_timetable: {e}")
         raise
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
 
+def get_department_id_for_timetable(department):
+    """Resolves a department by dept_code (unique, cached), falling back to dept_name."""
+    dept_id = get_department_id_by_code(department)
+    if dept_id:
+        return dept_id
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT dept_id FROM departments WHERE dept_name = %s", (department,))
+        dept_record = cursor.fetchone()
+        return dept_record['dept_id'] if dept_record else None
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def get_timetable_for_class(dept_name, semester, section=None):
+    """
+    Fetches timetable entries for a given department (dept_code or dept_name), semester
+    and optional section. Returns [] if the department doesn't exist.
+    """
+    dept_id = get_department_id_for_timetable(dept_name)
+    if not dept_id:
+        return [] # Department not found
+    return get_class_timetable(dept_id, semester, section)[0]
+
 def get_student_department_semester_section(user_id): # Renamed parameter to user_id
     conn = None
     cursor = None
@@ -286,12 +618,4 @@ def get_student_department_semester_section(user_id): # Renamed parameter to use
         if conn: conn.close()
 
 def get_department_id_by_code(department_code):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        cursor.execute("SELECT dept_id FROM departments WHERE dept_code = %s", (department_code,))
-        result = cursor.fetchone()
-        return result['dept_id'] if result else None
-    finally:
-        cursor.close()
-        conn.close()
+    return get_dept_id_or_create(None, department_code, create_if_missing=False)
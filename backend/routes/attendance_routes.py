@@ -1,13 +1,18 @@
 # backend/routes/attendance_routes.py
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from utils.jwt_utils import token_required
 from models.attendance_model import AttendanceModel
+from utils.db_connection import get_db_connection
 # from models.timetable_model import get_student_department_semester_section # Not used in this snippet
 from datetime import datetime
-from utils.db_connection import get_db_connection
+from config import Config
 
 attendance_bp = Blueprint("attendance", __name__, url_prefix="/api/attendance")
 
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 500
+
 # Helper function to convert date string to date object
 def parse_date(date_str):
     try:
@@ -49,63 +54,53 @@ def submit_class_attendance():
         return jsonify({"success": False, "error": "'semester' must be an integer"}), 400
 
     try:
-        # 1. Get assignment_id from the class details
-        ids = AttendanceModel._get_entity_ids(
+        # 1. Resolve dept/subject/faculty/offering/assignment (and any existing session) in one query
+        resolved = AttendanceModel.resolve_class_assignment(
             dept_code=dept_code,
+            semester=semester,
             subject_code=subject_code,
-            faculty_user_id=faculty_user_id
+            faculty_user_id=faculty_user_id,
+            section=section,
+            date_str=date_str
         )
-        if not all(k in ids for k in ['dept_id', 'subject_id', 'faculty_id']):
+        if not resolved or not all(resolved.get(k) for k in ['dept_id', 'subject_id', 'faculty_id']):
             return jsonify({"success": False, "error": "Department, Subject, or Faculty not found for the given details."}), 404
-
-        dept_id = ids['dept_id']
-        subject_id = ids['subject_id']
-        faculty_id = ids['faculty_id']
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT offering_id FROM subject_offerings WHERE subject_id = %s AND dept_id = %s AND semester = %s",
-            (subject_id, dept_id, semester)
-        )
-        offering = cursor.fetchone()
-        if not offering:
-            cursor.close()
-            conn.close()
+        if not resolved['offering_id']:
             return jsonify({"success": False, "error": "Subject offering not found for the given department and semester."}), 404
-        offering_id = offering[0]
-
-        print(f"Checking assignment for offering_id: {offering_id}, faculty_id: {faculty_id}, section: {section}")
-        cursor.execute(
-            "SELECT assignment_id FROM faculty_assignment WHERE offering_id = %s AND faculty_id = %s AND section = %s",
-            (offering_id, faculty_id, section)
-        )
-        assignment = cursor.fetchone()
-        if not assignment:
-            cursor.close()
-            conn.close()
+        if not resolved['assignment_id']:
             return jsonify({"success": False, "error": "Faculty assignment not found for the specified class."}), 404
-        assignment_id = assignment[0]
-        cursor.close()
-        conn.close()
-
 
         # 2. Get or Create the class_session_id
-        session_id = AttendanceModel.create_class_session_from_template(
-            assignment_id=assignment_id,
-            session_date_str=date_str,
-        )
+        session_id = resolved['session_id']
+        if not session_id:
+            session_id = AttendanceModel.create_class_session_from_template(
+                assignment_id=resolved['assignment_id'],
+                session_date_str=date_str,
+            )
 
         if not session_id:
             return jsonify({"success": False, "error": "Could not create or retrieve class session."}), 500
 
-        # 3. Submit attendance for students in this session
-        processed_count = AttendanceModel.submit_attendance_for_session(session_id, attendance_list)
+        # 3. Submit attendance for students in this session (validated and written in bulk)
+        summary = AttendanceModel.submit_attendance_for_session(session_id, attendance_list)
+
+        if summary["accepted"] == 0:
+            # Roll back the request's transaction so a session created above isn't left empty
+            get_db_connection().rollback()
+            return jsonify({
+                "success": False,
+                "error": "No valid attendance entries to save.",
+                "session_id": resolved['session_id'], # None if the session would have been new
+                "results": summary["results"]
+            }), 400
 
         return jsonify({
             "success": True,
-            "message": f"Attendance for session {session_id} saved/updated for {processed_count} students.",
-            "session_id": session_id
+            "message": f"Attendance for session {session_id} saved/updated for {summary['accepted']} students.",
+            "session_id": session_id,
+            "accepted": summary["accepted"],
+            "rejected": summary["rejected"],
+            "results": summary["results"]
         }), 201
 
     except Exception as e:
@@ -153,8 +148,12 @@ def get_students_for_attendance_marking():
 @token_required(roles=['faculty', 'admin'])
 def get_class_attendance_history():
     """
-    Endpoint to view the history of class sessions for a specific class.
+    Endpoint to view the history of class sessions for a specific class, newest first.
     Query params: dept_code, semester, section, optional: subject_code, start_date, end_date
+    Pagination (keyset on session_date, session_id): limit (default 50, max 500), and
+    before_date/before_session_id taken from the previous response's next_cursor.
+    format=ndjson streams every matching session (from the cursor on, up to limit if given)
+    as one JSON object per line, read from a server-side cursor.
     """
     dept_code = request.args.get("dept_code")
     semester_str = request.args.get("semester")
@@ -162,6 +161,10 @@ def get_class_attendance_history():
     subject_code = request.args.get("subject_code") # Optional
     start_date_str = request.args.get("start_date") # Optional: YYYY-MM-DD
     end_date_str = request.args.get("end_date")     # Optional: YYYY-MM-DD
+    before_date_str = request.args.get("before_date")
+    before_session_id = request.args.get("before_session_id", type=int)
+    stream = request.args.get("format") == "ndjson"
+    limit = request.args.get("limit", None if stream else HISTORY_PAGE_SIZE, type=int)
 
     if not all([dept_code, semester_str, section]):
         return jsonify({"success": False, "error": "Missing dept_code, semester, or section query parameters."}), 400
@@ -173,24 +176,108 @@ def get_class_attendance_history():
 
     start_date = parse_date(start_date_str)
     end_date = parse_date(end_date_str)
+    before_date = parse_date(before_date_str)
     if start_date_str and not start_date:
         return jsonify({"success": False, "error": "Invalid start_date format. Expected YYYY-MM-DD"}), 400
     if end_date_str and not end_date:
         return jsonify({"success": False, "error": "Invalid end_date format. Expected YYYY-MM-DD"}), 400
+    if before_date_str and not before_date:
+        return jsonify({"success": False, "error": "Invalid before_date format. Expected YYYY-MM-DD"}), 400
+    if bool(before_date) != bool(before_session_id):
+        return jsonify({"success": False, "error": "before_date and before_session_id must be given together."}), 400
+    if limit is not None and (limit < 1 or (not stream and limit > MAX_HISTORY_PAGE_SIZE)):
+        return jsonify({"success": False, "error": f"limit must be between 1 and {MAX_HISTORY_PAGE_SIZE}."}), 400
+
+    query_args = dict(
+        dept_code=dept_code,
+        semester=semester,
+        section=section,
+        subject_code=subject_code,
+        start_date=start_date,
+        end_date=end_date,
+        before_date=before_date,
+        before_session_id=before_session_id,
+        limit=limit
+    )
+
+    if stream:
+        if 'dept_id' not in AttendanceModel._get_entity_ids(dept_code=dept_code):
+            return jsonify({"success": False, "error": "Department not found."}), 404
+
+        def generate():
+            for row in AttendanceModel.iter_attendance_history_for_class(**query_args):
+                yield json.dumps(row, default=str) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    try:
+        history = AttendanceModel.get_attendance_history_for_class(**query_args)
+        next_cursor = None
+        if len(history) == limit:
+            last = history[-1]
+            next_cursor = {"before_date": str(last['session_date']), "before_session_id": last['session_id']}
+        return jsonify({"success": True, "history": history, "next_cursor": next_cursor}), 200
+    except Exception as e:
+        print(f"Error fetching class attendance history: {e}")
+        return jsonify({"success": False, "error": "Internal server error."}), 500
+
 
+@attendance_bp.route("/class/matrix", methods=["GET"])
+@token_required(roles=['faculty', 'admin'])
+def get_class_attendance_matrix():
+    """
+    Endpoint for the students x sessions attendance matrix of one subject in a section,
+    with per-student percentages and shortage flags.
+    Query params: dept_code, semester, section, subject_code, optional: start_date, end_date, threshold
+    Matrix cells: 1 = present, 0 = absent, -1 = not recorded. Rows follow 'students', columns follow 'sessions'.
+    """
+    dept_code = request.args.get("dept_code")
+    semester_str = request.args.get("semester")
+    section = request.args.get("section")
+    subject_code = request.args.get("subject_code")
+    start_date_str = request.args.get("start_date") # Optional: YYYY-MM-DD
+    end_date_str = request.args.get("end_date")     # Optional: YYYY-MM-DD
+    threshold_str = request.args.get("threshold")   # Optional: percent
+
+    if not all([dept_code, semester_str, section, subject_code]):
+        return jsonify({"success": False, "error": "Missing dept_code, semester, section, or subject_code query parameters."}), 400
 
     try:
-        history = AttendanceModel.get_attendance_history_for_class(
+        semester = int(semester_str)
+    except ValueError:
+        return jsonify({"success": False, "error": "'semester' must be an integer."}), 400
+
+    threshold = Config.ATTENDANCE_SHORTAGE_THRESHOLD
+    if threshold_str:
+        try:
+            threshold = float(threshold_str)
+        except ValueError:
+            return jsonify({"success": False, "error": "'threshold' must be a number."}), 400
+        if not 0 <= threshold <= 100:
+            return jsonify({"success": False, "error": "'threshold' must be between 0 and 100."}), 400
+
+    start_date = parse_date(start_date_str)
+    end_date = parse_date(end_date_str)
+    if start_date_str and not start_date:
+        return jsonify({"success": False, "error": "Invalid start_date format. Expected YYYY-MM-DD"}), 400
+    if end_date_str and not end_date:
+        return jsonify({"success": False, "error": "Invalid end_date format. Expected YYYY-MM-DD"}), 400
+
+    try:
+        result = AttendanceModel.get_section_attendance_matrix(
             dept_code=dept_code,
             semester=semester,
             section=section,
             subject_code=subject_code,
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            shortage_threshold=threshold
         )
-        return jsonify({"success": True, "history": history}), 200
+        if result is None:
+            return jsonify({"success": False, "error": "Department or subject not found."}), 404
+        return jsonify({"success": True, **result}), 200
     except Exception as e:
-        print(f"Error fetching class attendance history: {e}")
+        print(f"Error building class attendance matrix: {e}")
         return jsonify({"success": False, "error": "Internal server error."}), 500
 
 
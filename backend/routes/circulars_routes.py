@@ -1,12 +1,17 @@
 # backend/routes/circulars_routes.py
 import os
+from datetime import datetime
 from flask import Blueprint, request, jsonify, current_app, send_from_directory # Import send_from_directory
 from utils.jwt_utils import token_required
-from models.circulars_model import CircularsModel
+from models.circulars_model import CircularsModel, CURSOR_TIME_FORMAT
 from models.attendance_model import AttendanceModel 
 from utils.fileupload_utils import allowed_file, save_uploaded_file, delete_file_from_server # Import new utils
-from routes.notification_routes import emit_notification_to_user 
+from routes.notification_routes import emit_notification_to_users, broadcast_notification_to_audience
 from models.timetable_model import get_department_id_by_code
+from config import Config
+from utils.socket_rooms import rooms_for_circular_audience
+from utils.document_indexer import document_indexer
+from models.document_text_model import DocumentTextModel
 
 circulars_bp = Blueprint('circulars', __name__, url_prefix='/api/circulars')
 
@@ -15,6 +20,56 @@ VALID_AUDIENCES = {'all', 'students', 'faculty', 'specific_dept'}
 # Define allowed extensions specifically for circulars
 ALLOWED_CIRCULAR_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf'}
 CIRCULAR_ATTACHMENT_SUBFOLDER = 'circular_attachments' # Subfolder for circulars within the main UPLOAD_FOLDER
+MAX_CIRCULAR_PAGE_SIZE = 100
+
+def parse_feed_args(args):
+    """
+    Reads limit / before_posted_at / before_id (from a previous next_cursor) off the query string.
+    Returns (limit, before_posted_at, before_id, error message or None).
+    """
+    limit = args.get('limit', Config.CIRCULAR_FEED_PAGE_SIZE, type=int)
+    before_posted_at = args.get('before_posted_at')
+    before_id = args.get('before_id', type=int)
+    if limit < 1 or limit > MAX_CIRCULAR_PAGE_SIZE:
+        return None, None, None, f"limit must be between 1 and {MAX_CIRCULAR_PAGE_SIZE}."
+    if (before_posted_at is None) != (before_id is None):
+        return None, None, None, "before_posted_at and before_id must be given together."
+    if before_posted_at is not None:
+        try:
+            datetime.strptime(before_posted_at, CURSOR_TIME_FORMAT)
+        except ValueError:
+            return None, None, None, "before_posted_at must look like 'YYYY-MM-DD HH:MM:SS'."
+    return limit, before_posted_at, before_id, None
+
+def _notify_circular_audience(audience, dept_id, notification_type, notification_message, circular_id):
+    """
+    Notifies everyone a circular is addressed to.
+    In 'broadcast' mode the notification is stored once and matched to users when they
+    read their notifications; in 'per_user' mode one row is written per recipient.
+    Either way the live update is a single emit per audience room.
+    """
+    if Config.CIRCULAR_NOTIFICATION_MODE == 'broadcast':
+        broadcast_notification_to_audience(audience, dept_id, notification_type, notification_message, circular_id)
+        return
+
+    target_user_ids = []
+    if audience == 'all':
+        target_user_ids.extend(CircularsModel.get_all_student_user_ids())
+        target_user_ids.extend(CircularsModel.get_all_faculty_user_ids())
+    elif audience == 'students':
+        target_user_ids.extend(CircularsModel.get_all_student_user_ids())
+    elif audience == 'faculty':
+        target_user_ids.extend(CircularsModel.get_all_faculty_user_ids())
+    elif audience == 'specific_dept' and dept_id:
+        target_user_ids.extend(CircularsModel.get_student_user_ids_by_department(dept_id))
+        target_user_ids.extend(CircularsModel.get_faculty_user_ids_by_department(dept_id))
+
+    # Remove duplicates if any (e.g., if a user is faculty and also a student - though unlikely in this system)
+    target_user_ids = list(set(target_user_ids))
+
+    # Queued as one fan-out job; the request doesn't wait for delivery
+    emit_notification_to_users(target_user_ids, notification_type, notification_message, circular_id,
+                               rooms=rooms_for_circular_audience(audience, dept_id))
 
 # The allowed_file function from utils now takes `allowed_extensions` as an argument
 
@@ -74,33 +129,11 @@ def post_circular():
     try:
         circular_id = CircularsModel.create_circular(faculty_id, title, content, audience, dept_id, attachment_path)
         if circular_id:
-            target_user_ids = []
+            if attachment_path:
+                # The attachment's text is extracted in the background for search/previews
+                document_indexer.submit('circular', circular_id, attachment_path)
             notification_message = f"New Circular: {title}"
-
-            if audience == 'all':
-                target_user_ids.extend(CircularsModel.get_all_student_user_ids())
-                target_user_ids.extend(CircularsModel.get_all_faculty_user_ids())
-            elif audience == 'students':
-                target_user_ids.extend(CircularsModel.get_all_student_user_ids())
-            elif audience == 'faculty':
-                target_user_ids.extend(CircularsModel.get_all_faculty_user_ids())
-            elif audience == 'specific_dept' and dept_id:
-                target_user_ids.extend(CircularsModel.get_student_user_ids_by_department(dept_id))
-                target_user_ids.extend(CircularsModel.get_faculty_user_ids_by_department(dept_id))
-            
-            # Remove duplicates if any (e.g., if a user is faculty and also a student - though unlikely in this system)
-            target_user_ids = list(set(target_user_ids))
-
-            for target_uid in target_user_ids:
-                emit_notification_to_user(
-                    user_id=target_uid,
-                    notification_data={
-                        "user_id": target_uid,
-                        "type": "new_circular",
-                        "message": notification_message,
-                        "related_id": circular_id # Link to the new circular
-                    }
-                )
+            _notify_circular_audience(audience, dept_id, "new_circular", notification_message, circular_id)
         return jsonify({"success": True, "message": "Circular posted successfully.", "circular_id": circular_id}), 201
     except Exception as e:
         print(f"Error posting circular: {e}")
@@ -111,12 +144,20 @@ def post_circular():
 @circulars_bp.route('/', methods=['GET'])
 @token_required(roles=['student', 'faculty', 'admin'])
 def get_my_circulars():
+    """
+    One page of the user's circulars (title and snippet; full content from GET /<id>).
+    Query parameters: limit (default 20, max 100), and before_posted_at / before_id
+    taken from the previous response's next_cursor.
+    """
     user_id = request.user['user_id']
     user_role = request.user['role']
+    limit, before_posted_at, before_id, error = parse_feed_args(request.args)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
 
     try:
-        circulars = CircularsModel.get_circulars_for_user(user_id, user_role)
-        return jsonify({"success": True, "circulars": circulars}), 200
+        page = CircularsModel.get_circulars_for_user(user_id, user_role, before_posted_at, before_id, limit)
+        return jsonify({"success": True, "circulars": page["circulars"], "next_cursor": page["next_cursor"]}), 200
     except Exception as e:
         print(f"Error fetching circulars for user {user_id} ({user_role}): {e}")
         return jsonify({"success": False, "error": "Internal server error while fetching circulars."}), 500
@@ -133,6 +174,25 @@ def get_single_circular(circular_id):
         print(f"Error fetching circular {circular_id}: {e}")
         return jsonify({"success": False, "error": "Internal server error."}), 500
 
+@circulars_bp.route('/<int:circular_id>/preview', methods=['GET'])
+@token_required(roles=['student', 'faculty', 'admin'])
+def preview_circular_attachment(circular_id):
+    """
+    The start of the attachment's extracted text with its page count and metadata.
+    status is 'pending' until the background extraction has run.
+    """
+    try:
+        circular = CircularsModel.get_circular_by_id(circular_id)
+        if not circular:
+            return jsonify({"success": False, "error": "Circular not found."}), 404
+        if not circular.get('attachment_path'):
+            return jsonify({"success": False, "error": "Circular has no attachment."}), 404
+        preview = DocumentTextModel.get_preview('circular', circular_id, Config.DOCUMENT_PREVIEW_LENGTH)
+        return jsonify({"success": True, "preview": preview or {"status": "pending"}}), 200
+    except Exception as e:
+        print(f"Error fetching attachment preview of circular {circular_id}: {e}")
+        return jsonify({"success": False, "error": "Internal server error."}), 500
+
 @circulars_bp.route('/<int:circular_id>', methods=['PUT'])
 @token_required(roles=['faculty', 'admin'])
 def update_circular(circular_id):
@@ -199,32 +259,13 @@ def update_circular(circular_id):
     try:
         updated = CircularsModel.update_circular(circular_id, title, content, audience, dept_id, new_attachment_path)
         if updated:
-            target_user_ids = []
+            if new_attachment_path != current_attachment_path:
+                if new_attachment_path:
+                    document_indexer.submit('circular', circular_id, new_attachment_path)
+                else:
+                    DocumentTextModel.delete_document_text('circular', circular_id)
             notification_message = f"Circular Updated: {title}"
-
-            if audience == 'all':
-                target_user_ids.extend(CircularsModel.get_all_student_user_ids())
-                target_user_ids.extend(CircularsModel.get_all_faculty_user_ids())
-            elif audience == 'students':
-                target_user_ids.extend(CircularsModel.get_all_student_user_ids())
-            elif audience == 'faculty':
-                target_user_ids.extend(CircularsModel.get_all_faculty_user_ids())
-            elif audience == 'specific_dept' and dept_id:
-                target_user_ids.extend(CircularsModel.get_student_user_ids_by_department(dept_id))
-                target_user_ids.extend(CircularsModel.get_faculty_user_ids_by_department(dept_id))
-            
-            target_user_ids = list(set(target_user_ids))
-
-            for target_uid in target_user_ids:
-                emit_notification_to_user(
-                    user_id=target_uid,
-                    notification_data={
-                        "user_id": target_uid,
-                        "type": "circular_update", # New type for updates
-                        "message": notification_message,
-                        "related_id": circular_id
-                    }
-                )
+            _notify_circular_audience(audience, dept_id, "circular_update", notification_message, circular_id)
             return jsonify({"success": True, "message": "Circular updated successfully."}), 200
         else:
             # If update didn't happen (e.g., circular_id not found), clean up new file
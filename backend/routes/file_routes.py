@@ -0,0 +1,14 @@
+# backend/routes/file_routes.py
+from flask import Blueprint
+from utils.file_delivery import send_upload
+
+files_bp = Blueprint('files', __name__)
+
+# ---------- Uploaded Files (circular attachments, note files) ----------
+@files_bp.route('/uploads/<subfolder>/<filename>', methods=['GET'])
+def serve_upload(subfolder, filename):
+    """
+    Serves the URLs stored for uploads (/uploads/<subfolder>/<file>), replacing Flask's static
+    folder so they get the same validators, Range support and proxy offload as downloads.
+    """
+    return send_upload(subfolder, filename)
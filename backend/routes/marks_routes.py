@@ -90,7 +90,7 @@ def update_class_marks():
 
         # Get offering_id
         dept_id_from_code = get_department_id_by_code(dept_code)
-        subject_id_from_code = get_subject_id_or_create(subject_code, "Temporary Name")
+        subject_id_from_code = get_subject_id_or_create(subject_code, create_if_missing=False) # Lookup only; never renames
 
         if not dept_id_from_code or not subject_id_from_code:
             return jsonify({"success": False, "error": "Department or Subject not found."}), 404
@@ -100,27 +100,9 @@ def update_class_marks():
             return jsonify({"success": False, "error": "Subject offering not found or could not be created."}), 500
         subject_name = MarksModel.get_subject_name_by_offering_id(offering_id)
         students_notified = set()
-        # Process each mark entry
-        success_count = 0
-        for entry in marks_entries:
-            student_id = entry.get('student_id')
-            ia_name = entry.get('ia_name')
-            score = entry.get('score')
-
-            if not all([student_id, ia_name, score is not None]): # score can be 0
-                print(f"Skipping invalid mark entry: {entry}")
-                continue
-            
-            if not isinstance(score, (int, float)) or not (0 <= score <= 100): # Assuming marks are out of 100 for now
-                 print(f"Skipping invalid score for entry: {entry}")
-                 continue
-
-            ia_type_id = MarksModel.get_ia_type_id_or_create(ia_name)
-            if ia_type_id:
-                MarksModel.update_student_marks(offering_id, student_id, ia_type_id, score)
-                success_count += 1
-            else:
-                print(f"Could not get/create IA type ID for '{ia_name}'")
+        # Validate, resolve IA types and upsert every entry in one batched transaction
+        summary = MarksModel.bulk_update_student_marks(offering_id, marks_entries)
+        success_count = summary["accepted"]
         for student_id in students_notified:
             student_user_id = MarksModel.get_user_id_from_student_id(student_id)
             if student_user_id:
@@ -139,7 +121,10 @@ def update_class_marks():
         return jsonify({
             "success": True,
             "message": f"Successfully processed {success_count} mark entries.",
-            "offering_id": offering_id
+            "offering_id": offering_id,
+            "accepted": summary["accepted"],
+            "rejected": summary["rejected"],
+            "errors": [r for r in summary["results"] if not r["accepted"]]
         }), 200
 
     except Exception as e:
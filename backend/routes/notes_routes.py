@@ -1,11 +1,17 @@
 # backend/routes/notes_routes.py
-from flask import Blueprint, request, jsonify, send_from_directory, current_app
+from flask import Blueprint, request, jsonify
 import os
+from werkzeug.utils import secure_filename
 from utils.jwt_utils import token_required
 from models.notes_model import NotesModel
 from utils.db_connection import get_db_connection
 from utils.fileupload_utils import allowed_file, save_uploaded_file, delete_file_from_server
-from routes.notification_routes import emit_notification_to_user 
+from utils.file_delivery import send_stored_upload
+from routes.notification_routes import emit_notification_to_users 
+from utils.socket_rooms import dept_semester_room
+from utils.document_indexer import document_indexer
+from models.document_text_model import DocumentTextModel
+from config import Config
 
 notes_bp = Blueprint('notes', __name__, url_prefix='/api/notes')
 
@@ -68,27 +74,23 @@ def upload_note():
              return jsonify({"success": False, "error": "Failed to save the uploaded file."}), 500
 
         note_id = NotesModel.upload_new_note(offering_id, faculty_id_param, title, description, file_url_for_db)
+        if note_id:
+            # Text, page count and metadata are extracted in the background for search/previews
+            document_indexer.submit('note', note_id, file_url_for_db)
 
         # --- SOCKET.IO NOTIFICATION INTEGRATION ---
         # 1. Get student IDs associated with this offering_id
         if note_id:
             # 1. Get student IDs associated with this offering_id
             student_user_ids = NotesModel.get_student_user_ids_for_offering(offering_id)
+            offering_class = NotesModel.get_offering_dept_semester(offering_id)
+            note_rooms = [dept_semester_room(*offering_class)] if offering_class else None
             
             # 2. Construct the notification message
             notification_message = f"New note '{title}' uploaded for {subject_name} ({subject_code})!"
             
-            # 3. Emit notification to each student
-            for student_uid in student_user_ids:
-                emit_notification_to_user(
-                    user_id=student_uid,
-                    notification_data={
-                        "user_id": student_uid, # Target user
-                        "type": "new_note",
-                        "message": notification_message,
-                        "related_id": note_id # Link to the new note
-                    }
-                )
+            # 3. Queue the notification for every student (delivered in the background)
+            emit_notification_to_users(student_user_ids, "new_note", notification_message, note_id, rooms=note_rooms)
         
         return jsonify({
             "success": True,
@@ -141,29 +143,45 @@ def get_notes():
 @notes_bp.route('/download/<int:note_id>', methods=['GET'])
 @token_required(roles=['student', 'faculty', 'admin'])
 def download_note(note_id):
+    """
+    Sends the note's file as an attachment named after the note. Supports ETag/Last-Modified
+    revalidation and Range requests; with UPLOAD_DELIVERY_MODE set, the front proxy streams it.
+    """
     try:
-        file_url_from_db = NotesModel.get_note_file_url(note_id)
-        if not file_url_from_db:
+        note = NotesModel.get_note_file(note_id)
+        if not note:
             return jsonify({"success": False, "error": "Note not found."}), 404
 
-        path_segments = file_url_from_db.split('/')
-        if len(path_segments) >= 3 and path_segments[1] == 'uploads':
-            subfolder = path_segments[2]
-            filename = path_segments[-1]
-            directory_to_serve_from = os.path.join(current_app.config['UPLOAD_FOLDER'], subfolder)
-
-            return send_from_directory(
-                directory=directory_to_serve_from,
-                path=filename,
-                as_attachment=True
-            )
-        else:
+        file_url_from_db = note['file_url']
+        if not file_url_from_db or len(file_url_from_db.split('/')) != 4:
             return jsonify({"success": False, "error": "Invalid file path stored for note."}), 500
+        extension = os.path.splitext(file_url_from_db)[1]
+        download_name = secure_filename(note['title']) or f"note_{note_id}"
+        return send_stored_upload(file_url_from_db, as_attachment=True,
+                                  download_name=f"{download_name}{extension}", private=True)
 
     except Exception as e:
         print(f"Error downloading note: {e}")
         return jsonify({"success": False, "error": "Internal server error while downloading note."}), 500
 
+# ---------- Preview Note (Extracted Text) ----------
+@notes_bp.route('/<int:note_id>/preview', methods=['GET'])
+@token_required(roles=['student', 'faculty', 'admin'])
+def preview_note(note_id):
+    """
+    The start of the note file's extracted text with its page count and metadata.
+    status is 'pending' until the background extraction has run.
+    """
+    try:
+        file_url = NotesModel.get_note_file_url(note_id)
+        if not file_url:
+            return jsonify({"success": False, "error": "Note not found."}), 404
+        preview = DocumentTextModel.get_preview('note', note_id, Config.DOCUMENT_PREVIEW_LENGTH)
+        return jsonify({"success": True, "preview": preview or {"status": "pending"}}), 200
+    except Exception as e:
+        print(f"Error fetching preview of note {note_id}: {e}")
+        return jsonify({"success": False, "error": "Internal server error while fetching the note preview."}), 500
+
 
 # ---------- Delete Note ----------
 @notes_bp.route('/<int:note_id>', methods=['DELETE'])
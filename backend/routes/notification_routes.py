@@ -3,39 +3,142 @@ from flask import Blueprint, jsonify, request
 from utils.db_connection import get_db_connection
 from utils.jwt_utils import token_required # Assuming you have a token_required decorator
 from flask_socketio import emit
-from config import socketio # Import socketio instance
+from utils.notification_dispatcher import notification_dispatcher
+from utils.socket_rooms import rooms_for_circular_audience
+from models.notification_model import (
+    NOTIFICATION_PAGE_SIZE,
+    db_get_user_notifications,
+    db_count_unread_notifications,
+    db_mark_notifications_read_up_to,
+    db_add_broadcast_notification,
+    db_get_broadcast_notifications_for_user,
+    db_count_unread_broadcasts,
+    db_mark_broadcast_as_read,
+    db_mark_broadcasts_read_up_to
+)
 
 notifications_bp = Blueprint('notifications_bp', __name__, url_prefix='/api/notifications')
 
+MAX_NOTIFICATION_PAGE_SIZE = 100
+
 # Helper function to fetch notifications for a user
-def get_user_notifications(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+def get_user_notifications(user_id, role=None, before_id=None, before_broadcast_id=None, limit=NOTIFICATION_PAGE_SIZE):
+    """
+    Returns one page of the user's own notifications merged with the broadcast notifications
+    addressed to their role/department, newest first, and the cursor for the next page.
+    Each source is read with its own keyset cursor (notification_id / broadcast_id), so a page
+    costs two LIMITed index range scans however many notifications the user has.
+    """
+    notifications = db_get_user_notifications(user_id, include_read=True, before_id=before_id, limit=limit)
+    for notif in notifications:
+        notif['source'] = 'user'
+    broadcasts = []
+    if role:
+        # Broadcasts are stored once and matched to the user at read time
+        broadcasts = db_get_broadcast_notifications_for_user(user_id, role, before_id=before_broadcast_id, limit=limit)
+        for item in broadcasts:
+            item['source'] = 'broadcast'
+
+    page = sorted(notifications + broadcasts, key=lambda n: n['created_at'], reverse=True)[:limit]
+
+    # Advance each cursor past what was shown; a source with nothing on this page keeps its cursor
+    next_cursor = {'before_id': before_id, 'before_broadcast_id': before_broadcast_id}
+    shown_ids = [n['notification_id'] for n in page if n['source'] == 'user']
+    shown_broadcast_ids = [n['broadcast_id'] for n in page if n['source'] == 'broadcast']
+    if shown_ids:
+        next_cursor['before_id'] = min(shown_ids)
+    if shown_broadcast_ids:
+        next_cursor['before_broadcast_id'] = min(shown_broadcast_ids)
+    has_more = (len(notifications) == limit or len(broadcasts) == limit
+                or len(notifications) + len(broadcasts) > len(page))
+    return page, (next_cursor if has_more else None)
+
+# API to get notifications for the authenticated user, one page at a time
+@notifications_bp.route('/', methods=['GET'])
+@token_required
+def get_notifications():
+    """
+    Query parameters: limit (default 20, max 100), and before_id / before_broadcast_id
+    taken from the previous response's next_cursor.
+    """
+    limit = request.args.get('limit', NOTIFICATION_PAGE_SIZE, type=int)
+    before_id = request.args.get('before_id', type=int)
+    before_broadcast_id = request.args.get('before_broadcast_id', type=int)
+    if limit < 1 or limit > MAX_NOTIFICATION_PAGE_SIZE:
+        return jsonify({"success": False, "error": f"limit must be between 1 and {MAX_NOTIFICATION_PAGE_SIZE}."}), 400
+
     try:
-        cursor.execute(
-            "SELECT notification_id, type, message, related_id, is_read, created_at "
-            "FROM notifications WHERE user_id = %s ORDER BY created_at DESC",
-            (user_id,)
+        notifications, next_cursor = get_user_notifications(
+            request.user['user_id'], request.user['role'],
+            before_id=before_id, before_broadcast_id=before_broadcast_id, limit=limit
         )
-        notifications = cursor.fetchall()
-        return notifications
-    finally:
-        cursor.close()
-        conn.close()
+        return jsonify({"success": True, "notifications": notifications, "next_cursor": next_cursor}), 200
+    except Exception as e:
+        print(f"Error fetching notifications: {e}")
+        return jsonify({"success": False, "error": "Internal server error while fetching notifications."}), 500
 
-# API to get all notifications for the authenticated user
-@notifications_bp.route('/', methods=['GET'])
+# API to get the unread badge count for the authenticated user
+@notifications_bp.route('/unread-count', methods=['GET'])
+@token_required
+def get_unread_count():
+    user_id = request.user['user_id']
+    try:
+        unread = db_count_unread_notifications(user_id)
+        unread_broadcasts = db_count_unread_broadcasts(user_id, request.user['role'])
+        return jsonify({
+            "success": True,
+            "unread_count": unread + unread_broadcasts,
+            "unread_notifications": unread,
+            "unread_broadcasts": unread_broadcasts
+        }), 200
+    except Exception as e:
+        print(f"Error counting unread notifications: {e}")
+        return jsonify({"success": False, "error": "Internal server error while counting notifications."}), 500
+
+# API to mark everything up to a given id as read (e.g. the newest item the user has seen)
+@notifications_bp.route('/read-all', methods=['PUT'])
+@token_required
+def mark_all_notifications_read():
+    """
+    Expects JSON: {"up_to_id": <notification_id>, "up_to_broadcast_id": <broadcast_id>}
+    (either or both). Items that arrive after the user looked are left unread.
+    """
+    data = request.get_json(silent=True) or {}
+    up_to_id = data.get('up_to_id')
+    up_to_broadcast_id = data.get('up_to_broadcast_id')
+    if up_to_id is None and up_to_broadcast_id is None:
+        return jsonify({"success": False, "error": "Provide up_to_id and/or up_to_broadcast_id."}), 400
+    try:
+        up_to_id = int(up_to_id) if up_to_id is not None else None
+        up_to_broadcast_id = int(up_to_broadcast_id) if up_to_broadcast_id is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "up_to_id and up_to_broadcast_id must be integers."}), 400
+
+    user_id = request.user['user_id']
+    try:
+        marked = db_mark_notifications_read_up_to(user_id, up_to_id) if up_to_id is not None else 0
+        marked_broadcasts = (
+            db_mark_broadcasts_read_up_to(user_id, request.user['role'], up_to_broadcast_id)
+            if up_to_broadcast_id is not None else 0
+        )
+        return jsonify({"success": True, "marked": marked, "marked_broadcasts": marked_broadcasts}), 200
+    except Exception as e:
+        print(f"Error marking notifications as read: {e}")
+        return jsonify({"success": False, "error": "Internal server error while marking notifications as read."}), 500
+
+# API to mark a broadcast notification as read for the authenticated user
+@notifications_bp.route('/broadcast/<int:broadcast_id>/read', methods=['PUT'])
 @token_required
-def get_notifications(current_user):
-    user_id = current_user['id']
-    notifications = get_user_notifications(user_id)
-    return jsonify(notifications), 200
+def mark_broadcast_notification_read(broadcast_id):
+    if db_mark_broadcast_as_read(broadcast_id, request.user['user_id']):
+        return jsonify({"message": "Notification marked as read"}), 200
+    return jsonify({"message": "Error marking notification as read"}), 500
 
 # API to mark a notification as read
 @notifications_bp.route('/<int:notification_id>/read', methods=['PUT'])
 @token_required
-def mark_notification_read(current_user, notification_id):
-    user_id = current_user['id']
+def mark_notification_read(notification_id):
+    user_id = request.user['user_id']
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
@@ -54,32 +157,38 @@ def mark_notification_read(current_user, notification_id):
         cursor.close()
         conn.close()
 
-# --- Socket.IO emission helper (can be used by other routes) ---
+# --- Socket.IO emission helpers (can be used by other routes) ---
 def emit_notification_to_user(user_id, notification_data):
-    """Emits a notification to a specific user's socket room."""
-    # Store in DB first
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "INSERT INTO notifications (user_id, type, message, related_id) VALUES (%s, %s, %s, %s)",
-            (notification_data['user_id'], notification_data['type'], notification_data['message'], notification_data.get('related_id'))
-        )
-        conn.commit()
-        new_notification_id = cursor.lastrowid
-
-        # Emit to the user's room
-        # Add the ID and created_at for immediate client display
-        notification_data['notification_id'] = new_notification_id
-        notification_data['is_read'] = False
-        notification_data['created_at'] = socketio.emit('new_notification', notification_data, room=str(user_id))
-        print(f"Emitted notification to user {user_id}: {notification_data['message']}")
-    except Exception as e:
-        conn.rollback()
-        print(f"Error saving or emitting notification: {e}")
-    finally:
-        cursor.close()
-        conn.close()
+    """
+    Queues a notification for a specific user.
+    It is stored and emitted to the user's socket room by the background dispatcher,
+    so the calling request doesn't wait on the INSERT or the emit.
+    """
+    emit_notification_to_users(
+        [user_id],
+        notification_data['type'],
+        notification_data['message'],
+        notification_data.get('related_id')
+    )
+
+def emit_notification_to_users(user_ids, notification_type, message, related_id=None, rooms=None):
+    """
+    Queues the same notification for many users as a single fan-out job.
+    Pass rooms (see utils/socket_rooms.py) when they cover exactly user_ids, so the live
+    update goes out as one emit per group room instead of one per user.
+    """
+    notification_dispatcher.submit(user_ids, notification_type, message, related_id, rooms=rooms)
+
+def broadcast_notification_to_audience(audience, dept_id, notification_type, message, related_id=None):
+    """
+    Fan-out-on-read delivery: stores the notification once for the whole audience
+    and queues a single live emit per audience group room. Returns the broadcast_id.
+    """
+    broadcast_id = db_add_broadcast_notification(notification_type, message, audience, dept_id, related_id)
+    notification_dispatcher.submit_broadcast(
+        broadcast_id, rooms_for_circular_audience(audience, dept_id), notification_type, message, related_id
+    )
+    return broadcast_id
 
 def get_students_in_department_and_semester(dept_id, semester):
     conn = get_db_connection()
@@ -0,0 +1,78 @@
+# backend/routes/search_routes.py
+from flask import Blueprint, request, jsonify
+from utils.jwt_utils import token_required
+from utils.fulltext import build_boolean_query
+from models.circulars_model import CircularsModel
+from models.notes_model import NotesModel
+from models.attendance_model import AttendanceModel
+
+search_bp = Blueprint('search', __name__, url_prefix='/api/search')
+
+SEARCH_TYPES = {'all', 'circulars', 'notes'}
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 50
+MAX_SEARCH_OFFSET = 500 # Ranked results are paged by offset; nobody reads past the first few pages
+
+# ---------- Search Circulars and Notes ----------
+@search_bp.route('/', methods=['GET'])
+@token_required(roles=['student', 'faculty', 'admin'])
+def search():
+    """
+    Ranked full-text search over the circulars and notes the user can see.
+    Query parameters: q (required), type (all | circulars | notes, default all),
+    limit (default 20, max 50), offset (from the previous response's next_offset).
+    Every word must match, as a prefix, in a circular's title/content or a note's
+    title/description/subject, or in the text extracted from the attached file.
+    """
+    user_id = request.user['user_id']
+    user_role = request.user['role']
+    search_type = request.args.get('type', 'all')
+    limit = request.args.get('limit', SEARCH_PAGE_SIZE, type=int)
+    offset = request.args.get('offset', 0, type=int)
+
+    if search_type not in SEARCH_TYPES:
+        return jsonify({"success": False, "error": f"type must be one of: {', '.join(sorted(SEARCH_TYPES))}."}), 400
+    if limit < 1 or limit > MAX_SEARCH_PAGE_SIZE:
+        return jsonify({"success": False, "error": f"limit must be between 1 and {MAX_SEARCH_PAGE_SIZE}."}), 400
+    if offset < 0 or offset > MAX_SEARCH_OFFSET:
+        return jsonify({"success": False, "error": f"offset must be between 0 and {MAX_SEARCH_OFFSET}."}), 400
+
+    boolean_query = build_boolean_query(request.args.get('q'))
+    if not boolean_query:
+        return jsonify({"success": False, "error": "Enter at least one word of 3 or more letters to search for."}), 400
+
+    # Each source returns its best offset + limit + 1 matches; the merged ranking is then sliced
+    wanted = offset + limit + 1
+    try:
+        results = []
+        if search_type in ('all', 'circulars'):
+            segment = CircularsModel.get_feed_segment(user_id, user_role)
+            for row in CircularsModel.search_circulars(segment, boolean_query, wanted):
+                row['type'] = 'circular'
+                results.append(row)
+
+        if search_type in ('all', 'notes'):
+            notes = []
+            if user_role == 'student':
+                # Students only see notes for their own department and semester
+                student = AttendanceModel._get_entity_ids(student_user_id=user_id)
+                if student.get('student_id'):
+                    notes = NotesModel.search_notes(boolean_query, student['student_dept_id'],
+                                                    student['student_semester'], wanted)
+            else:
+                notes = NotesModel.search_notes(boolean_query, limit=wanted)
+            for row in notes:
+                row['type'] = 'note'
+                results.append(row)
+
+        results.sort(key=lambda r: r['score'], reverse=True)
+        page = results[offset:offset + limit]
+        has_more = len(results) > offset + limit and offset + limit <= MAX_SEARCH_OFFSET
+        return jsonify({
+            "success": True,
+            "results": page,
+            "next_offset": offset + limit if has_more else None
+        }), 200
+    except Exception as e:
+        print(f"Error searching for user {user_id}: {e}")
+        return jsonify({"success": False, "error": "Internal server error while searching."}), 500
@@ -2,7 +2,9 @@
 from flask import Blueprint, request, jsonify
 from utils.jwt_utils import decode_token
 from models.student_model import StudentModel # Import the model
-from utils.db_connection import get_db_connection
+from models.circulars_model import CircularsModel
+from models.attendance_model import AttendanceModel
+from routes.circulars_routes import parse_feed_args
 
 student_bp = Blueprint('student', __name__)
 
@@ -42,21 +44,14 @@ def get_student_details():
 @student_bp.route('/api/student/circulars', methods=['GET']) # Changed route name to reflect circulars
 @token_required # Circulars also need authentication
 def get_student_circulars():
-    # We need the actual student_id (from student_details) for circulars filtering
     user_id = request.user['user_id']
-    
-    conn = get_db_connection() # Temporary connection to get student_id
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT student_id FROM student_details WHERE user_id = %s", (user_id,))
-    student_record = cursor.fetchone()
-    cursor.close()
-    conn.close()
-
-    if not student_record:
-        return jsonify({"success": False, "message": "Student record not found for user."}), 404
-        
-    student_id = student_record['student_id']
+    limit, before_posted_at, before_id, error = parse_feed_args(request.args)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
 
-    circulars = StudentModel.get_notifications_for_student(student_id) # Call the model method
+    # Same paginated, cached feed as /api/circulars/ (the student's department comes from the entity cache)
+    if not AttendanceModel._get_entity_ids(student_user_id=user_id).get('student_id'):
+        return jsonify({"success": False, "message": "Student record not found for user."}), 404
 
-    return jsonify({"success": True, "circulars": circulars}), 200
\ No newline at end of file
+    page = CircularsModel.get_circulars_for_user(user_id, 'student', before_posted_at, before_id, limit)
+    return jsonify({"success": True, "circulars": page["circulars"], "next_cursor": page["next_cursor"]}), 200
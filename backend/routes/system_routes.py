@@ -0,0 +1,41 @@
+# backend/routes/system_routes.py
+from flask import Blueprint, jsonify
+from utils.jwt_utils import token_required
+from utils.db_connection import get_pool_stats
+from utils.cache import get_all_cache_stats
+from utils.notification_dispatcher import notification_dispatcher
+
+system_bp = Blueprint('system', __name__, url_prefix='/api/system')
+
+# ---------- Database Connection Pool Statistics ----------
+@system_bp.route('/db-pool', methods=['GET'])
+@token_required(roles=['admin'])
+def db_pool_stats():
+    """
+    Endpoint for admins to inspect the database connection pool
+    (checked out / idle connections, waiters, timeouts, recycles).
+    """
+    try:
+        return jsonify({"success": True, "pool": get_pool_stats()}), 200
+    except Exception as e:
+        print(f"Error fetching connection pool stats: {e}")
+        return jsonify({"success": False, "error": "Internal server error."}), 500
+
+# ---------- In-Process Cache Statistics ----------
+@system_bp.route('/caches', methods=['GET'])
+@token_required(roles=['admin'])
+def cache_stats():
+    """
+    Endpoint for admins to inspect hit/miss counters of the in-process caches.
+    """
+    return jsonify({"success": True, "caches": get_all_cache_stats()}), 200
+
+# ---------- Notification Queue Metrics ----------
+@system_bp.route('/notification-queue', methods=['GET'])
+@token_required(roles=['admin'])
+def notification_queue_stats():
+    """
+    Endpoint for admins to inspect the background notification queue
+    (depth, pending notifications, delivery lag, failures).
+    """
+    return jsonify({"success": True, "queue": notification_dispatcher.stats()}), 200
@@ -1,17 +1,42 @@
 # backend/routes/timetable_routes.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response
 from utils.jwt_utils import token_required
 from models.timetable_model import (
-    save_timetable_entry,
-    get_timetable_for_class,
-    get_student_department_semester_section,
+    bulk_save_timetable,
+    get_missing_faculty_ids,
+    get_class_timetable,
+    get_department_id_for_timetable,
     #get_department_id_by_name, # <-- NEW: Import this helper
-    get_department_id_by_code  # <-- NEW: Import this helper
 )
-from routes.notification_routes import emit_notification_to_user, get_students_in_department_and_semester 
+from models.attendance_model import AttendanceModel
+from routes.notification_routes import emit_notification_to_users, get_students_in_department_and_semester 
+from utils.socket_rooms import dept_semester_room
+from utils.fileupload_utils import allowed_file
+from utils.timetable_import import (
+    IMPORT_EXTENSIONS,
+    TimetableImportError,
+    read_timetable_sheet,
+    parse_timetable_entries
+)
 
 timetable_bp = Blueprint("timetable", __name__, url_prefix="/api/timetable")
 
+def _notify_timetable_changes(diff):
+    """Queues one timetable_update notification per (department, semester) whose timetable changed."""
+    notified = set()
+    for cls in diff['classes']:
+        key = (cls['dept_id'], cls['semester'])
+        if not cls['dept_id'] or key in notified:
+            continue
+        notified.add(key)
+        sections = sorted({c['section'] for c in diff['classes']
+                           if (c['dept_id'], c['semester']) == key and c['section']})
+        notification_message = (f"Timetable for {cls['department_code']} (Semester {cls['semester']}, "
+                                f"Section {', '.join(sections) if sections else 'All'}) has been updated.")
+        student_user_ids = get_students_in_department_and_semester(cls['dept_id'], cls['semester'])
+        emit_notification_to_users(student_user_ids, "timetable_update", notification_message,
+                                   rooms=[dept_semester_room(cls['dept_id'], cls['semester'])])
+
 @timetable_bp.route("/faculty/save", methods=["POST"])
 @token_required(roles=['faculty', 'admin'])
 def save_timetable():
@@ -31,13 +56,7 @@ def save_timetable():
     if not entries or not isinstance(entries, list):
         return jsonify({"success": False, "error": "Missing or invalid 'entries' data in request"}), 400
     
-    # --- Notification Logic Preparation ---
-    # We need the dept_id to target students
-    dept_id = get_department_id_by_code(department_code) # Assuming this function exists or will be created
-    if not dept_id:
-        print(f"Warning: Department with code '{department_code}' not found for notification targeting.")
-
-    processed_count = 0
+    valid_entries = []
     errors = []
 
     for e in entries:
@@ -60,46 +79,28 @@ def save_timetable():
         if not e["faculty_id"]:
              errors.append(f"Invalid 'faculty_id' in entry: {e}. Must be a non-empty value for an assignment.")
              continue
+        valid_entries.append(e)
+
+    # Class fields come from the request; the entries are saved together in one transaction
+    class_fields = {"semester": semester, "department_name": department_name,
+                    "department_code": department_code, "section": section}
+    parsed, parse_errors = parse_timetable_entries(
+        [{k: v for k, v in e.items() if k not in class_fields} for e in valid_entries], class_fields)
+    errors += [f"Invalid entry found: {valid_entries[err['row']]}. {err['error']}" for err in parse_errors]
 
+    processed_count = 0
+    if parsed:
         try:
-            save_timetable_entry(
-                semester=semester,
-                department_name=department_name,
-                department_code=department_code,
-                section=section,
-                day_of_week=e["day"],
-                period_number=e["period"],
-                subject_code=e["subject_code"],
-                subject_name=e["subject_name"],
-                faculty_id=e["faculty_id"]
-            )
-            processed_count += 1
+            missing_faculty = set(get_missing_faculty_ids(e['faculty_id'] for e in parsed))
+            errors += [f"Invalid 'faculty_id' in entry: {e}. Faculty not found." for e in parsed if e['faculty_id'] in missing_faculty]
+            parsed = [e for e in parsed if e['faculty_id'] not in missing_faculty]
+            if parsed:
+                diff = bulk_save_timetable(parsed)
+                processed_count = len(parsed)
+                _notify_timetable_changes(diff)
         except Exception as db_err:
-            errors.append(f"Database error for entry {e}: {db_err}")
-            print(f"Database error saving timetable entry: {db_err}")
-
-    # --- Emit Notification AFTER all entries are processed ---
-    final_dept_id = get_department_id_by_code(department_code)
-    if processed_count > 0 and final_dept_id:
-        notification_message = f"Timetable for {department_name} (Semester {semester}, Section {section if section else 'All'}) has been updated."
-        
-        # Get all student user IDs for this department and semester
-        student_user_ids = get_students_in_department_and_semester(final_dept_id, semester)
-        
-        for student_id in student_user_ids:
-            emit_notification_to_user(
-                user_id=student_id,
-                notification_data={
-                    "user_id": student_id,
-                    "type": "timetable_update",
-                    "message": notification_message,
-                    "related_id": None
-                }
-            )
-        print(f"Timetable update notification emitted to {len(student_user_ids)} students.")
-    elif processed_count > 0 and not dept_id:
-         print(f"Timetable saved but could not emit targeted notifications: Department {department_name} (code: {department_code}) not found.")
-
+            errors.append(f"Database error saving timetable: {db_err}")
+            print(f"Database error saving timetable: {db_err}")
 
     if errors:
         if processed_count > 0:
@@ -117,23 +118,84 @@ def save_timetable():
 
     return jsonify({"success": True, "message": "Timetable saved successfully", "processed_entries": processed_count}), 200
 
+@timetable_bp.route("/import", methods=["POST"])
+@token_required(roles=['admin'])
+def import_timetable():
+    """
+    Bulk timetable import for any number of classes, applied all-or-nothing.
+    Either JSON {"entries": [...], "replace": false, "dry_run": false} or a multipart
+    CSV/Excel "file" (with replace/dry_run form fields). Each entry/row has department_code,
+    department_name, semester, section, day, period, subject_code, subject_name, faculty_id;
+    class fields may instead be given once at the top level / as form fields.
+    replace=true also removes slots of the imported classes that aren't in the import;
+    dry_run=true only reports the diff.
+    """
+    if request.files.get("file"):
+        file = request.files["file"]
+        if not allowed_file(file.filename, IMPORT_EXTENSIONS):
+            return jsonify({"success": False, "error": f"Invalid file format. Allowed: {', '.join(sorted(IMPORT_EXTENSIONS))}"}), 400
+        try:
+            rows = read_timetable_sheet(file)
+        except TimetableImportError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        options = request.form
+        first_row_number = 2 # Spreadsheet rows; the header is row 1
+    else:
+        options = request.get_json(silent=True) or {}
+        rows = options.get("entries")
+        if not isinstance(rows, list):
+            return jsonify({"success": False, "error": "Provide a 'file' or a JSON 'entries' array."}), 400
+        first_row_number = 0 # Array index
+
+    def flag(name):
+        value = options.get(name, False)
+        return value if isinstance(value, bool) else str(value).strip().lower() in ('1', 'true', 'yes')
+
+    entries, errors = parse_timetable_entries(rows, defaults=options, first_row_number=first_row_number)
+    if not entries and not errors:
+        return jsonify({"success": False, "error": "No timetable entries to import."}), 400
+    try:
+        missing_faculty = set(get_missing_faculty_ids(e['faculty_id'] for e in entries))
+        errors += [{"row": None, "error": f"Faculty {faculty_id} not found."} for faculty_id in sorted(missing_faculty)]
+        if errors:
+            return jsonify({"success": False, "error": "The timetable was not imported; fix these rows first.", "errors": errors}), 400
+
+        diff = bulk_save_timetable(entries, replace=flag("replace"), dry_run=flag("dry_run"))
+        if not flag("dry_run"):
+            _notify_timetable_changes(diff)
+        return jsonify({"success": True, "dry_run": flag("dry_run"), "diff": diff}), 200
+    except Exception as e:
+        print(f"Error importing timetable: {e}")
+        return jsonify({"success": False, "error": "Internal server error while importing the timetable."}), 500
+
+def _timetable_response(timetable, etag, **extra):
+    """JSON timetable with an ETag; answers 304 when the client already has this version."""
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        response = jsonify({"success": True, "timetable": timetable, **extra})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache' # Revalidate every time; 304 is cheap
+    return response
+
 @timetable_bp.route("/student", methods=["GET"])
 @token_required(roles=['student'])
 def get_student_timetable():
     user_id = request.user['user_id']
 
     try:
-        student_details = get_student_department_semester_section(user_id)
+        # Both lookups are cached, so a warm request doesn't touch MySQL
+        student_details = AttendanceModel._get_entity_ids(student_user_id=user_id)
 
-        if not student_details:
+        if not student_details.get('student_id'):
             return jsonify({"success": False, "error": "Student details not found for this user."}), 404
 
-        data = get_timetable_for_class(
-            dept_name=student_details["dept_name"],
-            semester=student_details["semester"],
-            section=student_details.get("section")
+        data, etag = get_class_timetable(
+            dept_id=student_details["student_dept_id"],
+            semester=student_details["student_semester"],
+            section=student_details.get("student_section")
         )
-        return jsonify({"success": True, "timetable": data}), 200
+        return _timetable_response(data, etag)
     except Exception as e:
         print(f"Error fetching student timetable for user {user_id}: {e}")
         return jsonify({"success": False, "error": "Internal server error while fetching student timetable."}), 500
@@ -143,16 +205,17 @@ def get_student_timetable():
 @timetable_bp.route("/faculty/<int:semester>/<string:department_name>/<string:section>", methods=["GET"])
 @token_required(roles=['faculty', 'admin'])
 def get_faculty_timetable_by_class_semester(semester, department_name, section):
+    """department_name may be the department's code (preferred, unique) or its name."""
     user_id = request.user['user_id']
-    user_role = request.user['role']
 
     try:
-        data = get_timetable_for_class(department_name, semester, section)
+        dept_id = get_department_id_for_timetable(department_name)
+        data, etag = get_class_timetable(dept_id, semester, section) if dept_id else ([], None)
 
         if not data:
             return jsonify({"success": True, "message": "No timetable found for this department, semester, and section"}), 200
             
-        return jsonify({"success": True, "timetable": data}), 200
+        return _timetable_response(data, etag)
     except Exception as e:
         print(f"Error fetching faculty timetable by department/semester/section for user {user_id}: {e}")
-        return jsonify({"success": False, "error": "Internal server error while fetching timetable."}), 500
\ No newline at end of file
+        return jsonify({"success": False, "error": "Internal server error while fetching timetable."}), 500
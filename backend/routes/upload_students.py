@@ -1,66 +1,136 @@
 # routes/upload_students.py
-from flask import Blueprint, request, jsonify
-import pandas as pd
-from utils.db_connection import get_db_connection
+import csv
+import io
+import os
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from werkzeug.utils import secure_filename
+from config import socketio
+from utils.jwt_utils import token_required
+from utils.fileupload_utils import allowed_file
+from utils.student_import import (
+    IMPORT_EXTENSIONS,
+    StudentImportError,
+    validate_header,
+    file_sha256,
+    create_import_job,
+    get_import_job,
+    claim_import_job,
+    run_import_job,
+    iter_import_errors
+)
 
 upload_bp = Blueprint("upload_bp", __name__)
 
+STUDENT_IMPORT_SUBFOLDER = 'student_imports' # Uploaded files are kept so failed jobs can resume
+
+def _job_response(job):
+    job = dict(job)
+    job.pop('file_path', None)
+    return job
+
+def _start_import(job_id):
+    """Claims the job and runs it in a background task. Returns False if it's already running."""
+    if not claim_import_job(job_id):
+        return False
+    socketio.start_background_task(run_import_job, job_id)
+    return True
+
+# ---------- Admin: Bulk Import Students ----------
 @upload_bp.route("/api/upload/students", methods=["POST"])
+@token_required(roles=['admin'])
 def upload_students():
+    """
+    Starts a bulk student import from a CSV or Excel file and returns 202 with its job_id.
+    Columns: name, usn, email, semester, department (dept code), section, optional password
+    (initial password; defaults to the USN). Students are upserted by USN, so re-importing
+    a file is safe. Uploading a file whose earlier import didn't finish resumes that job.
+    """
     if "file" not in request.files:
-        return jsonify({"error": "No file uploaded"}), 400
+        return jsonify({"success": False, "error": "No file uploaded"}), 400
 
     file = request.files["file"]
+    if not file.filename or not allowed_file(file.filename, IMPORT_EXTENSIONS):
+        return jsonify({"success": False, "error": f"Invalid file format. Allowed: {', '.join(sorted(IMPORT_EXTENSIONS))}"}), 400
 
-    # Only accept Excel files
-    if not file.filename.endswith((".xlsx", ".xls")):
-        return jsonify({"error": "Invalid file format"}), 400
+    target_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], STUDENT_IMPORT_SUBFOLDER)
+    os.makedirs(target_dir, exist_ok=True)
+    extension = file.filename.rsplit('.', 1)[1].lower()
+    temp_path = os.path.join(target_dir, f"upload_{os.urandom(8).hex()}.{extension}")
+    file.save(temp_path)
 
     try:
-        df = pd.read_excel(file)
+        validate_header(temp_path)
+    except StudentImportError as e:
+        os.remove(temp_path)
+        return jsonify({"success": False, "error": str(e)}), 400
 
-        required_columns = [
-            "user_id", "name", "usn", "email",
-            "semester", "department", "section"
-        ]
-
-        # Validate columns
-        for col in required_columns:
-            if col not in df.columns:
-                return jsonify({"error": f"Missing column: {col}"}), 400
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
+    try:
+        # Keep one copy per distinct file so a resumed job reads exactly the same rows
+        sha256 = file_sha256(temp_path)
+        file_path = os.path.join(target_dir, f"{sha256}.{extension}")
+        os.replace(temp_path, file_path)
 
-        query = """
-            INSERT INTO student_details 
-            (user_id, name, usn, email, semester, department, section)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """
+        job_id, resumed = create_import_job(secure_filename(file.filename), file_path, sha256, request.user['user_id'])
+        started = _start_import(job_id)
+        job = get_import_job(job_id)
+        return jsonify({
+            "success": True,
+            "message": ("Resuming the unfinished import of this file." if resumed else "Import started.")
+                       if started else "This file is already being imported.",
+            "job": _job_response(job)
+        }), 202
+    except Exception as e:
+        print("Upload error:", e)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return jsonify({"success": False, "error": "Failed to start the import"}), 500
 
-        rows = []
-        for _, row in df.iterrows():
-            rows.append((
-                str(row["user_id"]),
-                str(row["name"]),
-                str(row["usn"]),
-                str(row["email"]),
-                int(row["semester"]),
-                str(row["department"]),
-                str(row["section"])
-            ))
+# ---------- Admin: Import Job Status ----------
+@upload_bp.route("/api/upload/students/<int:job_id>", methods=["GET"])
+@token_required(roles=['admin'])
+def get_student_import(job_id):
+    job = get_import_job(job_id)
+    if not job:
+        return jsonify({"success": False, "error": "Import job not found."}), 404
+    return jsonify({"success": True, "job": _job_response(job)}), 200
 
-        cursor.executemany(query, rows)
-        conn.commit()
+# ---------- Admin: Resume a Failed/Interrupted Import ----------
+@upload_bp.route("/api/upload/students/<int:job_id>/resume", methods=["POST"])
+@token_required(roles=['admin'])
+def resume_student_import(job_id):
+    job = get_import_job(job_id)
+    if not job:
+        return jsonify({"success": False, "error": "Import job not found."}), 404
+    if job['status'] == 'completed':
+        return jsonify({"success": False, "error": "Import job has already completed."}), 409
+    if not os.path.exists(job['file_path']):
+        return jsonify({"success": False, "error": "The uploaded file is no longer available; upload it again."}), 410
+    if not _start_import(job_id):
+        return jsonify({"success": False, "error": "Import job is already running."}), 409
+    return jsonify({"success": True, "message": "Import resumed.", "job": _job_response(get_import_job(job_id))}), 202
 
-        cursor.close()
-        conn.close()
+# ---------- Admin: Per-Row Error Report ----------
+@upload_bp.route("/api/upload/students/<int:job_id>/errors", methods=["GET"])
+@token_required(roles=['admin'])
+def download_student_import_errors(job_id):
+    """Streams the rejected rows of an import as CSV (row, usn, error)."""
+    if not get_import_job(job_id):
+        return jsonify({"success": False, "error": "Import job not found."}), 404
 
-        return jsonify({
-            "message": "Students uploaded successfully",
-            "uploaded_count": len(rows)
-        }), 201
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["row", "usn", "error"])
+        for row in iter_import_errors(job_id):
+            writer.writerow(row)
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
 
-    except Exception as e:
-        print("Upload error:", e)
-        return jsonify({"error": "Failed to process file"}), 500
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename=student_import_{job_id}_errors.csv"}
+    )
@@ -0,0 +1,145 @@
+# backend/utils/attendance_alerts.py
+from config import Config, socketio
+from utils.db_connection import get_db_connection
+from routes.notification_routes import emit_notification_to_user
+from models.attendance_model import SUMMARY_BUILT_MARKER
+
+SHORTAGE_ALERT_JOB = 'attendance_shortage_alerts'
+
+def run_shortage_alert_job(threshold=None, min_sessions=None):
+    """
+    Sends one notification per (student, offering) whose attendance drops below threshold.
+
+    Incremental: only attendance_summary rows changed since the job's watermark are read
+    (attendance_summary is kept current by AttendanceModel, so their percentages need no
+    recomputation from the attendance history). attendance_shortage_alerts de-duplicates:
+    a student is alerted once per subject, and re-armed when they climb back above threshold.
+    A MySQL named lock keeps concurrent runs (several workers, cron + server) from overlapping.
+
+    Returns {"skipped": bool, "scanned": n, "alerted": n, "rearmed": n}.
+    """
+    threshold = Config.ATTENDANCE_SHORTAGE_THRESHOLD if threshold is None else threshold
+    min_sessions = Config.ATTENDANCE_ALERT_MIN_SESSIONS if min_sessions is None else min_sessions
+
+    conn = None
+    cursor = None
+    locked = False
+    alerts = []
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        cursor.execute("SELECT GET_LOCK(%s, 0) AS acquired", (SHORTAGE_ALERT_JOB,))
+        locked = cursor.fetchone()['acquired'] == 1
+        if not locked:
+            return {"skipped": True, "scanned": 0, "alerted": 0, "rearmed": 0}
+
+        # A summary that was never built holds partial counts and would raise false alerts
+        cursor.execute("SELECT 1 FROM job_watermarks WHERE job_name = %s", (SUMMARY_BUILT_MARKER,))
+        if cursor.fetchone() is None:
+            print("attendance_summary has not been built yet; skipping shortage alerts.")
+            return {"skipped": True, "scanned": 0, "alerted": 0, "rearmed": 0}
+
+        cursor.execute("SELECT NOW() AS run_started")
+        run_started = cursor.fetchone()['run_started']
+        cursor.execute("SELECT watermark FROM job_watermarks WHERE job_name = %s", (SHORTAGE_ALERT_JOB,))
+        row = cursor.fetchone()
+        watermark = row['watermark'] if row else None
+
+        query = """
+        SELECT att.student_id, att.offering_id, att.total_sessions, att.present_sessions,
+               sd.user_id, s.subject_code, s.subject_name,
+               (al.student_id IS NOT NULL) AS alerted
+        FROM attendance_summary att
+        JOIN student_details sd ON att.student_id = sd.student_id
+        JOIN subject_offerings so ON att.offering_id = so.offering_id
+        JOIN subjects s ON so.subject_id = s.subject_id
+        LEFT JOIN attendance_shortage_alerts al
+            ON al.student_id = att.student_id AND al.offering_id = att.offering_id
+        """
+        params = ()
+        if watermark is not None:
+            # Re-scan a little behind the watermark for transactions that committed late;
+            # the alerts table makes seeing a row twice harmless
+            query += " WHERE att.updated_at > %s - INTERVAL %s SECOND"
+            params = (watermark, Config.ATTENDANCE_ALERT_OVERLAP)
+        cursor.execute(query, params)
+        changed = cursor.fetchall()
+
+        rearm = []
+        for row in changed:
+            total = row['total_sessions']
+            percentage = (row['present_sessions'] / total * 100) if total > 0 else 100.0
+            if percentage < threshold and total >= min_sessions and not row['alerted']:
+                alerts.append((row, round(percentage, 2)))
+            elif percentage >= threshold and row['alerted']:
+                rearm.append((row['student_id'], row['offering_id']))
+
+        if alerts:
+            cursor.execute(
+                "INSERT IGNORE INTO attendance_shortage_alerts (student_id, offering_id, attendance_percentage) VALUES "
+                + ", ".join(["(%s, %s, %s)"] * len(alerts)),
+                tuple(value for row, percentage in alerts for value in (row['student_id'], row['offering_id'], percentage))
+            )
+        if rearm:
+            cursor.execute(
+                "DELETE FROM attendance_shortage_alerts WHERE (student_id, offering_id) IN ("
+                + ", ".join(["(%s, %s)"] * len(rearm)) + ")",
+                tuple(value for key in rearm for value in key)
+            )
+        cursor.execute(
+            """
+            INSERT INTO job_watermarks (job_name, watermark) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE watermark = VALUES(watermark)
+            """,
+            (SHORTAGE_ALERT_JOB, run_started)
+        )
+        conn.commit()
+    except Exception as e:
+        print(f"Error in run_shortage_alert_job: {e}")
+        if conn: conn.rollback()
+        raise
+    finally:
+        if cursor:
+            if locked:
+                try:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (SHORTAGE_ALERT_JOB,))
+                    cursor.fetchall()
+                except Exception as e:
+                    print(f"Error releasing shortage alert lock: {e}")
+            cursor.close()
+        if conn: conn.close()
+
+    # Only notify once the alert rows are committed
+    for row, percentage in alerts:
+        emit_notification_to_user(row['user_id'], {
+            'type': 'attendance_shortage',
+            'message': (
+                f"Attendance alert: your attendance in {row['subject_name']} ({row['subject_code']}) "
+                f"is {percentage:.1f}%, below the required {threshold:g}%."
+            ),
+            'related_id': row['offering_id'],
+        })
+    return {"skipped": False, "scanned": len(changed), "alerted": len(alerts), "rearmed": len(rearm)}
+
+_scheduler_started = False
+
+def start_shortage_alert_scheduler(interval=None):
+    """Runs the shortage alert job every interval seconds in a background task of the web server."""
+    global _scheduler_started
+    interval = Config.ATTENDANCE_ALERT_INTERVAL if interval is None else interval
+    if not interval or _scheduler_started:
+        return
+    _scheduler_started = True
+
+    def loop():
+        while True:
+            socketio.sleep(interval)
+            try:
+                result = run_shortage_alert_job()
+                if result['alerted'] or result['rearmed']:
+                    print(f"Attendance shortage alerts: {result}")
+            except Exception as e:
+                print(f"Attendance shortage alert run failed: {e}")
+
+    socketio.start_background_task(loop)
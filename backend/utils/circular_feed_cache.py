@@ -0,0 +1,25 @@
+# backend/utils/circular_feed_cache.py
+from config import Config
+from utils.cache import TTLCache
+from utils.db_connection import call_after_commit
+
+# Cached pages of the circulars feed (CircularsModel.get_circular_feed), one set per audience
+# segment. Everyone in a segment sees the same feed, so its pages are shared:
+#   ('students', dept_id) / ('faculty', dept_id)  -> 'all' + the role's circulars + that department's
+#   ('admin', None)                               -> every circular (also backs /recent)
+# Keys are (segment_role, segment_dept_id, before_posted_at, before_id, limit).
+# Creating, updating or deleting a circular drops the segments it is visible to once the
+# transaction commits. Department/faculty renames show up within the TTL.
+circular_feed_cache = TTLCache('circular_feed', maxsize=Config.CIRCULAR_FEED_CACHE_MAXSIZE, ttl=Config.CIRCULAR_FEED_CACHE_TTL)
+
+def _segment_sees(key, audience, dept_id):
+    role, segment_dept_id = key[0], key[1]
+    if role == 'admin' or audience == 'all':
+        return True
+    if audience == 'specific_dept':
+        return segment_dept_id == dept_id
+    return role == audience # 'students' / 'faculty'
+
+def invalidate_circular_feeds(audience, dept_id=None):
+    """Drops cached feed pages of every segment a circular with this audience is visible to."""
+    call_after_commit(lambda: circular_feed_cache.invalidate_where(lambda key: _segment_sees(key, audience, dept_id)))
@@ -1,11 +1,227 @@
-import mysql.connector
+import os
+import threading
+from flask import g, has_app_context, jsonify
 from config import Config
+from utils.db_pool import ConnectionPool
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """
+    Returns the process-wide connection pool, creating it on first use.
+    The pool is re-created after a fork so worker processes never share sockets.
+    """
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(
+                connect_args={
+                    "host": Config.MYSQL_HOST,
+                    "user": Config.MYSQL_USER,
+                    "password": Config.MYSQL_PASSWORD,
+                    "database": Config.MYSQL_DB,
+                },
+                pool_size=Config.MYSQL_POOL_SIZE,
+                max_overflow=Config.MYSQL_POOL_MAX_OVERFLOW,
+                timeout=Config.MYSQL_POOL_TIMEOUT,
+                recycle=Config.MYSQL_POOL_RECYCLE,
+                pre_ping=Config.MYSQL_POOL_PRE_PING,
+            )
+            _pool_pid = os.getpid()
+    return _pool
 
 def get_db_connection():
-    conn = mysql.connector.connect(
-        host=Config.MYSQL_HOST,
-        user=Config.MYSQL_USER,
-        password=Config.MYSQL_PASSWORD,
-        database=Config.MYSQL_DB
-    )
-    return conn
+    """
+    Returns a database connection.
+    Inside an HTTP request this is the request's shared unit-of-work connection;
+    anywhere else (background threads, CLI) it is a connection checked out from the pool.
+    Either way, callers keep using the usual commit()/rollback()/close() pattern.
+    """
+    if has_app_context():
+        unit = g.get('_db_unit')
+        if unit is not None:
+            return unit.connection()
+    return get_pool().get_connection()
+
+def get_dedicated_connection():
+    """
+    Returns a pooled connection of its own, outside the request's unit of work, whose
+    commit() is real. For work that commits in stages (batch imports with checkpoints)
+    or outlives the request's transaction. The caller must close() it.
+    """
+    return get_pool().get_connection()
+
+def get_streaming_connection():
+    """
+    Returns a dedicated connection for server-side (unbuffered) cursors whose rows are read
+    while a streamed response is being sent, i.e. after the request's transaction has finished.
+    The caller must close() it, or invalidate() it if results were left unread.
+    """
+    return get_dedicated_connection()
+
+def get_pool_stats():
+    return get_pool().stats()
+
+def call_after_commit(callback):
+    """
+    Runs callback once the current request's transaction has committed, and drops it
+    if the request rolls back. Outside a request there is nothing to wait for, so it runs now.
+    """
+    if has_app_context():
+        unit = g.get('_db_unit')
+        if unit is not None:
+            unit.after_commit(callback)
+            return
+    callback()
+
+def call_after_request(callback):
+    """
+    Runs callback once the current request's transaction has finished, whether it committed
+    or rolled back (for cleanup that has to look at what was actually stored). Outside a
+    request it runs now.
+    """
+    if has_app_context():
+        unit = g.get('_db_unit')
+        if unit is not None:
+            unit.after_request(callback)
+            return
+    callback()
+
+
+# --- Request-scoped unit of work ---
+
+class _UnitConnection:
+    """
+    What model code receives during a request.
+    commit() is deferred until the request finishes, rollback() dooms the whole
+    request transaction, and close() is a no-op (the unit releases the connection).
+    """
+
+    def __init__(self, unit):
+        self._unit = unit
+
+    def commit(self):
+        pass  # Committed once by the unit of work when the request succeeds
+
+    def rollback(self):
+        self._unit.rollback()
+
+    def close(self):
+        pass  # Released by the unit of work at teardown
+
+    def cursor(self, *args, **kwargs):
+        # Buffered cursors so a half-read result never blocks the next statement on the shared connection
+        kwargs.setdefault('buffered', True)
+        return self._unit.raw_connection().cursor(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._unit.raw_connection(), name)
+
+
+class UnitOfWork:
+    """
+    One connection and one transaction shared by every model call in a request.
+    The connection is checked out lazily, so requests that never touch MySQL cost nothing.
+    """
+
+    def __init__(self):
+        self._conn = None
+        self._after_commit = []
+        self._after_request = []
+        self.failed = False
+        self.connection_requests = 0
+
+    def raw_connection(self):
+        if self._conn is None:
+            self._conn = get_pool().get_connection()
+        return self._conn
+
+    def connection(self):
+        self.connection_requests += 1
+        return _UnitConnection(self)
+
+    def rollback(self):
+        self.failed = True
+        if self._conn is not None:
+            self._conn.rollback()
+
+    def after_commit(self, callback):
+        self._after_commit.append(callback)
+
+    def after_request(self, callback):
+        self._after_request.append(callback)
+
+    def commit(self):
+        if self._conn is not None:
+            if self.failed:
+                self._conn.rollback()
+                return
+            self._conn.commit()
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in after-commit callback: {e}")
+
+    def release(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            conn.close()  # The pool rolls back anything left uncommitted
+        callbacks, self._after_request = self._after_request, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in after-request callback: {e}")
+
+
+def _rolled_back_response():
+    response = jsonify({"success": False, "error": "Internal server error while saving changes."})
+    response.status_code = 500
+    return response
+
+
+def init_request_scope(app):
+    """Binds a UnitOfWork to flask.g for every request."""
+
+    @app.before_request
+    def _begin_unit_of_work():
+        g._db_unit = UnitOfWork()
+
+    @app.after_request
+    def _commit_unit_of_work(response):
+        unit = g.pop('_db_unit', None)
+        if unit is None:
+            return response
+        g._db_unit_finished = unit
+        if response.status_code >= 500:
+            unit.rollback()
+            return response
+        if unit.failed and response.status_code < 400:
+            # A model rolled back mid-request, so the whole request's changes are gone
+            return _rolled_back_response()
+        try:
+            # Commit before the response leaves so a failed commit is never reported as success
+            unit.commit()
+        except Exception as e:
+            print(f"Error committing request transaction: {e}")
+            unit.rollback()
+            return _rolled_back_response()
+        return response
+
+    @app.teardown_request
+    def _release_unit_of_work(exc):
+        unit = g.pop('_db_unit', None) or g.pop('_db_unit_finished', None)
+        if unit is None:
+            return
+        if exc is not None:
+            unit.failed = True
+        try:
+            unit.release()
+        except Exception as e:
+            print(f"Error releasing request connection: {e}")
@@ -0,0 +1,223 @@
+# backend/utils/db_pool.py
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import errors
+
+
+class PoolTimeoutError(errors.PoolError):
+    """Raised when no connection could be checked out within the pool timeout."""
+
+
+class PooledConnection:
+    """
+    Proxy handed out by ConnectionPool.
+    Behaves like a normal mysql.connector connection, except that close()
+    hands the underlying connection back to the pool instead of closing it.
+    """
+
+    def __init__(self, pool, raw_conn, created_at):
+        self._pool = pool
+        self._raw = raw_conn
+        self._created_at = created_at
+
+    def close(self):
+        if self._raw is None:
+            return  # Already returned; closing twice is harmless
+        raw_conn, self._raw = self._raw, None
+        self._pool._release(raw_conn, self._created_at)
+
+    def invalidate(self):
+        """Closes the underlying connection instead of pooling it (e.g. after abandoning an unbuffered result)."""
+        if self._raw is None:
+            return
+        raw_conn, self._raw = self._raw, None
+        self._pool._discard(raw_conn, 'connections_discarded')
+        self._pool._give_back_slot()
+
+    def __getattr__(self, name):
+        raw_conn = self.__dict__.get('_raw')
+        if raw_conn is None:
+            raise errors.OperationalError("Connection has already been returned to the pool.")
+        return getattr(raw_conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        # Safety net for call sites that forget to close(): give the slot back
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Fixed-size MySQL connection pool with overflow.
+
+    - pool_size connections are kept open and reused.
+    - Up to max_overflow extra connections are opened under load and closed on release.
+    - Idle connections are pinged on checkout (pre_ping) and replaced if dead.
+    - Connections older than recycle seconds are closed and reopened on checkout.
+    - Callers wait at most timeout seconds for a free slot, then PoolTimeoutError is raised.
+    """
+
+    def __init__(self, connect_args, pool_size=10, max_overflow=10, timeout=30, recycle=3600, pre_ping=True):
+        self._connect_args = dict(connect_args)
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._idle = deque()  # (raw_conn, created_at)
+        self._checked_out = 0
+        self._waiters = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+        self._stats = {
+            'checkouts': 0,
+            'connections_created': 0,
+            'connections_recycled': 0,
+            'connections_discarded': 0,
+            'failed_pings': 0,
+            'timeouts': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+        }
+
+    # --- Checkout ---
+    def get_connection(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._available:
+            while True:
+                if self._idle:
+                    raw_conn, created_at = self._idle.pop()  # LIFO keeps hot connections hot
+                    self._checked_out += 1
+                    break
+                if self._checked_out < self.pool_size + self.max_overflow:
+                    # Reserve a slot now, open the connection outside the lock
+                    raw_conn, created_at = None, None
+                    self._checked_out += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.timeout}s waiting for a database connection "
+                        f"(pool_size={self.pool_size}, max_overflow={self.max_overflow})."
+                    )
+                self._waiters += 1
+                try:
+                    self._available.wait(remaining)
+                finally:
+                    self._waiters -= 1
+
+            waited = time.monotonic() - started
+            self._stats['checkouts'] += 1
+            self._stats['total_wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+
+        try:
+            if raw_conn is not None:
+                raw_conn, created_at = self._check_health(raw_conn, created_at)
+            if raw_conn is None:
+                raw_conn, created_at = self._open(), time.monotonic()
+        except Exception:
+            self._give_back_slot()
+            raise
+
+        return PooledConnection(self, raw_conn, created_at)
+
+    def _open(self):
+        raw_conn = mysql.connector.connect(**self._connect_args)
+        with self._lock:
+            self._stats['connections_created'] += 1
+        return raw_conn
+
+    def _check_health(self, raw_conn, created_at):
+        """Returns (raw_conn, created_at), or (None, None) if the connection had to be dropped."""
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            self._discard(raw_conn, 'connections_recycled')
+            return None, None
+        if self.pre_ping:
+            try:
+                raw_conn.ping(reconnect=False)
+            except Exception:
+                with self._lock:
+                    self._stats['failed_pings'] += 1
+                self._discard(raw_conn, 'connections_discarded')
+                return None, None
+        return raw_conn, created_at
+
+    # --- Return ---
+    def _release(self, raw_conn, created_at):
+        try:
+            # Never hand a half-finished transaction to the next caller
+            if raw_conn.in_transaction:
+                raw_conn.rollback()
+        except Exception:
+            self._discard(raw_conn, 'connections_discarded')
+            self._give_back_slot()
+            return
+
+        with self._available:
+            self._checked_out -= 1
+            if len(self._idle) < self.pool_size:
+                self._idle.append((raw_conn, created_at))
+                raw_conn = None
+            self._available.notify()
+
+        if raw_conn is not None:
+            # Overflow connection: close it instead of keeping it around
+            self._discard(raw_conn, 'connections_discarded')
+
+    def _give_back_slot(self):
+        with self._available:
+            self._checked_out -= 1
+            self._available.notify()
+
+    def _discard(self, raw_conn, counter):
+        try:
+            raw_conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._stats[counter] += 1
+
+    # --- Maintenance / introspection ---
+    def dispose(self):
+        """Closes all idle connections. Checked-out connections are closed when returned."""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for raw_conn, _ in idle:
+            try:
+                raw_conn.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            checkouts = stats['checkouts']
+            stats.update({
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'timeout': self.timeout,
+                'recycle': self.recycle,
+                'checked_out': self._checked_out,
+                'idle': len(self._idle),
+                'overflow_in_use': max(0, self._checked_out + len(self._idle) - self.pool_size),
+                'waiters': self._waiters,
+                'avg_wait_seconds': (stats['total_wait_seconds'] / checkouts) if checkouts else 0.0,
+            })
+        return stats
@@ -0,0 +1,80 @@
+# backend/utils/document_indexer.py
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from config import Config
+from utils.db_connection import call_after_commit
+from utils.fileupload_utils import get_file_path_on_server
+from utils.text_extraction import extract_document, extractable_extensions
+from models.document_text_model import DocumentTextModel
+
+
+class DocumentIndexer:
+    """
+    Extracts the text of uploaded notes and circular attachments off the request thread.
+
+    submit() records the file as 'pending' in document_texts and, once the request commits,
+    hands it to a small worker pool that extracts the text, page count and metadata
+    (utils/text_extraction.py) and stores them for search and previews.
+    Files whose extraction never finished (e.g. the process restarted) stay 'pending'
+    and are picked up by backfill() (`flask --app app documents backfill`).
+    """
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='document-indexer')
+            return self._executor
+
+    def submit(self, source_type, source_id, file_url):
+        """Queues a note's file / circular's attachment for extraction. Needs an app context."""
+        path = get_file_path_on_server(file_url)
+        DocumentTextModel.mark_pending(source_type, source_id, file_url)
+        call_after_commit(lambda: self._pool().submit(self._extract, source_type, source_id, file_url, path))
+
+    def _extract(self, source_type, source_id, file_url, path):
+        result = extract_document(path or '', Config.DOCUMENT_TEXT_MAX_CHARS)
+        try:
+            DocumentTextModel.save_result(source_type, source_id, file_url, result)
+        except Exception as e:
+            print(f"Error saving extracted text for {source_type} {source_id}: {e}")
+            return 'failed'
+        if result['status'] == 'failed':
+            print(f"Text extraction failed for {source_type} {source_id}: {result['error']}")
+        return result['status']
+
+    def backfill(self, retry_failed=False, limit=None):
+        """
+        Extracts every note file / circular attachment that has no text for its current file yet
+        (including files recorded as 'unsupported' that an extractor can now read, such as PDFs
+        once pypdf is installed) and waits for the pool to finish. Returns a count per status.
+        """
+        futures = []
+        for row in DocumentTextModel.get_files_to_extract(retry_failed, limit, extractable_extensions()):
+            DocumentTextModel.mark_pending(row['source_type'], row['source_id'], row['file_url'])
+            futures.append(self._pool().submit(
+                self._extract, row['source_type'], row['source_id'], row['file_url'],
+                get_file_path_on_server(row['file_url'])
+            ))
+        wait(futures)
+        counts = {}
+        for future in futures:
+            counts[future.result()] = counts.get(future.result(), 0) + 1
+        return counts
+
+    def shutdown(self):
+        """Lets queued extractions finish (called at exit)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+
+
+document_indexer = DocumentIndexer(workers=Config.DOCUMENT_EXTRACTION_WORKERS)
+atexit.register(document_indexer.shutdown)
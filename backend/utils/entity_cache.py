@@ -0,0 +1,43 @@
+# backend/utils/entity_cache.py
+from config import Config
+from utils.cache import TTLCache
+from utils.db_connection import call_after_commit
+
+# Caches the natural-key -> surrogate-ID lookups done by AttendanceModel._get_entity_ids.
+# Keys are (kind, natural_key):
+#   ('dept', dept_code)          -> dept_id
+#   ('subject', subject_code)    -> subject_id
+#   ('dept_name', dept_code) / ('subject_name', subject_code) -> stored name (models/timetable_model.py)
+#   ('faculty', user_id)         -> faculty_id
+#   ('faculty_dept', user_id)    -> dept_id (models/circulars_model.py)
+#   ('student', user_id)         -> {student_id, student_dept_id, student_semester, student_section}
+# Only found rows are cached, so a newly created row is picked up on the next lookup.
+# Inside a request, lookups run on the request's uncommitted transaction, so both caching
+# (cache_entity) and invalidation wait for it to commit: a rolled-back row is never cached,
+# and a concurrent request can't re-cache the old value between invalidation and commit.
+entity_cache = TTLCache('entity_ids', maxsize=Config.ENTITY_CACHE_MAXSIZE, ttl=Config.ENTITY_CACHE_TTL)
+
+def cache_entity(key, value):
+    call_after_commit(lambda: entity_cache.set(key, value))
+
+def _invalidate_after_commit(*keys):
+    def invalidate():
+        for key in keys:
+            entity_cache.invalidate(key)
+    call_after_commit(invalidate)
+
+def invalidate_dept(dept_code):
+    if dept_code:
+        _invalidate_after_commit(('dept', dept_code), ('dept_name', dept_code))
+
+def invalidate_subject(subject_code):
+    if subject_code:
+        _invalidate_after_commit(('subject', subject_code), ('subject_name', subject_code))
+
+def invalidate_faculty(user_id):
+    if user_id:
+        _invalidate_after_commit(('faculty', user_id), ('faculty_dept', user_id))
+
+def invalidate_student(user_id):
+    if user_id:
+        _invalidate_after_commit(('student', user_id))
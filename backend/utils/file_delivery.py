@@ -0,0 +1,74 @@
+# backend/utils/file_delivery.py
+import os
+import re
+from flask import current_app, request, jsonify
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+from config import Config
+
+# Sends stored uploads (the /uploads route and authorized downloads such as notes).
+# - Conditional requests: ETag/Last-Modified validators answer repeat requests with 304, and
+#   Range requests get 206 partial content, so interrupted downloads resume.
+# - Content-addressed files (<sha256>.<ext>, see utils/fileupload_utils.py) never change: the
+#   hash is their strong ETag and they are cacheable for UPLOAD_IMMUTABLE_MAX_AGE.
+# - With UPLOAD_DELIVERY_MODE set, Flask only authorizes and sets headers; the front proxy
+#   (X-Sendfile for Apache/lighttpd, X-Accel-Redirect for nginx) streams the bytes and
+#   serves Range requests itself.
+
+CONTENT_ADDRESSED_NAME = re.compile(r'^([0-9a-f]{64})(\.[A-Za-z0-9]+)?$')
+DELIVERY_MODES = (None, 'x-sendfile', 'x-accel-redirect')
+
+def _not_found():
+    return jsonify({"success": False, "error": "File not found."}), 404
+
+def send_upload(subfolder, filename, as_attachment=False, download_name=None, private=False):
+    """
+    Response for UPLOAD_FOLDER/subfolder/filename. private marks responses that passed an
+    authorization check, so shared caches must not keep them.
+    """
+    base_upload_path = current_app.config.get('UPLOAD_FOLDER')
+    path = safe_join(base_upload_path, subfolder, filename) if base_upload_path else None
+    if not path or filename.startswith('.') or not os.path.isfile(path): # Dotfiles are uploads in progress
+        return _not_found()
+
+    mode = Config.UPLOAD_DELIVERY_MODE
+    if mode not in DELIVERY_MODES:
+        raise ValueError(f"Unknown UPLOAD_DELIVERY_MODE {mode!r}")
+    content_addressed = CONTENT_ADDRESSED_NAME.match(filename)
+
+    response = send_file(
+        path,
+        request.environ,
+        as_attachment=as_attachment,
+        download_name=download_name or filename,
+        # The content hash is a strong validator; other files get werkzeug's mtime/size tag
+        etag=content_addressed.group(1) if content_addressed else True,
+        max_age=Config.UPLOAD_IMMUTABLE_MAX_AGE if content_addressed else None,
+        use_x_sendfile=mode is not None,
+        # The proxy handles Range itself, so only the 304 check is done here
+        conditional=mode is None,
+        response_class=current_app.response_class,
+    )
+    if mode is not None:
+        response = response.make_conditional(request.environ)
+        sendfile_path = response.headers.pop('X-Sendfile', None)
+        if response.status_code != 304 and sendfile_path:
+            if mode == 'x-accel-redirect':
+                response.headers['X-Accel-Redirect'] = f"{Config.UPLOAD_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{subfolder}/{filename}"
+            else:
+                response.headers['X-Sendfile'] = sendfile_path
+        response.headers['Accept-Ranges'] = 'bytes'
+
+    if content_addressed:
+        response.cache_control.immutable = True
+    if private:
+        response.cache_control.public = None
+        response.cache_control.private = True
+    return response
+
+def send_stored_upload(relative_file_path, as_attachment=False, download_name=None, private=False):
+    """send_upload for a path as stored in the DB (/uploads/subfolder/filename)."""
+    parts = (relative_file_path or '').split('/')
+    if len(parts) != 4 or parts[1] != 'uploads':
+        return _not_found()
+    return send_upload(parts[2], parts[3], as_attachment, download_name, private)
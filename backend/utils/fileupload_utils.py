@@ -1,18 +1,62 @@
 # backend/utils/file_upload_utils.py
+import hashlib
 import os
 from werkzeug.utils import secure_filename
 from flask import current_app
+from config import Config
+from utils.db_connection import get_dedicated_connection, call_after_request
+
+# Uploads are content-addressed: a file is stored as <subfolder>/<sha256>.<ext>, so the same
+# file uploaded again (e.g. one PDF attached to several offerings) is stored once.
+# upload_blobs counts how many notes/circulars rows point at each file; the models keep the
+# count in step with their own writes (acquire_file_reference/release_file_reference), and
+# delete_file_from_server only unlinks a file nobody references any more.
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 def allowed_file(filename, allowed_extensions):
     """Checks if a file's extension is in the allowed set."""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
+def _register_blob(file_url, sha256, size_bytes):
+    """
+    Records (or re-stamps) a stored file in upload_blobs, committed at once.
+    last_uploaded_at keeps the file from being unlinked while the upload's own row is not yet
+    committed, and makes files from failed requests visible to `flask --app app uploads gc`.
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_dedicated_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO upload_blobs (file_url, sha256, size_bytes, ref_count, last_uploaded_at)
+            VALUES (%s, %s, %s, 0, NOW())
+            ON DUPLICATE KEY UPDATE sha256 = VALUES(sha256), size_bytes = VALUES(size_bytes),
+                last_uploaded_at = NOW()
+            """,
+            (file_url, sha256, size_bytes)
+        )
+        conn.commit()
+    except Exception as e:
+        print(f"Error in _register_blob: {e}")
+        if conn: conn.rollback()
+        raise
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
 def save_uploaded_file(file_storage_object, subfolder, user_id=None):
     """
-    Saves an uploaded file to a specific subfolder within the main UPLOAD_FOLDER.
-    Returns the relative path (e.g., /uploads/subfolder/unique_filename.ext)
+    Saves an uploaded file to a specific subfolder within the main UPLOAD_FOLDER, named after
+    the SHA-256 of its content (hashed while it streams to disk). If the subfolder already
+    holds the same content, that copy is shared instead of writing a second one.
+    Returns the relative path (e.g., /uploads/subfolder/<sha256>.ext)
     or None if no file or invalid file.
+    The caller's row takes a reference with acquire_file_reference in the same transaction.
+    (user_id is no longer part of the name, since identical files from anyone are shared.)
     """
     if not file_storage_object or file_storage_object.filename == '':
         return None
@@ -27,61 +71,202 @@ def save_uploaded_file(file_storage_object, subfolder, user_id=None):
     os.makedirs(target_upload_dir, exist_ok=True) # Ensure directory exists
 
     filename = secure_filename(file_storage_object.filename)
-    
-    # Prepend a unique identifier to avoid name collisions
-    unique_prefix = f"{user_id}_{os.urandom(8).hex()}" if user_id else os.urandom(8).hex()
-    unique_filename = f"{unique_prefix}_{filename}"
-    
-    file_path_on_server = os.path.join(target_upload_dir, unique_filename)
-    file_storage_object.save(file_path_on_server)
-
-    # Return the relative URL path to be stored in the database
-    # This path should be accessible via a static route
-    # Assumes static_url_path is '/uploads'
-    return os.path.join(current_app.static_url_path, subfolder, unique_filename).replace('\\', '/')
+    extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
 
-def delete_file_from_server(relative_file_path):
+    # Stream to a temporary name, hashing as we go, then move it into place
+    temp_path = os.path.join(target_upload_dir, f".upload_{os.urandom(8).hex()}")
+    try:
+        digest = hashlib.sha256()
+        size_bytes = 0
+        with open(temp_path, 'wb') as out:
+            while True:
+                chunk = file_storage_object.stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size_bytes += len(chunk)
+
+        sha256 = digest.hexdigest()
+        unique_filename = f"{sha256}.{extension}" if extension else sha256
+        # Return the relative URL path to be stored in the database
+        # This path should be accessible via a static route
+        # Assumes static_url_path is '/uploads'
+        file_url = os.path.join(current_app.static_url_path, subfolder, unique_filename).replace('\\', '/')
+
+        # Register first: this waits for a concurrent unlink of the same file to finish
+        # (it holds the row lock), so the existence check below can be trusted
+        _register_blob(file_url, sha256, size_bytes)
+        file_path_on_server = os.path.join(target_upload_dir, unique_filename)
+        if os.path.exists(file_path_on_server):
+            os.remove(temp_path) # Already stored; share it
+        else:
+            os.replace(temp_path, file_path_on_server)
+        return file_url
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def acquire_file_reference(cursor, file_url):
+    """Counts one more notes/circulars row pointing at file_url (run in the row's transaction)."""
+    if file_url:
+        cursor.execute(
+            """
+            INSERT INTO upload_blobs (file_url, ref_count) VALUES (%s, 1)
+            ON DUPLICATE KEY UPDATE ref_count = ref_count + 1
+            """,
+            (file_url,)
+        )
+
+def release_file_reference(cursor, file_url):
+    """Counts one row fewer pointing at file_url; pair with delete_file_from_server to unlink it."""
+    if file_url:
+        cursor.execute(
+            "UPDATE upload_blobs SET ref_count = GREATEST(ref_count - 1, 0) WHERE file_url = %s",
+            (file_url,)
+        )
+
+def get_file_path_on_server(relative_file_path):
     """
-    Deletes a file from the server given its relative path (as stored in DB).
-    Returns True if deleted, False if not found or error.
+    Maps a stored relative path (/uploads/subfolder/filename) to the file's absolute path
+    under UPLOAD_FOLDER. Returns None if the path doesn't have that shape.
     """
-    if not relative_file_path:
-        return False
-
     base_upload_path = current_app.config.get('UPLOAD_FOLDER')
-    if not base_upload_path:
-        print("Warning: UPLOAD_FOLDER not configured for file deletion.")
-        return False
-
-    # Construct the full path on the server's filesystem
-    # relative_file_path might be like /uploads/circular_attachments/some_file.pdf
-    # We need to remove the /uploads/ part to get the path relative to base_upload_path
-    # or just reconstruct it from filename for simplicity given our current structure
-    
-    # A safer way: get just the filename and reconstruct with base_upload_path
-    filename = os.path.basename(relative_file_path)
-    # The actual physical path could be base_upload_path/subfolder/filename
-    # We need to infer the subfolder from relative_file_path
-    
-    # Assuming relative_file_path is always /uploads/subfolder/filename
-    # So we can extract 'subfolder' and 'filename' from it.
+    if not base_upload_path or not relative_file_path:
+        return None
     parts = relative_file_path.split('/')
     if len(parts) >= 3 and parts[1] == 'uploads': # Check if it follows /uploads/subfolder/filename
-        subfolder = parts[2]
-        filename = parts[-1]
-        full_file_path_on_server = os.path.join(base_upload_path, subfolder, filename)
-        
+        return os.path.join(base_upload_path, parts[2], parts[-1])
+    return None
+
+def _unlink_if_unreferenced(relative_file_path, full_file_path_on_server):
+    """
+    Unlinks a stored file unless a row references it or it was uploaded within the grace period.
+    Files never recorded in upload_blobs (stored before content addressing) have one owner and
+    are simply removed. Returns True if the file was deleted.
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_dedicated_connection()
+        cursor = conn.cursor()
+        # The row lock makes a concurrent upload of the same content wait until we're done
+        cursor.execute(
+            """
+            SELECT ref_count, last_uploaded_at > NOW() - INTERVAL %s SECOND
+            FROM upload_blobs WHERE file_url = %s FOR UPDATE
+            """,
+            (Config.UPLOAD_BLOB_GRACE_SECONDS, relative_file_path)
+        )
+        blob = cursor.fetchone()
+        if blob and (blob[0] > 0 or blob[1]):
+            conn.rollback()
+            return False
+
+        deleted = False
         if os.path.exists(full_file_path_on_server):
             try:
                 os.remove(full_file_path_on_server)
                 print(f"File {full_file_path_on_server} removed from filesystem.")
-                return True
+                deleted = True
             except OSError as e:
                 print(f"Error deleting file {full_file_path_on_server}: {e}")
+                conn.rollback()
                 return False
         else:
             print(f"Warning: File {full_file_path_on_server} not found on filesystem for deletion.")
-            return False
-    else:
+        if blob:
+            cursor.execute("DELETE FROM upload_blobs WHERE file_url = %s", (relative_file_path,))
+        conn.commit()
+        return deleted
+    except Exception as e:
+        print(f"Error in _unlink_if_unreferenced: {e}")
+        if conn: conn.rollback()
+        return False
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def delete_file_from_server(relative_file_path):
+    """
+    Deletes a file from the server given its relative path (as stored in DB), unless another
+    note/circular still references it. Runs once the request's transaction has finished, so
+    the reference count it checks is the committed one.
+    Returns False if the path can't be mapped to a file.
+    """
+    if not relative_file_path:
+        return False
+
+    if not current_app.config.get('UPLOAD_FOLDER'):
+        print("Warning: UPLOAD_FOLDER not configured for file deletion.")
+        return False
+
+    full_file_path_on_server = get_file_path_on_server(relative_file_path)
+    if not full_file_path_on_server:
         print(f"Error: Could not infer subfolder from relative_file_path for deletion: {relative_file_path}")
-        return False
\ No newline at end of file
+        return False
+    call_after_request(lambda: _unlink_if_unreferenced(relative_file_path, full_file_path_on_server))
+    return True
+
+def recount_file_references():
+    """Recomputes upload_blobs.ref_count from the notes and circulars tables. Returns the rows written."""
+    conn = None
+    cursor = None
+    try:
+        conn = get_dedicated_connection()
+        cursor = conn.cursor()
+        cursor.execute("UPDATE upload_blobs SET ref_count = 0")
+        cursor.execute(
+            """
+            INSERT INTO upload_blobs (file_url, ref_count)
+            SELECT file_url, COUNT(*) FROM (
+                SELECT file_url FROM notes WHERE file_url IS NOT NULL
+                UNION ALL
+                SELECT attachment_path FROM circulars WHERE attachment_path IS NOT NULL
+            ) refs
+            GROUP BY file_url
+            ON DUPLICATE KEY UPDATE ref_count = VALUES(ref_count)
+            """
+        )
+        conn.commit()
+        return cursor.rowcount
+    except Exception as e:
+        print(f"Error in recount_file_references: {e}")
+        if conn: conn.rollback()
+        raise
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def collect_unreferenced_files():
+    """
+    Unlinks stored files that no row references and that are past the grace period (left behind
+    by failed requests or drifted counts; run recount_file_references first). Returns the count.
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_dedicated_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT file_url FROM upload_blobs
+            WHERE ref_count = 0 AND last_uploaded_at <= NOW() - INTERVAL %s SECOND
+            """,
+            (Config.UPLOAD_BLOB_GRACE_SECONDS,)
+        )
+        file_urls = [row[0] for row in cursor.fetchall()]
+    except Exception as e:
+        print(f"Error in collect_unreferenced_files: {e}")
+        raise
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+    deleted = 0
+    for file_url in file_urls:
+        full_file_path_on_server = get_file_path_on_server(file_url)
+        if full_file_path_on_server and _unlink_if_unreferenced(file_url, full_file_path_on_server):
+            deleted += 1
+    return deleted
@@ -0,0 +1,37 @@
+# backend/utils/fulltext.py
+import re
+
+# Helpers for MySQL FULLTEXT (InnoDB) search; the indexes are declared in utils/schema.py.
+# InnoDB keeps FULLTEXT indexes current on INSERT/UPDATE/DELETE, so nothing else has to
+# maintain them.
+
+# InnoDB's default stopword list and minimum token size (innodb_ft_min_token_size).
+# A required (+) term that is a stopword or too short would match nothing, so they are dropped.
+INNODB_STOPWORDS = {
+    'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en', 'for', 'from', 'how',
+    'i', 'in', 'is', 'it', 'la', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'what',
+    'when', 'where', 'who', 'will', 'with', 'und', 'www'
+}
+MIN_TOKEN_SIZE = 3
+MAX_TERMS = 10
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+def build_boolean_query(text):
+    """
+    Turns free text into a BOOLEAN MODE query where every word is required and matched as
+    a prefix ("data struct" -> "+data* +struct*"). Boolean operators typed by the user are
+    treated as plain separators. Returns None if no searchable word is left.
+    """
+    words = []
+    for word in _WORD.findall((text or '').lower()):
+        if len(word) >= MIN_TOKEN_SIZE and word not in INNODB_STOPWORDS and word not in words:
+            words.append(word)
+    if not words:
+        return None
+    return ' '.join(f'+{word}*' for word in words[:MAX_TERMS])
+
+def trim_snippet(text, length):
+    """Shortens text selected as LEFT(column, length + 1) to length characters plus an ellipsis."""
+    text = text or ''
+    return text[:length].rstrip() + '…' if len(text) > length else text
@@ -0,0 +1,239 @@
+# backend/utils/notification_dispatcher.py
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+
+from config import Config, socketio
+from utils.db_connection import call_after_commit
+from models.notification_model import db_add_notifications
+from utils.socket_rooms import user_room
+from utils.socketio_queue import get_socketio_emitter
+
+
+class NotificationDispatcher:
+    """
+    Background fan-out for notifications.
+
+    HTTP handlers call submit() and return immediately; worker tasks (threads, or green
+    threads when Socket.IO runs on eventlet/gevent) drain the bounded queue, persist
+    notifications in batches and emit them over Socket.IO (through the message queue,
+    if one is configured, so sockets on other workers are reached too).
+    Jobs that name group rooms (see utils/socket_rooms.py) are emitted once per room
+    rather than once per recipient. A room emit can't carry each member's notification_id,
+    so for stored notifications it is flagged refetch: the client reloads its notifications
+    (GET /api/notifications) to get the id it marks read.
+    When the queue stays full for enqueue_timeout seconds the job is delivered inline,
+    so back-pressure slows producers down instead of dropping notifications.
+    """
+
+    def __init__(self, max_queue_size=10000, workers=2, batch_size=500, enqueue_timeout=1.0):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'jobs_enqueued': 0,
+            'jobs_processed': 0,
+            'jobs_delivered_inline': 0,
+            'jobs_failed': 0,
+            'notifications_pending': 0,
+            'notifications_delivered': 0,
+            'notifications_failed': 0,
+            'socket_emits': 0,
+            'last_lag_seconds': 0.0,
+            'max_lag_seconds': 0.0,
+            'total_lag_seconds': 0.0,
+        }
+
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            for _ in range(self.workers):
+                if socketio.server is not None:
+                    socketio.start_background_task(self._worker)
+                else:
+                    # No Socket.IO server in this process (CLI/offline job): plain threads
+                    threading.Thread(target=self._worker, daemon=True).start()
+            self._started = True
+
+    def submit(self, user_ids, notification_type, message, related_id=None, rooms=None):
+        """
+        Queues one notification for every user in user_ids. Returns immediately.
+        If rooms is given, the stored notifications are announced with one emit per
+        group room (covering exactly those users) instead of one emit per user; that
+        payload has no notification_id and is flagged refetch instead.
+        Inside a request the job is only queued once the request's transaction commits,
+        so nobody is notified about a circular/note that was rolled back.
+        """
+        user_ids = list(dict.fromkeys(uid for uid in user_ids if uid))  # De-duplicate, keep order
+        if not user_ids:
+            return
+        job = {
+            'user_ids': user_ids,
+            'rooms': list(rooms) if rooms else None,
+            'type': notification_type,
+            'message': message,
+            'related_id': related_id,
+        }
+        call_after_commit(lambda: self._enqueue(job))
+
+    def submit_broadcast(self, broadcast_id, rooms, notification_type, message, related_id=None):
+        """
+        Queues the live Socket.IO delivery of an already-stored broadcast notification.
+        Nothing is written per user; the job emits once to each group room.
+        """
+        rooms = list(dict.fromkeys(rooms))
+        if not rooms:
+            return
+        job = {
+            'user_ids': [],
+            'rooms': rooms,
+            'type': notification_type,
+            'message': message,
+            'related_id': related_id,
+            'broadcast_id': broadcast_id,
+        }
+        call_after_commit(lambda: self._enqueue(job))
+
+    def _enqueue(self, job):
+        self.start()
+        job['enqueued_at'] = time.monotonic()
+        try:
+            self._queue.put(job, timeout=self.enqueue_timeout)
+        except queue.Full:
+            print(f"Notification queue full; delivering {_job_size(job)} notifications inline.")
+            self._count(jobs_delivered_inline=1)
+            self._deliver([job])
+            return
+        self._count(jobs_enqueued=1, notifications_pending=_job_size(job))
+
+    def _worker(self):
+        while True:
+            jobs = [self._queue.get()]
+            # Drain whatever else is waiting (up to batch_size notifications) into the same batch
+            pending = _job_size(jobs[0])
+            while pending < self.batch_size:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                jobs.append(job)
+                pending += _job_size(job)
+            try:
+                self._deliver(jobs)
+            except Exception as e:
+                # Keep the worker alive; a dead worker would leave every later job to inline delivery
+                print(f"Error delivering {len(jobs)} notification jobs: {e}")
+                self._count(jobs_failed=len(jobs))
+            finally:
+                self._count(jobs_processed=len(jobs), notifications_pending=-pending)
+                for _ in jobs:
+                    self._queue.task_done()
+
+    def _deliver(self, jobs):
+        created_at = datetime.now().isoformat()
+        emits = []  # (room, payload)
+        delivered = 0
+
+        rows = [
+            {'user_id': uid, 'type': job['type'], 'message': job['message'], 'related_id': job['related_id']}
+            for job in jobs if not job.get('broadcast_id') for uid in job['user_ids']
+        ]
+        notification_ids = []
+        if rows:
+            try:
+                notification_ids = db_add_notifications(rows)
+            except Exception as e:
+                print(f"Error saving notifications: {e}")
+                self._count(notifications_failed=len(rows))
+                notification_ids = None
+            if notification_ids is not None:
+                delivered += len(rows)
+                saved = iter(zip(rows, notification_ids))
+                for job in jobs:
+                    if job.get('broadcast_id'):
+                        continue
+                    job_rows = [next(saved) for _ in job['user_ids']]
+                    if job['rooms']:
+                        continue  # Announced to the group rooms below
+                    emits.extend(
+                        (user_room(row['user_id']),
+                         dict(row, notification_id=notification_id, is_read=False, created_at=created_at))
+                        for row, notification_id in job_rows
+                    )
+
+        # Group jobs: one emit per room. Broadcasts are already stored once, so this is all they need.
+        for job in jobs:
+            if not job['rooms'] or (not job.get('broadcast_id') and notification_ids is None):
+                continue
+            payload = {'type': job['type'], 'message': job['message'], 'related_id': job['related_id'],
+                       'is_read': False, 'created_at': created_at}
+            if job.get('broadcast_id'):
+                payload['broadcast_id'] = job['broadcast_id']
+                delivered += len(job['rooms'])
+            else:
+                payload['refetch'] = True # Members' notification_ids differ; the client refetches them
+            emits.extend((room, payload) for room in job['rooms'])
+
+        # The app's SocketIO, or a write-only emitter on the message queue in offline processes
+        emitter = get_socketio_emitter() if emits else None
+        if emits and emitter is None:
+            print(f"No Socket.IO server or message queue; skipping {len(emits)} live notification emits.")
+            emits = []
+        for room, payload in emits:
+            try:
+                emitter.emit('new_notification', payload, room=room)
+            except Exception as e:
+                print(f"Error emitting notification to room {room}: {e}")
+
+        now = time.monotonic()
+        lags = [now - job['enqueued_at'] for job in jobs]
+        with self._stats_lock:
+            self._stats['notifications_delivered'] += delivered
+            self._stats['socket_emits'] += len(emits)
+            self._stats['last_lag_seconds'] = lags[-1]
+            self._stats['max_lag_seconds'] = max(self._stats['max_lag_seconds'], *lags)
+            self._stats['total_lag_seconds'] += sum(lags)
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for key, delta in deltas.items():
+                self._stats[key] += delta
+
+    def flush(self, timeout=10):
+        """Waits (up to timeout seconds) for queued jobs to be delivered."""
+        deadline = time.monotonic() + timeout
+        while self._started and self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        finished = stats['jobs_processed'] + stats['jobs_delivered_inline']
+        stats.update({
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'workers': self.workers if self._started else 0,
+            'avg_lag_seconds': (stats['total_lag_seconds'] / finished) if finished else 0.0,
+        })
+        return stats
+
+
+def _job_size(job):
+    # Stored notifications for per-user jobs, room emits for broadcast jobs
+    return len(job['user_ids']) or len(job['rooms'])
+
+
+notification_dispatcher = NotificationDispatcher(
+    max_queue_size=Config.NOTIFICATION_QUEUE_SIZE,
+    workers=Config.NOTIFICATION_WORKERS,
+    batch_size=Config.NOTIFICATION_BATCH_SIZE,
+    enqueue_timeout=Config.NOTIFICATION_ENQUEUE_TIMEOUT,
+)
+atexit.register(notification_dispatcher.flush)
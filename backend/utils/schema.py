@@ -0,0 +1,172 @@
+# backend/utils/schema.py
+from utils.db_connection import get_db_connection
+from models.attendance_model import AttendanceModel
+
+# Tables and indexes added on top of the base college_portal schema.
+# Every statement must be safe to run again; ensure_schema() applies them at startup.
+SCHEMA_STATEMENTS = [
+    # Broadcast notifications: stored once per circular, matched to users at read time
+    """
+    CREATE TABLE IF NOT EXISTS broadcast_notifications (
+        broadcast_id INT AUTO_INCREMENT PRIMARY KEY,
+        type VARCHAR(50) NOT NULL,
+        message TEXT NOT NULL,
+        related_id INT NULL,
+        audience ENUM('all', 'students', 'faculty', 'specific_dept') NOT NULL,
+        dept_id INT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        KEY idx_broadcast_audience (audience, dept_id, broadcast_id)
+    )
+    """,
+    # Sparse per-user read state for broadcast notifications (a row only once read)
+    """
+    CREATE TABLE IF NOT EXISTS broadcast_notification_reads (
+        user_id INT NOT NULL,
+        broadcast_id INT NOT NULL,
+        read_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, broadcast_id)
+    )
+    """,
+    # Keyset pages of a user's notifications (WHERE user_id = ? AND notification_id < ? ORDER BY notification_id DESC)
+    "CREATE INDEX idx_notifications_user_id ON notifications (user_id, notification_id)",
+    # Covering index for unread counts and "mark read up to id"
+    "CREATE INDEX idx_notifications_unread ON notifications (user_id, is_read, notification_id)",
+    # Keyset pages of a class's session history, ordered by (session_date, session_id)
+    "CREATE INDEX idx_class_sessions_assignment_date ON class_sessions (assignment_id, session_date, session_id)",
+    # Per-student, per-offering attendance counters maintained by AttendanceModel
+    # (backfilled by ensure_schema on first creation; repair with `flask attendance-summary rebuild`)
+    """
+    CREATE TABLE IF NOT EXISTS attendance_summary (
+        student_id INT NOT NULL,
+        offering_id INT NOT NULL,
+        total_sessions INT NOT NULL DEFAULT 0,
+        present_sessions INT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (student_id, offering_id)
+    )
+    """,
+    # Change feed for the shortage alert job
+    "CREATE INDEX idx_attendance_summary_updated ON attendance_summary (updated_at)",
+    # Watermarks of incremental background jobs
+    """
+    CREATE TABLE IF NOT EXISTS job_watermarks (
+        job_name VARCHAR(64) PRIMARY KEY,
+        watermark DATETIME NOT NULL,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """,
+    # One row per (student, offering) currently alerted for attendance shortage; deleted once they recover
+    """
+    CREATE TABLE IF NOT EXISTS attendance_shortage_alerts (
+        student_id INT NOT NULL,
+        offering_id INT NOT NULL,
+        attendance_percentage DECIMAL(5, 2) NOT NULL,
+        alerted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (student_id, offering_id)
+    )
+    """,
+    # Student import pipeline (utils/student_import.py): USN is the upsert key
+    "CREATE UNIQUE INDEX uq_student_details_usn ON student_details (usn)",
+    """
+    CREATE TABLE IF NOT EXISTS student_import_jobs (
+        job_id INT AUTO_INCREMENT PRIMARY KEY,
+        file_name VARCHAR(255) NOT NULL,
+        file_path VARCHAR(512) NOT NULL,
+        file_sha256 CHAR(64) NOT NULL,
+        status ENUM('pending', 'running', 'completed', 'failed') NOT NULL DEFAULT 'pending',
+        rows_done INT NOT NULL DEFAULT 0,
+        batches_done INT NOT NULL DEFAULT 0,
+        inserted INT NOT NULL DEFAULT 0,
+        updated INT NOT NULL DEFAULT 0,
+        failed INT NOT NULL DEFAULT 0,
+        error TEXT NULL,
+        created_by INT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        KEY idx_student_import_jobs_sha (file_sha256, status)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS student_import_errors (
+        job_id INT NOT NULL,
+        source_row INT NOT NULL,
+        usn VARCHAR(50) NULL,
+        error VARCHAR(255) NOT NULL,
+        PRIMARY KEY (job_id, source_row)
+    )
+    """,
+    # Keyset pages of the circulars feed, newest first by (posted_at, circular_id)
+    "CREATE INDEX idx_circulars_posted ON circulars (posted_at, circular_id)",
+    # Search (routes/search_routes.py); InnoDB keeps FULLTEXT indexes current on every write
+    "CREATE FULLTEXT INDEX ft_circulars_title_content ON circulars (title, content)",
+    "CREATE FULLTEXT INDEX ft_notes_title_description ON notes (title, description)",
+    "CREATE FULLTEXT INDEX ft_subjects_name_code ON subjects (subject_name, subject_code)",
+    # Extracted text of notes' files and circulars' attachments (utils/document_indexer.py)
+    """
+    CREATE TABLE IF NOT EXISTS document_texts (
+        source_type ENUM('note', 'circular') NOT NULL,
+        source_id INT NOT NULL,
+        file_url VARCHAR(512) NOT NULL,
+        status ENUM('pending', 'done', 'failed', 'unsupported') NOT NULL DEFAULT 'pending',
+        page_count INT NULL,
+        metadata TEXT NULL,
+        content MEDIUMTEXT NULL,
+        error VARCHAR(255) NULL,
+        extracted_at TIMESTAMP NULL,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (source_type, source_id),
+        KEY idx_document_texts_status (status)
+    )
+    """,
+    "CREATE FULLTEXT INDEX ft_document_texts_content ON document_texts (content)",
+    # Content-addressed uploads (utils/fileupload_utils.py): how many notes/circulars rows share each file
+    """
+    CREATE TABLE IF NOT EXISTS upload_blobs (
+        file_url VARCHAR(512) NOT NULL PRIMARY KEY,
+        sha256 CHAR(64) NULL,
+        size_bytes BIGINT NULL,
+        ref_count INT NOT NULL DEFAULT 0,
+        last_uploaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        KEY idx_upload_blobs_unreferenced (ref_count, last_uploaded_at)
+    )
+    """,
+]
+
+# Errors meaning "already applied": duplicate key name, duplicate column, table exists
+_ALREADY_APPLIED_ERRNOS = {1050, 1060, 1061}
+
+def ensure_schema():
+    """
+    Applies SCHEMA_STATEMENTS. A statement that fails (e.g. a unique index over existing
+    duplicates) is logged and skipped so the others still apply. Then backfills
+    attendance_summary if it has never been built.
+    Returns False if anything failed or the database can't be reached.
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        ok = True
+        for statement in SCHEMA_STATEMENTS:
+            try:
+                cursor.execute(statement)
+            except Exception as e:
+                if getattr(e, 'errno', None) not in _ALREADY_APPLIED_ERRNOS:
+                    print(f"Error applying schema statement {' '.join(statement.split())[:80]!r}: {e}")
+                    ok = False
+        conn.commit()
+    except Exception as e:
+        print(f"Error ensuring database schema: {e}")
+        return False
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+    # Tables that need data, not just DDL, before they can be read
+    try:
+        AttendanceModel.ensure_attendance_summary_built()
+    except Exception as e:
+        print(f"Error backfilling attendance_summary: {e}")
+        ok = False
+    return ok
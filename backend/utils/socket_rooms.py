@@ -0,0 +1,51 @@
+# backend/utils/socket_rooms.py
+from models.notification_model import db_get_socket_audience
+
+# Room naming for Socket.IO group delivery.
+# Every socket joins its personal room (the user ID, as before) plus group rooms for its
+# role, department, department+semester and department+semester+section, so an audience
+# can be reached with one socketio.emit per room instead of one per user.
+
+def user_room(user_id):
+    return str(user_id)
+
+def role_room(role):
+    return f"role:{role}"
+
+def dept_room(dept_id):
+    return f"dept:{dept_id}"
+
+def dept_semester_room(dept_id, semester):
+    return f"dept:{dept_id}:sem:{semester}"
+
+def section_room(dept_id, semester, section):
+    return f"dept:{dept_id}:sem:{semester}:sec:{section}"
+
+def rooms_for_user(user_id):
+    """All rooms a user's socket should join, derived from their profile."""
+    rooms = [user_room(user_id)]
+    audience = db_get_socket_audience(user_id)
+    if not audience:
+        return rooms
+    if audience.get('role'):
+        rooms.append(role_room(audience['role']))
+    dept_id = audience.get('dept_id')
+    if dept_id:
+        rooms.append(dept_room(dept_id))
+        if audience.get('semester'):
+            rooms.append(dept_semester_room(dept_id, audience['semester']))
+            if audience.get('section'):
+                rooms.append(section_room(dept_id, audience['semester'], audience['section']))
+    return rooms
+
+def rooms_for_circular_audience(audience, dept_id=None):
+    """Group rooms covering a circular's audience ('all', 'students', 'faculty', 'specific_dept')."""
+    if audience == 'all':
+        return [role_room('student'), role_room('faculty')]
+    if audience == 'students':
+        return [role_room('student')]
+    if audience == 'faculty':
+        return [role_room('faculty')]
+    if audience == 'specific_dept' and dept_id:
+        return [dept_room(dept_id)]
+    return []
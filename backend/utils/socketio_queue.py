@@ -0,0 +1,131 @@
+# backend/utils/socketio_queue.py
+import json
+import sqlite3
+import threading
+import time
+
+import socketio as python_socketio
+from flask_socketio import SocketIO
+
+from config import Config, socketio
+
+# Socket.IO message queue selection.
+# With Config.SOCKETIO_MESSAGE_QUEUE unset every process only reaches its own sockets.
+# With a queue URL, an emit from any worker (or an offline job) is relayed to all workers:
+#   redis://... / rediss://...   -> Redis pub/sub (python-socketio RedisManager)
+#   kafka://..., zmq+tcp://..., amqp://... -> the matching python-socketio manager
+#   sqlite:///path/to/queue.db   -> SQLitePubSubManager below (single host, no broker needed)
+# Multiple workers still need sticky sessions at the load balancer for the polling transport.
+
+
+class SQLitePubSubManager(python_socketio.PubSubManager):
+    """
+    Socket.IO pub/sub backend that uses a shared SQLite file as the broker.
+    Meant for development, tests and single-host multi-process deployments where
+    running Redis isn't worth it. Publishers append rows; every listening process
+    polls for rows newer than the last one it has seen. Old rows are pruned.
+    """
+    name = 'sqlite'
+
+    def __init__(self, url='sqlite:///socketio_queue.db', channel='socketio', write_only=False,
+                 logger=None, poll_interval=0.05, retention=60):
+        self.path = url[len('sqlite:///'):] if url.startswith('sqlite:///') else url
+        self.poll_interval = poll_interval
+        self.retention = retention  # Seconds a message is kept for slow listeners
+        self._local = threading.local()
+        self._last_prune = 0.0
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self._execute(
+            """
+            CREATE TABLE IF NOT EXISTS socketio_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+
+    def _connection(self):
+        # One SQLite connection per thread; WAL lets listeners read while others publish
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _execute(self, query, params=()):
+        return self._connection().execute(query, params)
+
+    def _publish(self, data):
+        now = time.time()
+        self._execute(
+            "INSERT INTO socketio_messages (channel, payload, created_at) VALUES (?, ?, ?)",
+            (self.channel, json.dumps(data), now)
+        )
+        if now - self._last_prune > self.retention:
+            self._last_prune = now
+            self._execute("DELETE FROM socketio_messages WHERE created_at < ?", (now - self.retention,))
+
+    def _listen(self):
+        # Start from the current end of the log; messages published before we started are not replayed
+        last_id = self._execute("SELECT COALESCE(MAX(id), 0) FROM socketio_messages").fetchone()[0]
+        while True:
+            rows = self._execute(
+                "SELECT id, payload FROM socketio_messages WHERE channel = ? AND id > ? ORDER BY id",
+                (self.channel, last_id)
+            ).fetchall()
+            for message_id, payload in rows:
+                last_id = message_id
+                yield json.loads(payload)
+            if not rows:
+                self._sleep(self.poll_interval)
+
+    def _sleep(self, seconds):
+        # Cooperative sleep under eventlet/gevent when attached to a server
+        if self.server is not None:
+            self.server.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+
+def socketio_queue_options(url=None, channel=None, write_only=False):
+    """
+    Returns the keyword arguments that attach a SocketIO instance to the configured
+    message queue, for SocketIO.init_app(). Empty when no queue is configured.
+    """
+    url = url if url is not None else Config.SOCKETIO_MESSAGE_QUEUE
+    channel = channel or Config.SOCKETIO_CHANNEL
+    if not url:
+        return {}
+    if url.startswith('sqlite://'):
+        return {'client_manager': SQLitePubSubManager(url, channel=channel, write_only=write_only)}
+    # Flask-SocketIO builds the Redis/Kafka/ZMQ/Kombu manager itself (write-only when there is no app)
+    return {'message_queue': url, 'channel': channel}
+
+
+_external_emitter = None
+_external_emitter_lock = threading.Lock()
+
+def get_socketio_emitter():
+    """
+    Returns something to call .emit() on.
+    In the web server that is the app's SocketIO instance. In a process without one
+    (CLI commands, cron jobs) it is a write-only SocketIO that publishes to the message
+    queue, so those emits still reach clients connected to the web workers.
+    Returns None if there is neither a server nor a queue to publish to.
+    """
+    global _external_emitter
+    if socketio.server is not None:
+        return socketio
+    if _external_emitter is None:
+        if not Config.SOCKETIO_MESSAGE_QUEUE:
+            return None
+        with _external_emitter_lock:
+            if _external_emitter is None:
+                options = socketio_queue_options(write_only=True)
+                emitter = SocketIO()
+                emitter.init_app(None, **options)
+                _external_emitter = emitter
+    return _external_emitter
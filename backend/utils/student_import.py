@@ -0,0 +1,397 @@
+# backend/utils/student_import.py
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from werkzeug.security import generate_password_hash
+
+from config import Config
+from utils.db_connection import get_dedicated_connection
+from utils.entity_cache import invalidate_student
+
+# Bulk student import: chunked reading (CSV streams, Excel is split after loading),
+# vectorized validation in pandas, one department lookup per batch, USN-keyed upserts,
+# batched users creation and a per-row error report. Each batch commits together with
+# its checkpoint (rows_done) in student_import_jobs, so a failed or interrupted job
+# resumes from the first uncommitted batch.
+
+REQUIRED_COLUMNS = ('name', 'usn', 'email', 'semester', 'department', 'section')
+COLUMN_ALIASES = {'dept_code': 'department', 'department_code': 'department'}
+IMPORT_EXTENSIONS = {'csv', 'xlsx', 'xls'}
+MIN_SEMESTER, MAX_SEMESTER = 1, 8
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+
+
+class StudentImportError(Exception):
+    """Raised for a file that can't be imported at all (unreadable, missing columns)."""
+
+
+# --- Reading ---
+
+def _normalize_columns(df):
+    df.columns = [COLUMN_ALIASES.get(str(c).strip().lower(), str(c).strip().lower()) for c in df.columns]
+    return df
+
+def read_header(path):
+    """Returns the normalized column names of an import file, reading as little of it as possible."""
+    try:
+        if path.lower().endswith('.csv'):
+            df = pd.read_csv(path, nrows=0, dtype=str)
+        else:
+            df = pd.read_excel(path, nrows=0, dtype=str)
+    except Exception as e:
+        raise StudentImportError(f"Could not read the file: {e}")
+    return list(_normalize_columns(df).columns)
+
+def validate_header(path):
+    missing = [col for col in REQUIRED_COLUMNS if col not in read_header(path)]
+    if missing:
+        raise StudentImportError(f"Missing column(s): {', '.join(missing)}")
+
+def iter_chunks(path, batch_size, skip_rows=0):
+    """
+    Yields (first_row_number, DataFrame) batches of the file, all values as strings.
+    Row numbers are spreadsheet rows (the header is row 1). CSV is streamed chunk by chunk;
+    Excel can't be read incrementally by pandas, so it is loaded once and sliced.
+    """
+    if path.lower().endswith('.csv'):
+        reader = pd.read_csv(
+            path, dtype=str, keep_default_na=False, chunksize=batch_size,
+            skiprows=range(1, skip_rows + 1) if skip_rows else None
+        )
+        row_number = skip_rows + 2
+        for chunk in reader:
+            yield row_number, _normalize_columns(chunk)
+            row_number += len(chunk)
+    else:
+        df = _normalize_columns(pd.read_excel(path, dtype=str, keep_default_na=False))
+        for start in range(skip_rows, len(df), batch_size):
+            yield start + 2, df.iloc[start:start + batch_size]
+
+
+# --- Validation / normalization (vectorized) ---
+
+def normalize_batch(chunk, first_row_number):
+    """
+    Cleans one batch. Returns (valid, errors): valid has one row per importable student
+    (row_number, name, usn, email, semester, department, section, password);
+    errors has (row_number, usn, error) for every rejected row.
+    """
+    n = len(chunk)
+    df = pd.DataFrame({'row_number': np.arange(first_row_number, first_row_number + n)})
+    for col in ('name', 'usn', 'email', 'department', 'section'):
+        df[col] = chunk[col].astype('string').str.strip().to_numpy()
+    df['name'] = df['name'].str.replace(r'\s+', ' ', regex=True)
+    df['usn'] = df['usn'].str.upper()
+    df['email'] = df['email'].str.lower()
+    df['department'] = df['department'].str.upper()
+    df['section'] = df['section'].str.upper()
+    df['semester'] = pd.to_numeric(chunk['semester'].to_numpy(), errors='coerce')
+    df['password'] = (
+        chunk['password'].astype('string').to_numpy() if 'password' in chunk.columns
+        else pd.array([pd.NA] * n, dtype='string')
+    )
+
+    error = pd.Series(pd.NA, index=df.index, dtype='string')
+    def reject(mask, message):
+        error[mask.fillna(True).to_numpy() & error.isna().to_numpy()] = message
+
+    for col in ('usn', 'name', 'email', 'department', 'section'):
+        reject(df[col].isna() | (df[col] == ''), f"Missing {col}.")
+    reject(~df['email'].str.match(EMAIL_PATTERN), "Invalid email.")
+    reject(df['usn'].str.len() > 50, "USN is too long.")
+    reject(df['section'].str.len() > 5, "Section is too long.")
+    reject(
+        df['semester'].isna() | (df['semester'] % 1 != 0) | ~df['semester'].between(MIN_SEMESTER, MAX_SEMESTER),
+        f"Semester must be a whole number from {MIN_SEMESTER} to {MAX_SEMESTER}."
+    )
+    # Within a batch the last row for a USN wins, like a later batch overriding an earlier one
+    ok = error.isna()
+    reject(ok & df['usn'].where(ok).duplicated(keep='last'), "Superseded by a later row with the same USN.")
+    ok = error.isna()
+    reject(ok & df['email'].where(ok).duplicated(keep=False), "Email is used by more than one row.")
+
+    df['error'] = error
+    valid = df[df['error'].isna()].drop(columns='error').copy()
+    valid['semester'] = valid['semester'].astype(int)
+    errors = df.loc[df['error'].notna(), ['row_number', 'usn', 'error']]
+    return valid, errors
+
+
+# --- Job bookkeeping ---
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def create_import_job(file_name, file_path, sha256, created_by):
+    """Registers an import, or returns the unfinished job already importing the same file."""
+    conn = None
+    cursor = None
+    try:
+        conn = get_dedicated_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT job_id FROM student_import_jobs WHERE file_sha256 = %s AND status <> 'completed' "
+            "ORDER BY job_id DESC LIMIT 1",
+            (sha256,)
+        )
+        existing = cursor.fetchone()
+        if existing:
+            return existing[0], True
+        cursor.execute(
+            "INSERT INTO student_import_jobs (file_name, file_path, file_sha256, created_by) VALUES (%s, %s, %s, %s)",
+            (file_name, file_path, sha256, created_by)
+        )
+        conn.commit()
+        return cursor.lastrowid, False
+    except Exception as e:
+        print(f"Error in create_import_job: {e}")
+        if conn: conn.rollback()
+        raise
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def get_import_job(job_id):
+    conn = None
+    cursor = None
+    try:
+        conn = get_dedicated_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT job_id, file_name, file_path, status, rows_done, batches_done, inserted, updated, failed,
+                   error, created_by, created_at, updated_at,
+                   (status = 'running' AND updated_at < NOW() - INTERVAL %s SECOND) AS stale
+            FROM student_import_jobs WHERE job_id = %s
+            """,
+            (Config.STUDENT_IMPORT_STALE_AFTER, job_id)
+        )
+        job = cursor.fetchone()
+        if job:
+            job['stale'] = bool(job['stale'])
+        return job
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def claim_import_job(job_id):
+    """
+    Marks a job as running if it may run now (pending, failed, or running but stale).
+    Returns True if this caller won the claim.
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_dedicated_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE student_import_jobs SET status = 'running', error = NULL
+            WHERE job_id = %s
+              AND (status IN ('pending', 'failed')
+                   OR (status = 'running' AND updated_at < NOW() - INTERVAL %s SECOND))
+            """,
+            (job_id, Config.STUDENT_IMPORT_STALE_AFTER)
+        )
+        conn.commit()
+        return cursor.rowcount == 1
+    except Exception as e:
+        print(f"Error in claim_import_job: {e}")
+        if conn: conn.rollback()
+        raise
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def _finish_import_job(job_id, status, error=None):
+    conn = None
+    cursor = None
+    try:
+        conn = get_dedicated_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE student_import_jobs SET status = %s, error = %s WHERE job_id = %s",
+            (status, error, job_id)
+        )
+        conn.commit()
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def iter_import_errors(job_id, batch_size=1000):
+    """Yields the error report rows (source_row, usn, error) of a job in row order."""
+    last_row = 0
+    while True:
+        conn = None
+        cursor = None
+        try:
+            conn = get_dedicated_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT source_row, usn, error FROM student_import_errors "
+                "WHERE job_id = %s AND source_row > %s ORDER BY source_row LIMIT %s",
+                (job_id, last_row, batch_size)
+            )
+            rows = cursor.fetchall()
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+        if not rows:
+            return
+        for row in rows:
+            yield row
+        last_row = rows[-1][0]
+
+
+# --- Writing ---
+
+def _in_clause(values):
+    return ", ".join(["%s"] * len(values))
+
+def _write_batch(cursor, job_id, valid, errors, dept_ids, hasher):
+    """
+    Writes one validated batch on the caller's transaction.
+    Returns (inserted, updated, errors) with errors extended by rows rejected against the database.
+    """
+    rejected = []
+
+    # Department codes -> dept_id, one query for the codes this job hasn't seen yet
+    unknown_codes = [code for code in valid['department'].unique() if code not in dept_ids]
+    if unknown_codes:
+        cursor.execute(
+            f"SELECT dept_code, dept_id FROM departments WHERE dept_code IN ({_in_clause(unknown_codes)})",
+            tuple(unknown_codes)
+        )
+        found = dict(cursor.fetchall())
+        for code in unknown_codes:
+            dept_ids[code] = found.get(code)
+    valid = valid.assign(dept_id=valid['department'].map(dept_ids))
+    missing_dept = valid['dept_id'].isna()
+    for row in valid[missing_dept].itertuples(index=False):
+        rejected.append((row.row_number, row.usn, f"Unknown department code '{row.department}'."))
+    valid = valid[~missing_dept]
+
+    existing = {}
+    email_owner = {}
+    if len(valid):
+        usns = valid['usn'].tolist()
+        cursor.execute(
+            f"SELECT usn, user_id FROM student_details WHERE usn IN ({_in_clause(usns)})",
+            tuple(usns)
+        )
+        existing = dict(cursor.fetchall())
+        emails = valid['email'].tolist()
+        cursor.execute(f"SELECT email, id FROM users WHERE email IN ({_in_clause(emails)})", tuple(emails))
+        email_owner = {email.lower(): user_id for email, user_id in cursor.fetchall()}
+
+    new_rows, update_rows = [], []
+    for row in valid.itertuples(index=False):
+        user_id = existing.get(row.usn)
+        owner = email_owner.get(row.email)
+        if owner is not None and owner != user_id:
+            rejected.append((row.row_number, row.usn, "Email already belongs to another user."))
+        elif user_id is None:
+            new_rows.append(row)
+        else:
+            update_rows.append((row, user_id, owner is None))
+
+    # New students: users rows first (initial password = given password, else the USN)
+    if new_rows:
+        hashes = list(hasher.map(
+            generate_password_hash,
+            [row.password if isinstance(row.password, str) and row.password else row.usn for row in new_rows]
+        ))
+        params = []
+        for row, password_hash in zip(new_rows, hashes):
+            params.extend((row.email, password_hash, 'student'))
+        cursor.execute(
+            "INSERT INTO users (email, password_hash, role) VALUES " + ", ".join(["(%s, %s, %s)"] * len(new_rows)),
+            tuple(params)
+        )
+        # Read the IDs back by email: a multi-row INSERT's IDs are only consecutive with
+        # innodb_autoinc_lock_mode 0/1, not with MySQL 8's default (2, interleaved)
+        new_emails = [row.email for row in new_rows]
+        cursor.execute(f"SELECT email, id FROM users WHERE email IN ({_in_clause(new_emails)})", tuple(new_emails))
+        created = {email.lower(): user_id for email, user_id in cursor.fetchall()}
+        new_user_ids = [created[email] for email in new_emails]
+    else:
+        new_user_ids = []
+
+    # Existing students keep their account; only a changed email is carried over
+    email_changes = [(row.email, user_id) for row, user_id, email_changed in update_rows if email_changed]
+    if email_changes:
+        cursor.executemany("UPDATE users SET email = %s WHERE id = %s", email_changes)
+
+    upserts = [(row, user_id) for row, user_id in zip(new_rows, new_user_ids)]
+    upserts += [(row, user_id) for row, user_id, _ in update_rows]
+    if upserts:
+        params = []
+        for row, user_id in upserts:
+            params.extend((user_id, row.name, row.usn, row.semester, int(row.dept_id), row.section))
+        cursor.execute(
+            "INSERT INTO student_details (user_id, name, usn, semester, dept_id, section) VALUES "
+            + ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(upserts))
+            + " ON DUPLICATE KEY UPDATE name = VALUES(name), semester = VALUES(semester),"
+              " dept_id = VALUES(dept_id), section = VALUES(section)",
+            tuple(params)
+        )
+
+    all_errors = [tuple(r) for r in errors.itertuples(index=False)] + rejected
+    if all_errors:
+        cursor.execute(
+            "INSERT IGNORE INTO student_import_errors (job_id, source_row, usn, error) VALUES "
+            + ", ".join(["(%s, %s, %s, %s)"] * len(all_errors)),
+            tuple(v for row_number, usn, error in all_errors
+                  for v in (job_id, int(row_number), None if pd.isna(usn) else usn, error))
+        )
+    return len(new_rows), [user_id for _, user_id, _ in update_rows], len(all_errors)
+
+def run_import_job(job_id, batch_size=None):
+    """
+    Processes a claimed job from its checkpoint to the end of the file.
+    Each batch (students, users, error rows, checkpoint) commits as one transaction.
+    """
+    batch_size = batch_size or Config.STUDENT_IMPORT_BATCH_SIZE
+    job = get_import_job(job_id)
+    if not job:
+        return
+    dept_ids = {}
+    try:
+        validate_header(job['file_path'])
+        with ThreadPoolExecutor(max_workers=Config.STUDENT_IMPORT_HASH_WORKERS) as hasher:
+            for first_row_number, chunk in iter_chunks(job['file_path'], batch_size, skip_rows=job['rows_done']):
+                valid, errors = normalize_batch(chunk, first_row_number)
+                conn = None
+                cursor = None
+                try:
+                    conn = get_dedicated_connection()
+                    cursor = conn.cursor()
+                    inserted, updated_user_ids, failed = _write_batch(cursor, job_id, valid, errors, dept_ids, hasher)
+                    cursor.execute(
+                        """
+                        UPDATE student_import_jobs
+                        SET rows_done = rows_done + %s, batches_done = batches_done + 1,
+                            inserted = inserted + %s, updated = updated + %s, failed = failed + %s
+                        WHERE job_id = %s
+                        """,
+                        (len(chunk), inserted, len(updated_user_ids), failed, job_id)
+                    )
+                    conn.commit()
+                except Exception:
+                    if conn: conn.rollback()
+                    raise
+                finally:
+                    if cursor: cursor.close()
+                    if conn: conn.close()
+                for user_id in updated_user_ids:
+                    invalidate_student(user_id) # Department/semester/section may have changed
+        _finish_import_job(job_id, 'completed')
+    except Exception as e:
+        print(f"Student import job {job_id} failed: {e}")
+        _finish_import_job(job_id, 'failed', str(e)[:1000])
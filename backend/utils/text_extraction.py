@@ -0,0 +1,140 @@
+# backend/utils/text_extraction.py
+import html
+import os
+import re
+import zipfile
+
+try:
+    from pypdf import PdfReader # Optional: without it PDFs are recorded as 'unsupported'
+except ImportError:
+    PdfReader = None
+
+# Text, page count and metadata extraction for uploaded notes and circular attachments.
+# DOCX/PPTX are zip files of XML and are read with the standard library; PDF needs pypdf.
+# extract_document() never raises: the outcome is described by the returned status.
+
+MAX_XML_MEMBER_BYTES = 50 * 1024 * 1024 # Refuse suspiciously large (zip bomb) parts
+
+_DOCX_PARAGRAPH = re.compile(r'<w:p[ >].*?</w:p>', re.S)
+_DOCX_TEXT = re.compile(r'<w:t(?: [^>]*)?>([^<]*)</w:t>')
+_PPTX_PARAGRAPH = re.compile(r'<a:p>.*?</a:p>', re.S)
+_PPTX_TEXT = re.compile(r'<a:t>([^<]*)</a:t>')
+_PPTX_SLIDE = re.compile(r'^ppt/slides/slide(\d+)\.xml$')
+_CORE_PROPERTIES = {
+    'title': re.compile(r'<dc:title>([^<]*)</dc:title>'),
+    'author': re.compile(r'<dc:creator>([^<]*)</dc:creator>'),
+    'last_modified_by': re.compile(r'<cp:lastModifiedBy>([^<]*)</cp:lastModifiedBy>'),
+    'created': re.compile(r'<dcterms:created[^>]*>([^<]*)</dcterms:created>'),
+    'modified': re.compile(r'<dcterms:modified[^>]*>([^<]*)</dcterms:modified>'),
+}
+
+
+class UnsupportedDocument(Exception):
+    """The file type can't be extracted (images, archives, PDFs without pypdf)."""
+
+
+def _read_member(archive, name):
+    info = archive.getinfo(name)
+    if info.file_size > MAX_XML_MEMBER_BYTES:
+        raise ValueError(f"{name} is too large to extract")
+    return archive.read(name).decode('utf-8', errors='replace')
+
+def _office_metadata(archive):
+    metadata = {}
+    if 'docProps/core.xml' in archive.namelist():
+        core = _read_member(archive, 'docProps/core.xml')
+        for key, pattern in _CORE_PROPERTIES.items():
+            match = pattern.search(core)
+            if match and match.group(1).strip():
+                metadata[key] = html.unescape(match.group(1).strip())
+    return metadata
+
+def _office_count(archive, tag):
+    if 'docProps/app.xml' not in archive.namelist():
+        return None
+    match = re.search(rf'<{tag}>(\d+)</{tag}>', _read_member(archive, 'docProps/app.xml'))
+    return int(match.group(1)) if match else None
+
+def _extract_docx(path):
+    with zipfile.ZipFile(path) as archive:
+        document = _read_member(archive, 'word/document.xml')
+        paragraphs = (''.join(_DOCX_TEXT.findall(p)) for p in _DOCX_PARAGRAPH.findall(document))
+        text = '\n'.join(html.unescape(p) for p in paragraphs if p.strip())
+        # Word only knows the page count as of the last save; it's stored in app.xml
+        return text, _office_count(archive, 'Pages'), _office_metadata(archive)
+
+def _extract_pptx(path):
+    with zipfile.ZipFile(path) as archive:
+        slides = sorted(
+            (int(match.group(1)), name) for name in archive.namelist()
+            for match in [_PPTX_SLIDE.match(name)] if match
+        )
+        texts = []
+        for _, name in slides:
+            slide = _read_member(archive, name)
+            lines = (''.join(_PPTX_TEXT.findall(p)) for p in _PPTX_PARAGRAPH.findall(slide))
+            texts.append('\n'.join(html.unescape(line) for line in lines if line.strip()))
+        return '\n\n'.join(t for t in texts if t), len(slides), _office_metadata(archive)
+
+def _extract_pdf(path, max_chars):
+    if PdfReader is None:
+        raise UnsupportedDocument("PDF extraction needs the pypdf package")
+    reader = PdfReader(path)
+    metadata = {}
+    info = reader.metadata or {}
+    for key, field in (('title', '/Title'), ('author', '/Author'), ('created', '/CreationDate'), ('producer', '/Producer')):
+        if info.get(field):
+            metadata[key] = str(info.get(field))
+    texts = []
+    length = 0
+    for page in reader.pages:
+        if length >= max_chars:
+            break
+        page_text = page.extract_text() or ''
+        texts.append(page_text)
+        length += len(page_text)
+    return '\n\n'.join(texts), len(reader.pages), metadata
+
+def _extract_txt(path, max_chars):
+    with open(path, 'rb') as f:
+        raw = f.read(max_chars * 4) # Enough bytes for max_chars characters of UTF-8
+    try:
+        text = raw.decode('utf-8')
+    except UnicodeDecodeError:
+        text = raw.decode('latin-1')
+    return text, None, {}
+
+def extractable_extensions():
+    """Extensions extract_document can read here (PDF only when pypdf is installed)."""
+    extensions = {'docx', 'pptx', 'txt'}
+    if PdfReader is not None:
+        extensions.add('pdf')
+    return extensions
+
+def extract_document(path, max_chars):
+    """
+    Extracts a file's text. Returns {"status": "done" | "unsupported" | "failed",
+    "content", "page_count", "metadata", "error"}; content is cut to max_chars characters.
+    """
+    result = {'status': 'done', 'content': None, 'page_count': None, 'metadata': {}, 'error': None}
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    try:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File not found: {os.path.basename(path)}")
+        if extension == 'docx':
+            text, pages, metadata = _extract_docx(path)
+        elif extension == 'pptx':
+            text, pages, metadata = _extract_pptx(path)
+        elif extension == 'pdf':
+            text, pages, metadata = _extract_pdf(path, max_chars)
+        elif extension == 'txt':
+            text, pages, metadata = _extract_txt(path, max_chars)
+        else:
+            raise UnsupportedDocument(f"No text extractor for .{extension} files")
+        text = re.sub(r'[ \t]+', ' ', text or '').strip()
+        result.update(content=text[:max_chars], page_count=pages, metadata=metadata)
+    except UnsupportedDocument as e:
+        result.update(status='unsupported', error=str(e))
+    except Exception as e:
+        result.update(status='failed', error=f"{type(e).__name__}: {e}"[:255])
+    return result
@@ -0,0 +1,29 @@
+# backend/utils/timetable_cache.py
+import hashlib
+import json
+
+from config import Config
+from utils.cache import TTLCache
+from utils.db_connection import call_after_commit
+
+# Precomputed weekly timetables, keyed by (dept_id, semester, section) where section is
+# lower-cased, or None for the whole semester. Values are {"timetable": [...], "etag": "..."}.
+# Saves invalidate the affected (dept_id, semester) once their transaction commits; the TTL
+# bounds staleness in other worker processes, which this in-process cache can't reach.
+timetable_cache = TTLCache('timetable', maxsize=Config.TIMETABLE_CACHE_MAXSIZE, ttl=Config.TIMETABLE_CACHE_TTL)
+
+def timetable_key(dept_id, semester, section=None):
+    section = section.strip().lower() if section and section.strip() else None
+    return (dept_id, semester, section)
+
+def timetable_etag(rows):
+    payload = json.dumps(rows, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def invalidate_class_timetable(dept_id, semester):
+    """Drops every cached section of (dept_id, semester) after the current transaction commits."""
+    call_after_commit(lambda: timetable_cache.invalidate_where(lambda key: key[0] == dept_id and key[1] == semester))
+
+def invalidate_all_timetables():
+    """For changes that show up in many timetables (subject, department or faculty names)."""
+    call_after_commit(timetable_cache.clear)
@@ -0,0 +1,101 @@
+# backend/utils/timetable_import.py
+import pandas as pd
+
+# Parsing/validation for bulk timetable imports (models/timetable_model.bulk_save_timetable).
+# Entries come from a JSON array or an uploaded sheet with one row per slot. Class-level fields
+# (department_code, department_name, semester, section) may be given once as defaults.
+
+ENTRY_FIELDS = ('department_code', 'department_name', 'semester', 'section',
+                'day', 'period', 'subject_code', 'subject_name', 'faculty_id')
+CLASS_FIELDS = ('department_code', 'department_name', 'semester', 'section')
+COLUMN_ALIASES = {'dept_code': 'department_code', 'dept_name': 'department_name', 'day_of_week': 'day',
+                  'period_number': 'period'}
+IMPORT_EXTENSIONS = {'csv', 'xlsx', 'xls'}
+DAYS_OF_WEEK = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+_DAY_LOOKUP = {day.lower(): day for day in DAYS_OF_WEEK}
+
+
+class TimetableImportError(Exception):
+    """Raised for a sheet that can't be read at all."""
+
+
+def read_timetable_sheet(file):
+    """Reads an uploaded CSV/Excel sheet into a list of entry dicts (all values as strings)."""
+    try:
+        if file.filename.lower().endswith('.csv'):
+            df = pd.read_csv(file, dtype=str, keep_default_na=False)
+        else:
+            df = pd.read_excel(file, dtype=str, keep_default_na=False)
+    except Exception as e:
+        raise TimetableImportError(f"Could not read the file: {e}")
+    df.columns = [COLUMN_ALIASES.get(str(c).strip().lower(), str(c).strip().lower()) for c in df.columns]
+    return df.to_dict('records')
+
+def _as_int(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value.strip())
+    return None
+
+def parse_timetable_entries(rows, defaults=None, first_row_number=0):
+    """
+    Validates raw entries and returns (entries, errors).
+    Entries are normalized dicts with every ENTRY_FIELDS key; errors are
+    {"row": n, "error": "..."} with n counted from first_row_number.
+    The same slot may appear only once, and a department/subject code must keep one name.
+    """
+    defaults = {k: v for k, v in (defaults or {}).items() if k in CLASS_FIELDS and v not in (None, '')}
+    entries, errors, slots = [], [], {}
+    names = {'department_code': {}, 'subject_code': {}}
+    for offset, raw in enumerate(rows):
+        row_number = first_row_number + offset
+        if not isinstance(raw, dict):
+            errors.append({"row": row_number, "error": "Entry must be an object."})
+            continue
+        raw = {COLUMN_ALIASES.get(k, k): v for k, v in raw.items()}
+        values = dict(defaults, **{k: v for k, v in raw.items() if v not in (None, '')})
+
+        missing = [f for f in ENTRY_FIELDS if f != 'section' and f not in values]
+        if missing:
+            errors.append({"row": row_number, "error": f"Missing {', '.join(missing)}."})
+            continue
+
+        entry = {f: values.get(f) for f in ENTRY_FIELDS}
+        for field in ('department_code', 'department_name', 'section', 'subject_code', 'subject_name'):
+            entry[field] = str(entry[field] or '').strip()
+        for field in ('semester', 'period', 'faculty_id'):
+            entry[field] = _as_int(entry[field])
+        entry['day'] = _DAY_LOOKUP.get(str(entry['day']).strip().lower())
+
+        invalid = [f for f in ('department_code', 'department_name', 'subject_code', 'subject_name') if not entry[f]]
+        invalid += [f for f in ('semester', 'period', 'faculty_id') if entry[f] is None]
+        if entry['day'] is None:
+            invalid.append('day')
+        if invalid:
+            errors.append({"row": row_number, "error": f"Invalid {', '.join(invalid)}."})
+            continue
+
+        slot = (entry['department_code'].lower(), entry['semester'], entry['section'].lower(),
+                entry['day'], entry['period'])
+        if slot in slots:
+            errors.append({"row": row_number, "error": f"Duplicate slot; already given in row {slots[slot]}."})
+            continue
+        conflict = None
+        for code_field, name_field in (('department_code', 'department_name'), ('subject_code', 'subject_name')):
+            first = names[code_field].get(entry[code_field].lower())
+            if first and first[0] != entry[name_field]:
+                conflict = f"{name_field} differs from row {first[1]} for {code_field} '{entry[code_field]}'."
+                break
+        if conflict:
+            errors.append({"row": row_number, "error": conflict})
+            continue
+        for code_field, name_field in (('department_code', 'department_name'), ('subject_code', 'subject_name')):
+            # Codes match case-insensitively (as in MySQL); keep the first spelling
+            first = names[code_field].setdefault(entry[code_field].lower(), (entry[name_field], row_number, entry[code_field]))
+            entry[code_field] = first[2]
+        slots[slot] = row_number
+        entries.append(entry)
+    return entries, errors